@@ -3,10 +3,20 @@ Admin Dashboard Configuration for ShriekedIn
 
 Registers all core models with customized list displays, filters,
 and search fields for easy management.
+
+Every admin uses FastChangeListMixin (core/admin_mixins.py), which keeps
+changelist pages fast on tables with millions of rows: foreign keys in
+list_display are joined, big tables get estimated counts, and the date
+hierarchy doesn't scan the table.
 """
 
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
+
+from .admin_mixins import FastChangeListMixin
+from .bulk_actions import chunked_update_action, dispatch
+from .dedup import MergeConflict, merge_locations, reject_proposals
 from .models import (
     UserProfile,
     Location,
@@ -18,7 +28,12 @@ from .models import (
     Post,
     Like,
     Comment,
-    ContactMessage
+    ContactMessage,
+    BulkActionJob,
+    BackgroundTask,
+    GazetteerPlace,
+    GeocodedAddress,
+    LocationMergeProposal,
 )
 
 
@@ -27,7 +42,7 @@ from .models import (
 # ================================================================
 
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['user', 'user_type', 'location', 'created_at']
     list_filter = ['user_type', 'created_at']
     search_fields = ['user__username', 'user__email', 'location']
@@ -52,11 +67,11 @@ class UserProfileAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(Location)
-class LocationAdmin(admin.ModelAdmin):
+class LocationAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['name', 'city', 'state', 'location_type', 'is_verified', 'created_by']
-    list_filter = ['location_type', 'is_verified', 'state', 'country']
+    list_filter = ['location_type', 'is_verified', 'geocode_precision', 'state', 'country']
     search_fields = ['name', 'address', 'city', 'state']
-    readonly_fields = ['created_date']
+    readonly_fields = ['created_date', 'geocode_precision']
     list_editable = ['is_verified']
 
     fieldsets = (
@@ -67,21 +82,28 @@ class LocationAdmin(admin.ModelAdmin):
             'fields': ('address', 'city', 'state', 'zip_code', 'country')
         }),
         ('Coordinates', {
-            'fields': ('latitude', 'longitude'),
-            'description': 'Geographic coordinates for map display'
+            'fields': ('latitude', 'longitude', 'geocode_precision'),
+            'description': 'Geographic coordinates for map display. Left empty, '
+                           '`manage.py geocode_locations` fills them in from the address.'
         }),
         ('Metadata', {
             'fields': ('created_by', 'created_date', 'is_verified')
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        # Coordinates typed in here are exact, not a ZIP or city centre
+        if {'latitude', 'longitude'} & set(form.changed_data):
+            obj.geocode_precision = ''
+        super().save_model(request, obj, form, change)
+
 
 # ================================================================
 # EVENT ADMIN
 # ================================================================
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['title', 'event_date', 'event_category', 'cost_display', 'is_active', 'is_featured', 'view_count']
     list_filter = ['event_category', 'age_appropriateness', 'is_active', 'is_featured', 'event_date']
     search_fields = ['title', 'description', 'location__name']
@@ -129,7 +151,7 @@ class EventAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(Media)
-class MediaAdmin(admin.ModelAdmin):
+class MediaAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['id', 'entity_type', 'entity_id', 'file_type', 'uploaded_by', 'upload_date']
     list_filter = ['entity_type', 'file_type', 'upload_date']
     search_fields = ['caption', 'alt_text']
@@ -156,7 +178,7 @@ class MediaAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(HauntedPlace)
-class HauntedPlaceAdmin(admin.ModelAdmin):
+class HauntedPlaceAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['story_title', 'location', 'scare_level_display', 'is_educational', 'created_by', 'view_count']
     list_filter = ['scare_level', 'is_educational', 'created_date']
     search_fields = ['story_title', 'story_content', 'location__name']
@@ -201,7 +223,7 @@ class HauntedPlaceAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(Business)
-class BusinessAdmin(admin.ModelAdmin):
+class BusinessAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['business_name', 'business_type', 'location', 'verified_display', 'is_active']
     list_filter = ['business_type', 'verified', 'is_active', 'created_date']
     search_fields = ['business_name', 'description', 'email']
@@ -242,7 +264,7 @@ class BusinessAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(Coupon)
-class CouponAdmin(admin.ModelAdmin):
+class CouponAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['title', 'business', 'discount_code', 'discount_display', 'valid_from', 'valid_until', 'is_active', 'usage_display']
     list_filter = ['is_active', 'valid_from', 'valid_until', 'created_date']
     search_fields = ['title', 'discount_code', 'business__business_name']
@@ -293,7 +315,7 @@ class CouponAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['user', 'post_type', 'content_preview', 'created_date', 'is_public', 'is_active', 'engagement_display']
     list_filter = ['post_type', 'is_public', 'is_active', 'created_date']
     search_fields = ['content', 'user__username']
@@ -340,7 +362,7 @@ class PostAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(Like)
-class LikeAdmin(admin.ModelAdmin):
+class LikeAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['user', 'entity_type', 'entity_id', 'created_date']
     list_filter = ['entity_type', 'created_date']
     search_fields = ['user__username']
@@ -353,7 +375,7 @@ class LikeAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['user', 'entity_type', 'entity_id', 'content_preview', 'is_reply_display', 'created_date', 'is_active']
     list_filter = ['entity_type', 'is_active', 'is_flagged', 'created_date']
     search_fields = ['content', 'user__username']
@@ -401,7 +423,7 @@ class CommentAdmin(admin.ModelAdmin):
 # ================================================================
 
 @admin.register(ContactMessage)
-class ContactMessageAdmin(admin.ModelAdmin):
+class ContactMessageAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ['status_display', 'name', 'email', 'subject_preview', 'submitted_at', 'is_spam_display', 'user']
     list_filter = ['is_read', 'is_spam', 'is_responded', 'submitted_at']
     search_fields = ['name', 'email', 'subject', 'message', 'ip_address']
@@ -452,36 +474,169 @@ class ContactMessageAdmin(admin.ModelAdmin):
         return format_html('<span style="color: green;">✓ No</span>')
     is_spam_display.short_description = 'Spam?'
 
-    # Admin actions
-    def mark_as_read(self, request, queryset):
-        """Mark selected messages as read."""
-        updated = queryset.update(is_read=True)
-        self.message_user(request, f'{updated} message(s) marked as read.')
-    mark_as_read.short_description = 'Mark selected as read'
-
-    def mark_as_unread(self, request, queryset):
-        """Mark selected messages as unread."""
-        updated = queryset.update(is_read=False)
-        self.message_user(request, f'{updated} message(s) marked as unread.')
-    mark_as_unread.short_description = 'Mark selected as unread'
-
-    def mark_as_spam(self, request, queryset):
-        """Flag selected messages as spam."""
-        updated = queryset.update(is_spam=True)
-        self.message_user(request, f'{updated} message(s) flagged as spam.')
-    mark_as_spam.short_description = 'Flag as spam'
-
-    def mark_as_not_spam(self, request, queryset):
-        """Unflag selected messages as spam."""
-        updated = queryset.update(is_spam=False)
-        self.message_user(request, f'{updated} message(s) unflagged as spam.')
-    mark_as_not_spam.short_description = 'Unflag as spam'
-
-    def mark_as_responded(self, request, queryset):
-        """Mark selected messages as responded."""
-        updated = queryset.update(is_responded=True, is_read=True)
-        self.message_user(request, f'{updated} message(s) marked as responded.')
-    mark_as_responded.short_description = 'Mark as responded'
+    # Admin actions: small selections update right away, big ones
+    # ("select all") run in the background in chunks (core/bulk_actions.py)
+    mark_as_read = chunked_update_action(
+        'Mark selected as read', '{count} message(s) marked as read.', is_read=True,
+    )
+    mark_as_unread = chunked_update_action(
+        'Mark selected as unread', '{count} message(s) marked as unread.', is_read=False,
+    )
+    mark_as_spam = chunked_update_action(
+        'Flag as spam', '{count} message(s) flagged as spam.', is_spam=True,
+    )
+    mark_as_not_spam = chunked_update_action(
+        'Unflag as spam', '{count} message(s) unflagged as spam.', is_spam=False,
+    )
+    mark_as_responded = chunked_update_action(
+        'Mark as responded', '{count} message(s) marked as responded.', is_responded=True, is_read=True,
+    )
+
+
+# ================================================================
+# BULK ACTION JOB ADMIN
+# ================================================================
+
+@admin.register(BulkActionJob)
+class BulkActionJobAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ['description', 'status_display', 'progress_display', 'created_by', 'created_at', 'updated_at']
+    list_filter = ['status', 'model', 'created_at']
+    readonly_fields = [
+        'description', 'model', 'params', 'max_pk', 'changes', 'chunk_size', 'status', 'total', 'processed', 'last_pk',
+        'error', 'created_by', 'created_at', 'started_at', 'finished_at', 'updated_at',
+    ]
+    exclude = ['selected']
+    actions = ['cancel_jobs', 'resume_jobs']
+
+    def has_add_permission(self, request):
+        # Jobs are created by bulk actions on other admins
+        return False
+
+    def status_display(self, obj):
+        colors = {'queued': '#6B7280', 'running': '#3B82F6', 'done': '#059669', 'failed': '#DC2626', 'cancelled': '#F59E0B'}
+        return format_html(
+            '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
+            colors.get(obj.status, '#000'), obj.get_status_display()
+        )
+    status_display.short_description = 'Status'
+
+    def progress_display(self, obj):
+        if obj.progress is None:
+            return '—'
+        return f"{obj.progress}% ({obj.processed:,} of {obj.total:,})"
+    progress_display.short_description = 'Progress'
+
+    def cancel_jobs(self, request, queryset):
+        """Stop queued or running jobs after their current chunk."""
+        updated = queryset.filter(status__in=['queued', 'running']).update(status='cancelled')
+        self.message_user(request, f'{updated} job(s) cancelled.')
+    cancel_jobs.short_description = 'Cancel selected jobs'
+
+    def resume_jobs(self, request, queryset):
+        """Continue failed or cancelled jobs from their last finished chunk."""
+        job_ids = list(queryset.filter(status__in=['failed', 'cancelled']).values_list('pk', flat=True))
+        BulkActionJob.objects.filter(pk__in=job_ids).update(status='queued', error='', finished_at=None)
+        for job_id in job_ids:
+            dispatch(job_id)
+        self.message_user(request, f'{len(job_ids)} job(s) resumed.')
+    resume_jobs.short_description = 'Resume selected jobs'
+
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(FastChangeListMixin, admin.ModelAdmin):
+    """Tasks queued for manage.py run_worker (see core/task_queue.py)."""
+    list_display = ['name', 'queue', 'status_display', 'attempts_display', 'run_at', 'finished_at', 'locked_by']
+    list_filter = ['status', 'queue']
+    search_fields = ['name', 'unique_key']
+    readonly_fields = [
+        'name', 'args', 'kwargs', 'queue', 'status', 'run_at', 'attempts', 'max_attempts', 'unique_key',
+        'locked_by', 'locked_until', 'created_at', 'started_at', 'finished_at', 'last_error',
+    ]
+    actions = ['retry_tasks']
+
+    def has_add_permission(self, request):
+        # Tasks are queued by code (task.delay())
+        return False
+
+    def status_display(self, obj):
+        colors = {'queued': '#6B7280', 'running': '#3B82F6', 'done': '#059669', 'failed': '#DC2626'}
+        return format_html(
+            '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 3px;">{}</span>',
+            colors.get(obj.status, '#000'), obj.get_status_display()
+        )
+    status_display.short_description = 'Status'
+
+    def attempts_display(self, obj):
+        return f"{obj.attempts} / {obj.max_attempts}"
+    attempts_display.short_description = 'Attempts'
+
+    def retry_tasks(self, request, queryset):
+        """Queue failed tasks again, with a fresh set of attempts."""
+        # Dropping unique_key: a periodic task's next run may already be queued
+        updated = queryset.filter(status='failed').update(
+            status='queued', run_at=timezone.now(), attempts=0, finished_at=None, unique_key=None,
+        )
+        self.message_user(request, f'{updated} task(s) queued again.')
+    retry_tasks.short_description = 'Retry selected failed tasks'
+
+
+# ================================================================
+# GEOCODING ADMIN
+# ================================================================
+
+@admin.register(GazetteerPlace)
+class GazetteerPlaceAdmin(FastChangeListMixin, admin.ModelAdmin):
+    """ZIP code and city centres, loaded by manage.py load_gazetteer."""
+    list_display = ['key', 'name', 'state', 'latitude', 'longitude']
+    list_filter = ['state']
+    search_fields = ['key', 'name']
+
+
+@admin.register(GeocodedAddress)
+class GeocodedAddressAdmin(FastChangeListMixin, admin.ModelAdmin):
+    """Cached geocoding results (see core/geocoding.py)."""
+    list_display = ['address', 'precision', 'latitude', 'longitude', 'created_at']
+    list_filter = ['precision']
+    search_fields = ['address']
+    readonly_fields = ['address_key', 'address', 'precision', 'latitude', 'longitude', 'created_at']
+
+    def has_add_permission(self, request):
+        # Filled in by geocoding
+        return False
+
+
+# ================================================================
+# DUPLICATE LOCATIONS ADMIN
+# ================================================================
+
+@admin.register(LocationMergeProposal)
+class LocationMergeProposalAdmin(FastChangeListMixin, admin.ModelAdmin):
+    """Possible duplicate locations found by manage.py find_duplicate_locations."""
+    list_display = ['duplicate', 'keep', 'score', 'name_score', 'address_score', 'status', 'created_at']
+    list_filter = ['status']
+    search_fields = ['keep__name', 'duplicate__name']
+    raw_id_fields = ['keep', 'duplicate']
+    readonly_fields = ['score', 'name_score', 'address_score', 'status', 'created_at', 'reviewed_at']
+    actions = ['merge_selected', 'reject_selected']
+
+    def has_add_permission(self, request):
+        # Made by find_duplicate_locations
+        return False
+
+    def merge_selected(self, request, queryset):
+        """Move everything to the kept location and delete the duplicate."""
+        try:
+            merged = merge_locations(queryset)
+        except MergeConflict as error:
+            self.message_user(request, f'Nothing merged: {error}.', level='error')
+            return
+        self.message_user(request, f'{merged} duplicate location(s) merged.')
+    merge_selected.short_description = 'Merge selected duplicates'
+
+    def reject_selected(self, request, queryset):
+        rejected = reject_proposals(queryset)
+        self.message_user(request, f'{rejected} proposal(s) marked as not duplicates.')
+    reject_selected.short_description = 'Not duplicates'
 
 
 # ================================================================
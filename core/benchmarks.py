@@ -0,0 +1,468 @@
+"""
+Route Benchmark Suite for ShriekedIn
+
+Seeds a throwaway database, hits every named route in core.urls and
+games.urls with Django's test client, and reports latency percentiles,
+queries per request and throughput. Results can be saved as JSON
+baselines and compared against later runs to catch regressions.
+
+Used by:
+- manage.py benchmark_routes (the command-line entry point)
+- core/tests.py (smoke test on the 'small' dataset)
+
+For developers new to benchmarking:
+- p50 is the median request time, p95/p99 are the slow tail
+- "queries" is the highest number of SQL queries seen for a route;
+  it should stay flat no matter how much data is in the database
+"""
+
+import json
+import math
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .geo import cell_for
+from .models import Location, Event, EventDailyRollup, HauntedPlace, Business, Coupon, ContactMessage
+
+
+# ================================================================
+# DATASET SIZES
+# ================================================================
+
+SIZES = {
+    'small': {
+        'users': 10,
+        'locations': 30,
+        'events': 50,
+        'haunted_places': 15,
+        'businesses': 10,
+        'coupons_per_business': 3,
+        'contact_messages': 20,
+        'completed_madlibs': 50,
+    },
+    'medium': {
+        'users': 200,
+        'locations': 600,
+        'events': 1000,
+        'haunted_places': 250,
+        'businesses': 150,
+        'coupons_per_business': 20,
+        'contact_messages': 1000,
+        'completed_madlibs': 2000,
+    },
+    'halloween_peak': {
+        'users': 2000,
+        'locations': 6000,
+        'events': 10000,
+        'haunted_places': 2000,
+        'businesses': 1000,
+        'coupons_per_business': 200,
+        'contact_messages': 20000,
+        'completed_madlibs': 50000,
+    },
+}
+
+BENCHMARK_USERNAME = 'benchmark_staff'
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# Routes are served without a collected static manifest and without an
+# HTTPS proxy in front of them, so benchmark runs use plain static storage.
+BENCHMARK_SETTINGS = {
+    'STORAGES': {
+        **settings.STORAGES,
+        'staticfiles': {
+            'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+        },
+    },
+}
+
+CITIES = [
+    ('Salem', 'MA'), ('New Orleans', 'LA'), ('Sleepy Hollow', 'NY'),
+    ('Savannah', 'GA'), ('St. Augustine', 'FL'), ('Gettysburg', 'PA'),
+    ('Portland', 'OR'), ('Chicago', 'IL'), ('Austin', 'TX'), ('Denver', 'CO'),
+]
+
+
+# ================================================================
+# SEEDING
+# ================================================================
+
+@dataclass
+class BenchmarkData:
+    """IDs and lookups needed to build URLs for parameterised routes."""
+    size: str
+    staff_user: User
+    event_id: int = None
+    haunted_place_id: int = None
+    business_slug: str = None
+    template_id: int = None
+    share_code: str = None
+    coupon_code: str = None
+    counts: dict = field(default_factory=dict)
+
+
+def seed_benchmark_data(size='small', seed=2025):
+    """
+    Fill the current database with a dataset of the given size.
+
+    Rows are written with bulk_create, so model save() hooks are bypassed
+    and slugs are generated here instead.
+    """
+    from games.models import StoryTemplate, CompletedMadLib
+
+    if size not in SIZES:
+        raise ValueError(f"Unknown benchmark size '{size}'. Choose from: {', '.join(SIZES)}")
+
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    today = timezone.now().date()
+
+    staff_user = User.objects.create_user(
+        username=BENCHMARK_USERNAME,
+        password=BENCHMARK_PASSWORD,
+        is_staff=True,
+    )
+    User.objects.bulk_create([
+        User(username=f'bench_user_{i}', email=f'bench{i}@example.com')
+        for i in range(spec['users'])
+    ])
+    user_ids = list(User.objects.values_list('id', flat=True))
+
+    locations = [
+        Location(
+            name=f'Spooky Venue {i}',
+            address=f'{100 + i} Hollow Lane',
+            city=city,
+            state=state,
+            zip_code=f'{10000 + i}',
+            latitude=Decimal(f'{rng.uniform(25, 48):.6f}'),
+            longitude=Decimal(f'{rng.uniform(-122, -70):.6f}'),
+            location_type=rng.choice(['venue', 'haunted', 'business']),
+            created_by_id=rng.choice(user_ids),
+        )
+        for i, (city, state) in enumerate(rng.choice(CITIES) for _ in range(spec['locations']))
+    ]
+    for location in locations:  # bulk_create skips Location.save()
+        location.geo_cell = cell_for(location.latitude, location.longitude)
+    Location.objects.bulk_create(locations, batch_size=1000)
+    location_ids = list(Location.objects.values_list('id', flat=True))
+
+    categories = [choice for choice, _ in Event.EVENT_CATEGORY_CHOICES]
+    ages = [choice for choice, _ in Event.AGE_CHOICES]
+    events = [
+        Event(
+            title=f'Haunted Happening {i}',
+            slug=slugify(f'haunted-happening-{i}'),
+            description='A night of frights and festivities.',
+            location_id=rng.choice(location_ids),
+            event_date=date(today.year, 10, 1) + timedelta(days=rng.randint(0, 30)),
+            start_time=dt_time(rng.randint(12, 22), 0),
+            cost=Decimal(rng.choice(['0.00', '5.00', '15.00'])),
+            age_appropriateness=rng.choice(ages),
+            event_category=rng.choice(categories),
+            created_by_id=rng.choice(user_ids),
+            is_featured=rng.random() < 0.1,
+        )
+        for i in range(spec['events'])
+    ]
+    for event in events:  # bulk_create skips Event.save()
+        event.starts_at = Event.combine_start(event.event_date, event.start_time)
+    Event.objects.bulk_create(events, batch_size=1000)
+    EventDailyRollup.rebuild_all()  # bulk_create skips the rollup signals
+
+    HauntedPlace.objects.bulk_create([
+        HauntedPlace(
+            location_id=location_id,
+            story_title=f'The Legend of Venue {location_id}',
+            story_content='Footsteps echo in the empty hall every midnight.',
+            scare_level=rng.randint(1, 5),
+            created_by_id=rng.choice(user_ids),
+            view_count=rng.randint(0, 500),
+        )
+        for location_id in rng.sample(location_ids, min(spec['haunted_places'], len(location_ids)))
+    ], batch_size=1000)
+
+    business_types = [choice for choice, _ in Business.BUSINESS_TYPE_CHOICES]
+    Business.objects.bulk_create([
+        Business(
+            user_id=rng.choice(user_ids),
+            business_name=f'Creepy Costumes {i}',
+            slug=slugify(f'creepy-costumes-{i}'),
+            location_id=rng.choice(location_ids),
+            business_type=rng.choice(business_types),
+            description='Everything you need for a frightful night.',
+            verified=rng.random() < 0.5,
+        )
+        for i in range(spec['businesses'])
+    ], batch_size=1000)
+
+    # Most coupons are historical (expired) so listings have to skip them
+    coupons = []
+    for business_id in Business.objects.values_list('id', flat=True):
+        for n in range(spec['coupons_per_business']):
+            expired = n > 0 and rng.random() < 0.9
+            valid_from = today - timedelta(days=rng.randint(400, 800) if expired else 10)
+            coupons.append(Coupon(
+                business_id=business_id,
+                title=f'{n * 5 % 100}% off',
+                description='Spooky savings.',
+                discount_code=f'BOO-{business_id}-{n}',
+                discount_percentage=rng.randint(5, 50),
+                valid_from=valid_from,
+                valid_until=valid_from + timedelta(days=30 if expired else 60),
+                max_uses=rng.choice([None, 100]),
+                is_active=rng.random() < 0.9,
+            ))
+    Coupon.objects.bulk_create(coupons, batch_size=2000)
+    # An unlimited, currently valid coupon for the redemption route
+    coupon_code = coupons[0].discount_code
+    Coupon.objects.filter(discount_code=coupon_code).update(max_uses=None, is_active=True)
+
+    ContactMessage.objects.bulk_create([
+        ContactMessage(
+            name=f'Visitor {i}',
+            email=f'visitor{i}@example.com',
+            subject='Question about tours',
+            message='Are the ghost tours suitable for children?',
+            ip_address=f'10.0.{i // 250 % 250}.{i % 250}',
+            is_read=rng.random() < 0.7,
+            is_spam=rng.random() < 0.05,
+        )
+        for i in range(spec['contact_messages'])
+    ], batch_size=2000)
+
+    call_command('populate_madlibs', stdout=_NullWriter())
+    templates = list(StoryTemplate.objects.filter(is_active=True))
+    CompletedMadLib.objects.bulk_create([
+        CompletedMadLib(
+            user_id=rng.choice(user_ids) if rng.random() < 0.3 else None,
+            template=template,
+            completed_text=template.template_text,
+            user_words={},
+            is_public=rng.random() < 0.5,
+            share_code=f'bench{i:07d}',
+            view_count=rng.randint(0, 50),
+        )
+        for i, template in enumerate(rng.choice(templates) for _ in range(spec['completed_madlibs']))
+    ], batch_size=2000)
+
+    return BenchmarkData(
+        size=size,
+        staff_user=staff_user,
+        event_id=Event.objects.values_list('id', flat=True).first(),
+        haunted_place_id=HauntedPlace.objects.values_list('id', flat=True).first(),
+        business_slug=Business.objects.values_list('slug', flat=True).first(),
+        template_id=templates[0].id,
+        share_code='bench0000000',
+        coupon_code=coupon_code,
+        counts=dict(spec),
+    )
+
+
+class _NullWriter:
+    """Swallows management command output while seeding."""
+
+    def write(self, *args, **kwargs):
+        pass
+
+    def flush(self):
+        pass
+
+
+# ================================================================
+# ROUTES
+# ================================================================
+
+@dataclass
+class RouteSpec:
+    """How to request one named route during a benchmark run."""
+    name: str
+    kwargs: dict = field(default_factory=dict)
+    method: str = 'get'
+    data: dict = None
+    login: bool = False
+    relogin: bool = False  # Route ends the session (logout)
+
+
+def build_route_specs(data):
+    """Return a RouteSpec for every named route in core.urls and games.urls."""
+    from core import urls as core_urls
+    from games import urls as games_urls
+
+    template_words = {'NOUN_1': 'ghost', 'ADJECTIVE_2': 'eerie', 'VERB_3': 'howl', 'ADVERB_4': 'slowly'}
+    overrides = {
+        'core:dashboard': {'login': True},
+        'core:logout': {'login': True, 'relogin': True},
+        'core:haunted_detail': {'kwargs': {'place_id': data.haunted_place_id}},
+        'core:event_detail': {'kwargs': {'event_id': data.event_id}},
+        'core:api_nearby_haunted': {'data': {'lat': '42.52', 'lon': '-70.89', 'k': '10'}},
+        'core:api_ghost_tour': {'data': {'places': str(data.haunted_place_id)}},
+        'core:api_happening_now': {'data': {'lat': '42.52', 'lon': '-70.89', 'km': '50', 'hours': '12'}},
+        'core:happening_now': {'data': {'lat': '42.52', 'lon': '-70.89', 'km': '50', 'hours': '12'}},
+        'core:event_calendar': {'kwargs': {'year': timezone.now().year, 'month': 10}},
+        'core:business_detail': {'kwargs': {'slug': data.business_slug}},
+        'games:madlibs_play': {'kwargs': {'template_id': data.template_id}},
+        'games:madlibs_submit': {
+            'kwargs': {'template_id': data.template_id},
+            'method': 'post',
+            'data': template_words,
+        },
+        'core:redeem_coupon': {'method': 'post', 'data': {'code': data.coupon_code}, 'login': True},
+        'games:madlibs_result': {'kwargs': {'share_code': data.share_code}},
+        'games:api_random_word': {'kwargs': {'part_of_speech': 'noun'}},
+        'games:api_suggest_words': {'kwargs': {'part_of_speech': 'noun'}, 'data': {'q': 'gh'}},
+        'games:api_batch_stories': {'method': 'post', 'data': {'count': 30}, 'login': True},
+    }
+
+    specs = []
+    for module in (core_urls, games_urls):
+        for pattern in module.urlpatterns:
+            if not getattr(pattern, 'name', None):
+                continue
+            name = f'{module.app_name}:{pattern.name}'
+            specs.append(RouteSpec(name=name, **overrides.get(name, {})))
+    return specs
+
+
+# ================================================================
+# MEASUREMENT
+# ================================================================
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def benchmark_route(client, spec, data, iterations=30, warmup=2):
+    """Request one route repeatedly and summarise latency and query counts."""
+    url = reverse(spec.name, kwargs=spec.kwargs or None)
+    request = getattr(client, spec.method)
+
+    if spec.login:
+        client.force_login(data.staff_user)
+
+    timings = []
+    query_counts = []
+    status_code = None
+    for i in range(warmup + iterations):
+        if spec.relogin:
+            client.force_login(data.staff_user)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request(url, data=spec.data, secure=True)
+            elapsed = time.perf_counter() - started
+        status_code = response.status_code
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            query_counts.append(len(queries))
+
+    if spec.login:
+        client.logout()
+
+    total_seconds = sum(timings) / 1000
+    return {
+        'url': url,
+        'method': spec.method.upper(),
+        'status': status_code,
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': max(query_counts),
+        'throughput_rps': round(iterations / total_seconds, 1) if total_seconds else 0.0,
+    }
+
+
+def run_benchmarks(data, iterations=30, route_names=None, stdout=None):
+    """Benchmark every route (or just route_names) against already seeded data."""
+    client = Client()
+    results = {}
+    with override_settings(**BENCHMARK_SETTINGS):
+        for spec in build_route_specs(data):
+            if route_names and spec.name not in route_names:
+                continue
+            results[spec.name] = benchmark_route(client, spec, data, iterations=iterations)
+            if stdout:
+                r = results[spec.name]
+                stdout.write(
+                    f"  {spec.name:<28} {r['status']}  p50 {r['p50_ms']:>8.2f} ms  "
+                    f"p95 {r['p95_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  "
+                    f"{r['queries']:>3} queries  {r['throughput_rps']:>7.1f} req/s"
+                )
+
+    return {
+        'size': data.size,
+        'database': connection.vendor,
+        'iterations': iterations,
+        'created': timezone.now().isoformat(),
+        'counts': data.counts,
+        'routes': results,
+    }
+
+
+# ================================================================
+# BASELINES
+# ================================================================
+
+def save_baseline(results, path):
+    """Write benchmark results to a JSON baseline file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+
+def load_baseline(path):
+    """Read a JSON baseline file, or return None if it does not exist."""
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def compare_with_baseline(results, baseline, threshold=0.25, min_delta_ms=2.0):
+    """
+    Compare results to a baseline and return a list of regression messages.
+
+    A route regresses when its p95 grows by more than `threshold` (25% by
+    default) and by at least `min_delta_ms`, or when it runs more queries
+    than before. The absolute floor keeps sub-millisecond noise from
+    failing the run.
+    """
+    regressions = []
+    for name, current in results['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if not previous:
+            continue
+
+        allowed_p95 = previous['p95_ms'] * (1 + threshold)
+        if current['p95_ms'] > allowed_p95 and current['p95_ms'] - previous['p95_ms'] >= min_delta_ms:
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']:.2f} ms exceeds baseline "
+                f"{previous['p95_ms']:.2f} ms by more than {threshold:.0%}"
+            )
+        if current['queries'] > previous['queries']:
+            regressions.append(
+                f"{name}: {current['queries']} queries per request (baseline {previous['queries']})"
+            )
+        if current['status'] != previous['status']:
+            regressions.append(
+                f"{name}: status {current['status']} (baseline {previous['status']})"
+            )
+    return regressions
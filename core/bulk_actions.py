@@ -0,0 +1,269 @@
+"""
+Chunked Background Admin Actions for ShriekedIn
+
+A plain admin action runs queryset.update() over the whole selection
+inside the request. With "select all 200,000" that one UPDATE locks every
+row until it finishes, and the request often times out first.
+
+chunked_update_action() builds admin actions that
+- update small selections (one chunk or less) right away, as before
+- turn bigger ones into a BulkActionJob that updates CHUNK_SIZE rows per
+  transaction, walking the primary key in order
+
+The job stores how the rows were selected, not the rows: the
+changelist's query parameters (filters, search, date hierarchy), the
+primary keys ticked on the page unless "select all across pages" was
+used, and the highest primary key at the time. The worker rebuilds the
+changelist's queryset from those, so the request never reads the
+selection and the job row stays small however many rows it covers. Rows
+added after the job was created (above max_pk) are left alone. Each
+chunk reads the next chunk_size keys (pk > last_pk ORDER BY pk) and
+commits together with the job's progress (processed, last_pk), so a job
+that dies halfway resumes after the last finished chunk.
+
+Who runs the jobs:
+- the web process starts each new job in a background thread once the
+  request's transaction commits (BULK_ACTIONS_IN_PROCESS, default True)
+- with BULK_ACTIONS_IN_PROCESS = False, each job is queued as a
+  run_bulk_action task for manage.py run_worker (core/tasks.py), which
+  also resumes stalled jobs (no progress for STALE_AFTER) every 5 minutes
+- manage.py run_bulk_actions does the same by hand or from cron
+
+Example:
+    >>> class ContactMessageAdmin(admin.ModelAdmin):
+    ...     actions = ['mark_as_spam']
+    ...     mark_as_spam = chunked_update_action(
+    ...         'Flag as spam', '{count} message(s) flagged as spam.', is_spam=True,
+    ...     )
+"""
+
+import logging
+import threading
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.admin import helpers
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Max, Q
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .models import BulkActionJob
+
+logger = logging.getLogger(__name__)
+
+# Rows updated per transaction
+CHUNK_SIZE = 1000
+# A running job that hasn't finished a chunk for this long is picked up again
+STALE_AFTER = timedelta(minutes=5)
+
+
+# ================================================================
+# CREATING JOBS
+# ================================================================
+
+def enqueue(model, changes, description, params=None, selected=None, user=None, chunk_size=None):
+    """
+    Create a BulkActionJob that sets `changes` on the rows the model's
+    admin changelist shows for the query `params` ({name: [values]}, as
+    in request.GET), or only the `selected` primary keys among them.
+
+    The job starts after the current transaction commits, in a background
+    thread, or is queued for the task worker when BULK_ACTIONS_IN_PROCESS
+    is False.
+    """
+    opts = model._meta
+    for name in changes:
+        opts.get_field(name)  # fail now, not in the background, on a typo
+
+    job = BulkActionJob.objects.create(
+        description=description,
+        model=opts.label,
+        params=params or {},
+        selected=[str(pk) for pk in selected] if selected is not None else None,
+        # An index lookup; rows added from now on aren't part of the selection
+        max_pk=model._default_manager.using(router.db_for_write(model)).aggregate(Max('pk'))['pk__max'],
+        changes=changes,
+        chunk_size=chunk_size or CHUNK_SIZE,
+        created_by=user if user and user.is_authenticated else None,
+    )
+    dispatch(job.pk)
+    return job
+
+
+def dispatch(job_id):
+    """Start a job when the current transaction commits, where the settings say."""
+    if getattr(settings, 'BULK_ACTIONS_IN_PROCESS', True):
+        transaction.on_commit(lambda: start_in_background(job_id))
+    else:
+        from .tasks import run_bulk_action
+
+        # Queued in this transaction, so it only exists if the job does
+        run_bulk_action.delay(job_id)
+
+
+def chunked_update_action(description, message, **changes):
+    """
+    Build an admin action that sets `changes` on the selected rows.
+
+    `message` is shown when a small selection is updated right away;
+    `{count}` becomes the number of rows.
+    """
+    def action(modeladmin, request, queryset):
+        # COUNT over a LIMIT subquery: cheap however big the selection is
+        if queryset[:CHUNK_SIZE + 1].count() <= CHUNK_SIZE:
+            updated = queryset.update(**changes)
+            modeladmin.message_user(request, message.format(count=updated))
+            return
+
+        # What the changelist was showing, as Django's own actions work it out
+        select_across = request.POST.get('select_across') == '1'
+        job = enqueue(
+            modeladmin.model, changes, f'{modeladmin.opts.verbose_name_plural}: {description}',
+            params=dict(request.GET.lists()),
+            selected=None if select_across else request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            user=request.user,
+        )
+        url = reverse('admin:core_bulkactionjob_change', args=[job.pk])
+        modeladmin.message_user(
+            request,
+            format_html('"{}" is running in the background as <a href="{}">job #{}</a>.', description, url, job.pk),
+        )
+
+    action.short_description = description
+    return action
+
+
+# ================================================================
+# RUNNING JOBS
+# ================================================================
+
+def _runnable():
+    """Jobs that are waiting, or were running but stopped making progress."""
+    stalled = Q(status='running', updated_at__lt=timezone.now() - STALE_AFTER)
+    return BulkActionJob.objects.filter(Q(status='queued') | stalled)
+
+
+def claim(job_id):
+    """Mark a job as running; False if it's finished or another process has it."""
+    now = timezone.now()
+    claimed = _runnable().filter(pk=job_id).update(
+        status='running',
+        started_at=Coalesce('started_at', now),
+        updated_at=now,
+    )
+    return claimed == 1
+
+
+def selection(job):
+    """
+    (the job's rows, estimated count): the model admin's changelist
+    queryset for the job's query parameters, as the user who started it
+    would see it, read from the primary database.
+    """
+    from django.contrib import admin
+    from django.contrib.auth.models import AnonymousUser
+    from django.http import HttpRequest, QueryDict
+
+    model = apps.get_model(job.model)
+    modeladmin = admin.site._registry[model]
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(mutable=True)
+    for name, values in job.params.items():
+        request.GET.setlist(name, values)
+    request.user = job.created_by or AnonymousUser()
+
+    rows = modeladmin.get_changelist_instance(request).get_queryset(request)
+    if job.selected is not None:
+        rows = rows.filter(pk__in=job.selected)
+    if job.max_pk is None:
+        rows = rows.none()
+    else:
+        rows = rows.filter(pk__lte=job.max_pk)
+    rows = rows.using(router.db_for_write(model))
+    if job.selected is not None:
+        return rows, len(job.selected)
+    # The admin's paginator estimates big counts (FastChangeListMixin)
+    return rows, modeladmin.get_paginator(request, rows, modeladmin.list_per_page).count
+
+
+def run_job(job_id):
+    """
+    Claim a job and update its rows chunk by chunk, returning the job.
+
+    Returns None if the job couldn't be claimed. Stops early if the job is
+    cancelled; a failure is saved on the job (status 'failed', error).
+    """
+    if not claim(job_id):
+        return None
+
+    job = BulkActionJob.objects.get(pk=job_id)
+    try:
+        rows, count = selection(job)
+        if job.total is None:
+            job.total = count
+            job.save(update_fields=['total', 'updated_at'])
+
+        while True:
+            if BulkActionJob.objects.filter(pk=job.pk, status='cancelled').exists():
+                job.refresh_from_db()
+                return job
+
+            chunk = rows.order_by('pk')
+            if job.last_pk is not None:
+                chunk = chunk.filter(pk__gt=job.last_pk)
+            pks = list(chunk.values_list('pk', flat=True)[:job.chunk_size])
+            if not pks:
+                break
+
+            # The chunk and the progress that records it commit together
+            with transaction.atomic(using=rows.db):
+                rows.model._default_manager.using(rows.db).filter(pk__in=pks).update(**job.changes)
+                job.last_pk = pks[-1]
+                job.processed += len(pks)
+                job.save(update_fields=['last_pk', 'processed', 'updated_at'])
+
+        # Only if it's still running: a job cancelled during its last chunk stays cancelled
+        now = timezone.now()
+        if BulkActionJob.objects.filter(pk=job.pk, status='running').update(status='done', finished_at=now, updated_at=now):
+            job.status, job.finished_at = 'done', now
+        else:
+            job.refresh_from_db()
+    except Exception as error:
+        logger.exception('Bulk action job %s failed', job.pk)
+        # As with "done", a job cancelled meanwhile stays cancelled
+        now = timezone.now()
+        error = f'{type(error).__name__}: {error}'
+        if BulkActionJob.objects.filter(pk=job.pk, status='running').update(
+            status='failed', error=error, finished_at=now, updated_at=now,
+        ):
+            job.status, job.error, job.finished_at = 'failed', error, now
+        else:
+            job.refresh_from_db()
+    return job
+
+
+def run_pending():
+    """Run every queued or stalled job, oldest first; returns the jobs that ran."""
+    finished = []
+    for job_id in _runnable().order_by('created_at').values_list('pk', flat=True):
+        job = run_job(job_id)
+        if job:
+            finished.append(job)
+    return finished
+
+
+def start_in_background(job_id):
+    """Run a job in a daemon thread of this process."""
+    def run():
+        try:
+            run_job(job_id)
+        finally:
+            # The thread's own connections, not the request's
+            connections.close_all()
+
+    threading.Thread(target=run, name=f'bulk-action-{job_id}', daemon=True).start()
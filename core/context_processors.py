@@ -0,0 +1,20 @@
+"""
+Template Context Processors for ShriekedIn
+
+Functions listed in settings.TEMPLATES["OPTIONS"]["context_processors"]
+add variables to every template.
+"""
+
+# Set by the Scary Mode bootstrap in base.html when a visitor turns it on
+SCARY_MODE_COOKIE = 'scary_mode'
+
+
+def scary_mode(request):
+    """
+    Tell templates whether this visitor has turned Scary Mode on before.
+
+    base.html uses it to decide between the tiny Scary Mode bootstrap on its
+    own (most visitors) and the bootstrap plus preload hints for the full
+    3D assets (visitors who enabled it).
+    """
+    return {'scary_mode_enabled': request.COOKIES.get(SCARY_MODE_COOKIE) == 'on'}
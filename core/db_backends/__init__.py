@@ -0,0 +1 @@
+"""Custom database backends for ShriekedIn (selected in settings.DATABASES)."""
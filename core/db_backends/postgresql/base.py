@@ -0,0 +1,28 @@
+"""
+PostgreSQL backend that times connection checkouts.
+
+Identical to Django's own PostgreSQL backend, except that every time it
+opens a connection (or borrows one from the pool) it records how long
+that took in core.db_pool.checkout_metrics. Settings switch PostgreSQL
+databases to this backend automatically.
+"""
+
+import time
+
+from django.db.backends.postgresql import base
+
+from core.db_pool import checkout_metrics
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        ok = False
+        try:
+            connection = super().get_new_connection(conn_params)
+            ok = True
+            return connection
+        finally:
+            # Failures include pool timeouts (every connection busy for DB_POOL_TIMEOUT)
+            checkout_metrics.record(self.alias, (time.perf_counter() - started) * 1000, ok=ok)
@@ -0,0 +1,132 @@
+"""
+Database Connection Metrics for ShriekedIn
+
+Two ways to keep PostgreSQL connections around between requests:
+
+- Persistent (default): each worker thread keeps its own connection open
+  for CONN_MAX_AGE seconds. Simple, but every thread of every gunicorn
+  worker holds an idle connection, and a cold thread pays the full
+  connection setup (TCP + TLS + auth) on its first request.
+- Pooled (DB_POOL=True): each worker process shares a psycopg 3 pool of
+  DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections. Threads borrow a
+  connection for one request and give it back. When every connection is
+  busy, a thread waits up to DB_POOL_TIMEOUT seconds, then gets an error.
+
+What is measured (per worker process, since the last restart or clear):
+- Checkout latency: how long getting a connection took, timed by the
+  core.db_backends.postgresql backend. For pooled databases this is the
+  wait for the pool; for persistent ones it is the cost of connecting.
+- Pool statistics from psycopg_pool: size, idle connections, requests that
+  had to queue, total queue time and timeouts.
+
+Staff can see these on the performance panel and fetch them as JSON from
+/dashboard/performance/db-pool.json.
+"""
+
+import math
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connections
+
+
+# Checkout latencies kept per database alias for percentiles
+CHECKOUT_SAMPLES = 1000
+
+# psycopg_pool counters shown on the panel, in display order
+POOL_STATS = (
+    'pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting',
+    'requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors',
+    'connections_num', 'connections_ms',
+)
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(len(sorted_values) * percent / 100) - 1)
+    return sorted_values[index]
+
+
+class CheckoutMetrics:
+    """Per-process record of how long each connection checkout took."""
+
+    def __init__(self, size=CHECKOUT_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+        self._counts = defaultdict(int)
+        self._errors = defaultdict(int)
+
+    def record(self, alias, elapsed_ms, ok=True):
+        with self._lock:
+            self._counts[alias] += 1
+            self._samples[alias].append(elapsed_ms)
+            if not ok:
+                self._errors[alias] += 1
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._errors.clear()
+
+    def summary(self, alias):
+        """{'checkouts', 'errors', 'p50_ms', 'p95_ms', 'max_ms'} for one alias."""
+        with self._lock:
+            samples = sorted(self._samples.get(alias, ()))
+            checkouts = self._counts.get(alias, 0)
+            errors = self._errors.get(alias, 0)
+        return {
+            'checkouts': checkouts,
+            'errors': errors,
+            'p50_ms': round(_percentile(samples, 50), 2),
+            'p95_ms': round(_percentile(samples, 95), 2),
+            'max_ms': round(samples[-1], 2) if samples else 0.0,
+        }
+
+
+checkout_metrics = CheckoutMetrics()
+
+
+def pool_stats(alias):
+    """psycopg_pool statistics for a pooled database, or None if it isn't pooled."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql' or not connection.settings_dict['OPTIONS'].get('pool'):
+        return None
+    # get_stats() leaves out counters that are still zero
+    stats = connection.pool.get_stats()
+    return {key: stats.get(key, 0) for key in POOL_STATS}
+
+
+def connection_status():
+    """
+    One dict per configured database for dashboards and the JSON export.
+
+    Example:
+        [{'alias': 'default', 'mode': 'pool', 'checkout': {...}, 'pool': {...}}]
+    """
+    rows = []
+    for alias, settings_dict in settings.DATABASES.items():
+        pool = pool_stats(alias)
+        rows.append({
+            'alias': alias,
+            'vendor': connections[alias].vendor,
+            'mode': 'pool' if pool is not None else 'persistent',
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE', 0),
+            'checkout': checkout_metrics.summary(alias),
+            'pool': pool,
+        })
+    return rows
+
+
+def close_pools():
+    """
+    Close every connection pool in this process.
+
+    Call before forking: a pool's open sockets and background threads
+    must not be shared with child processes.
+    """
+    for connection in connections.all():
+        if getattr(connection, 'pool', None):
+            connection.close_pool()
@@ -0,0 +1,234 @@
+"""
+Read-Replica Database Routing for ShriekedIn
+
+Sends read queries to read-only replicas so listing and detail pages don't
+compete with writes on the primary. All writes go to the primary
+("default").
+
+Configure replicas in .env (comma-separated):
+    DATABASE_REPLICA_URLS=postgresql://reader@replica-1/shriekedin,postgresql://reader@replica-2/shriekedin
+
+Each URL becomes a database alias (replica1, replica2, ...) listed in
+settings.DATABASE_REPLICAS. With no replicas configured, everything uses
+the primary as before.
+
+Read-your-writes ("stickiness"):
+    Replicas apply changes a little after the primary. So that people see
+    what they just saved, reads go to the primary:
+    - for the rest of a request once it has written anything
+    - inside transactions on the primary
+    - for DATABASE_STICKY_SECONDS after a POST/PUT/PATCH/DELETE
+      (ReplicaStickinessMiddleware sets a short-lived cookie)
+    - inside `with use_primary():` blocks
+
+Replica lag and failback:
+    Every REPLICA_HEALTH_CHECK_SECONDS, each worker checks its replicas.
+    A replica that can't be reached, or that is more than
+    DATABASE_REPLICA_MAX_LAG seconds behind, is skipped until a later check
+    finds it healthy again. When no replica is healthy, reads fall back to
+    the primary.
+"""
+
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+# Cookie holding the time (epoch seconds) until which reads stay on the primary
+STICKY_COOKIE = 'db_primary_until'
+
+_pinned = contextvars.ContextVar('db_pinned_to_primary', default=False)
+_wrote = contextvars.ContextVar('db_wrote_in_request', default=False)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def use_primary():
+    """Send every query in this block to the primary."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+# ================================================================
+# REPLICA HEALTH
+# ================================================================
+
+class ReplicaHealth:
+    """
+    Per-process cache of which replicas are usable.
+
+    Checks run at most once per REPLICA_HEALTH_CHECK_SECONDS per replica,
+    on the request that needs the answer, so there is no background thread.
+    """
+
+    LAG_SQL = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}  # alias -> (checked_at, healthy, lag_seconds)
+
+    def clear(self):
+        with self._lock:
+            self._status.clear()
+
+    def lag_seconds(self, alias):
+        """How far behind the primary a replica is (0 when unknown or caught up)."""
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(self.LAG_SQL)
+                return float(cursor.fetchone()[0] or 0)
+            # Other databases: just make sure the replica answers
+            cursor.execute('SELECT 1')
+            return 0.0
+
+    def check(self, alias):
+        max_lag = getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 5)
+        try:
+            lag = self.lag_seconds(alias)
+            healthy = lag <= max_lag
+        except Exception:
+            lag, healthy = None, False
+            # Drop the broken connection so the next check reconnects
+            connections[alias].close()
+        with self._lock:
+            self._status[alias] = (time.monotonic(), healthy, lag)
+        return healthy
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'REPLICA_HEALTH_CHECK_SECONDS', 5)
+        with self._lock:
+            status = self._status.get(alias)
+        if status is None or time.monotonic() - status[0] >= interval:
+            return self.check(alias)
+        return status[1]
+
+    def snapshot(self):
+        """{alias: {'healthy': bool, 'lag_seconds': float|None}} for dashboards."""
+        with self._lock:
+            return {
+                alias: {'healthy': healthy, 'lag_seconds': lag}
+                for alias, (_, healthy, lag) in self._status.items()
+            }
+
+
+replica_health = ReplicaHealth()
+
+
+def replica_status():
+    """
+    One row per configured replica for the performance panel.
+
+    Each row is {'alias', 'healthy', 'lag_seconds'}; replicas that haven't
+    been checked yet in this worker are checked now.
+    """
+    rows = []
+    for alias in replica_aliases():
+        replica_health.is_healthy(alias)
+        status = replica_health.snapshot().get(alias, {})
+        rows.append({'alias': alias, **status})
+    return rows
+
+
+# ================================================================
+# ROUTER
+# ================================================================
+
+class ReplicaRouter:
+    """Database router: reads to a healthy replica, writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or _pinned.get() or _wrote.get():
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+
+        healthy = [alias for alias in replicas if replica_health.is_healthy(alias)]
+        if not healthy:
+            return PRIMARY
+        return random.choice(healthy)
+
+    def db_for_write(self, model, **hints):
+        # Later reads in this request must see this write
+        if not _wrote.get():
+            _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primary and replicas hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas copy the primary's schema; never migrate them directly
+        return db not in replica_aliases()
+
+
+# ================================================================
+# MIDDLEWARE
+# ================================================================
+
+class ReplicaStickinessMiddleware:
+    """
+    Keep a visitor's reads on the primary right after they change something.
+
+    Unsafe requests (POST, PUT, PATCH, DELETE) run entirely on the primary
+    and set a short cookie so the next few requests (like the redirect
+    after a form submit) read from the primary too. Safe requests that
+    happen to write (e.g. view counters) only read from the primary for
+    the rest of that request.
+    """
+
+    UNSAFE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        now = time.time()
+        unsafe = request.method in self.UNSAFE_METHODS
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > now
+        except ValueError:
+            sticky = False
+
+        pinned_token = _pinned.set(unsafe or sticky)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if unsafe:
+                seconds = getattr(settings, 'DATABASE_STICKY_SECONDS', 10)
+                response.set_cookie(
+                    STICKY_COOKIE,
+                    str(int(now + seconds)),
+                    max_age=seconds,
+                    httponly=True,
+                    samesite='Lax',
+                    secure=request.is_secure(),
+                )
+            return response
+        finally:
+            _wrote.reset(wrote_token)
+            _pinned.reset(pinned_token)
@@ -0,0 +1,364 @@
+"""
+Finding and Merging Duplicate Locations
+
+Anyone can add a Location, so the same venue ends up in the table more
+than once: "The Witch House" at "310 Essex Street" and "Witch House" at
+"310 Essex St.". Comparing every location with every other one is
+quadratic (a million locations is half a trillion pairs), so
+find_duplicates() only compares likely pairs:
+
+1. Blocking. Locations are read in geo_cell order (core/geo.py, indexed),
+   one grid cell at a time, and split by normalized state and city. Only
+   locations in the same block are compared, plus locations within
+   MAX_DISTANCE_M of the edge of a neighbouring cell. Locations without
+   coordinates share one "cell" per city; run `manage.py
+   geocode_locations` first to place them.
+2. Candidates. Inside a block, two locations are only compared if they
+   share a name word (its first four letters, so "Horror" and "Horrors"
+   match) or the same house number and street. Words that most of the
+   block has ("haunted") are ignored.
+3. Scoring. Pairs more than MAX_DISTANCE_M apart, or with different house
+   numbers, are dropped. The rest get a name and an address similarity
+   (difflib), and pairs scoring at least THRESHOLD become a
+   LocationMergeProposal for the admin to merge or reject.
+
+merge_locations() then repoints the duplicates' Events, Businesses and
+HauntedPlaces with one UPDATE per model, and deletes them.
+
+Example:
+    >>> stats = find_duplicates()
+    >>> stats['proposals']
+    42
+    >>> merge_locations(LocationMergeProposal.objects.filter(status='pending', score__gte=0.95))
+    40
+"""
+
+import logging
+import math
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Case, When
+from django.utils import timezone
+
+from .geo import CELL_SIZE_DEG, EARTH_RADIUS_KM, _KM_PER_DEGREE_LAT, cell_for
+from .geocoding import STREET_WORDS, normalize_city, normalize_state
+from .models import Business, Event, HauntedPlace, Location, LocationMergeProposal
+
+logger = logging.getLogger(__name__)
+
+# Lowest combined score that is proposed for merging
+THRESHOLD = 0.8
+# Name similarity counts this much of the score, the address the rest
+NAME_WEIGHT = 0.65
+# Locations further apart than this aren't the same place
+MAX_DISTANCE_M = 250
+# Name words shared by more locations of a block than this don't make pairs
+MAX_WORD_LOCATIONS = 50
+# Locations read per query
+READ_CHUNK = 5000
+
+NAME_STOPWORDS = {'the', 'a', 'an', 'of', 'and', 'at', 'in', 'on'}
+
+_NOT_WORD = re.compile(r'[^0-9a-z]+')
+
+
+class MergeConflict(Exception):
+    """Two locations can't be merged (both have a HauntedPlace)."""
+
+
+# ================================================================
+# NORMALIZING
+# ================================================================
+
+def name_words(name):
+    """Lowercase words of a name, without 'the', 'of', ..."""
+    words = _NOT_WORD.sub(' ', (name or '').lower().replace('&', ' and ')).split()
+    return [word for word in words if word not in NAME_STOPWORDS]
+
+
+def street_parts(address):
+    """(house number, rest of the street) of an address line: ('310', 'essex st')."""
+    words = [STREET_WORDS.get(word, word) for word in _NOT_WORD.sub(' ', (address or '').lower()).split()]
+    if words and words[0].isdigit():
+        return words[0], ' '.join(words[1:])
+    return '', ' '.join(words)
+
+
+class Candidate:
+    """What find_duplicates() keeps of a location while it's in its block."""
+
+    __slots__ = ('pk', 'name', 'words', 'number', 'street', 'lat', 'lon', 'is_verified')
+
+    def __init__(self, pk, name, address, latitude, longitude, is_verified):
+        self.pk = pk
+        words = name_words(name)
+        # Sorted, so "Manor Haunted" and "Haunted Manor" compare equal
+        self.name = ' '.join(sorted(words))
+        self.words = {word[:4] for word in words if len(word) > 2 or word.isdigit()}
+        self.number, self.street = street_parts(address)
+        self.lat = None if latitude is None else float(latitude)
+        self.lon = None if longitude is None else float(longitude)
+        self.is_verified = is_verified
+
+    def blocking_keys(self):
+        keys = {('name', word) for word in self.words}
+        if self.number and self.street:
+            keys.add(('address', self.number, self.street.split()[0]))
+        return keys
+
+
+# ================================================================
+# SCORING
+# ================================================================
+
+def distance_m(a, b):
+    """Metres between two nearby candidates (flat-earth approximation), or None."""
+    if a.lat is None or b.lat is None:
+        return None
+    x = math.radians(b.lon - a.lon) * math.cos(math.radians((a.lat + b.lat) / 2))
+    y = math.radians(b.lat - a.lat)
+    return math.hypot(x, y) * EARTH_RADIUS_KM * 1000
+
+
+def similarity(a, b):
+    """0..1 ratio of two strings (0 if they're hardly alike)."""
+    if a == b:
+        return 1.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    # quick_ratio() is an upper bound and much cheaper; skip hopeless pairs
+    if matcher.quick_ratio() < 0.5:
+        return 0.0
+    return matcher.ratio()
+
+
+def score_pair(a, b, threshold=THRESHOLD):
+    """(score, name score, address score), or None if they can't reach `threshold`."""
+    if a.number and b.number and a.number != b.number:
+        return None
+    distance = distance_m(a, b)
+    if distance is not None and distance > MAX_DISTANCE_M:
+        return None
+    name_score = similarity(a.name, b.name)
+    if NAME_WEIGHT * name_score + (1 - NAME_WEIGHT) < threshold:
+        return None  # even a perfect address wouldn't be enough
+    address_score = similarity(a.street, b.street) if a.street and b.street else 0.5
+    return NAME_WEIGHT * name_score + (1 - NAME_WEIGHT) * address_score, name_score, address_score
+
+
+def block_pairs(candidates, local=None):
+    """
+    Pairs of candidates in one block worth scoring (each pair once).
+
+    With `local`, only the first `local` candidates are this block's own;
+    the rest come from a neighbouring cell, and pairs of two of those
+    aren't returned (they were compared in their own cell).
+    """
+    local = len(candidates) if local is None else local
+    index = defaultdict(list)
+    for position, candidate in enumerate(candidates):
+        for key in candidate.blocking_keys():
+            index[key].append(position)
+    pairs = set()
+    for positions in index.values():
+        if len(positions) < 2 or len(positions) > MAX_WORD_LOCATIONS:
+            continue
+        for i, first in enumerate(positions):
+            if first >= local:
+                break  # positions are in order, so the rest are neighbours too
+            for second in positions[i + 1:]:
+                pairs.add((first, second))
+    return pairs
+
+
+def neighbour_cells(candidate):
+    """Other cells within MAX_DISTANCE_M of a candidate (usually none)."""
+    if candidate.lat is None:
+        return set()
+    margin_lat = MAX_DISTANCE_M / 1000 / _KM_PER_DEGREE_LAT
+    margin_lon = margin_lat / max(math.cos(math.radians(candidate.lat)), 1e-6)
+    # Cheap check first: most locations aren't near an edge of their cell
+    lat_in_cell = (candidate.lat / CELL_SIZE_DEG) % 1
+    lon_in_cell = (candidate.lon / CELL_SIZE_DEG) % 1
+    if (margin_lat / CELL_SIZE_DEG < lat_in_cell < 1 - margin_lat / CELL_SIZE_DEG
+            and margin_lon / CELL_SIZE_DEG < lon_in_cell < 1 - margin_lon / CELL_SIZE_DEG):
+        return set()
+    cells = {
+        cell_for(candidate.lat + lat, candidate.lon + lon)
+        for lat in (-margin_lat, 0, margin_lat) for lon in (-margin_lon, 0, margin_lon)
+    }
+    return cells - {cell_for(candidate.lat, candidate.lon)}
+
+
+def keeper(a, b):
+    """(keep, duplicate): the verified one, or else the older one, is kept."""
+    if (not a.is_verified, a.pk) <= (not b.is_verified, b.pk):
+        return a, b
+    return b, a
+
+
+# ================================================================
+# FINDING DUPLICATES
+# ================================================================
+
+def _cells(queryset):
+    """Yield (geo_cell, location rows), one cell at a time."""
+    rows = queryset.order_by('geo_cell').values_list(
+        'geo_cell', 'pk', 'name', 'address', 'city', 'state', 'latitude', 'longitude', 'is_verified',
+    ).iterator(chunk_size=READ_CHUNK)
+    for cell, cell_rows in groupby(rows, key=lambda row: row[0]):
+        yield cell, list(cell_rows)
+
+
+def find_duplicates(queryset=None, threshold=THRESHOLD):
+    """
+    Propose merging likely duplicate locations.
+
+    New proposals are saved as pending; pairs that already have a
+    proposal (pending or rejected) are left as they are. Returns counts:
+    locations, blocks, pairs (scored), proposals (new).
+    """
+    queryset = Location.objects.all() if queryset is None else queryset
+    stats = dict.fromkeys(['locations', 'blocks', 'pairs', 'proposals'], 0)
+    found = []
+    # Locations near the edge of a finished cell, waiting for the
+    # neighbouring cell: {cell: {block: [candidates]}}
+    waiting = defaultdict(lambda: defaultdict(list))
+    done = set()
+    for cell, rows in _cells(queryset):
+        stats['locations'] += len(rows)
+        blocks = defaultdict(list)
+        for _, pk, name, address, city, state, latitude, longitude, is_verified in rows:
+            blocks[normalize_state(state), normalize_city(city)].append(
+                Candidate(pk, name, address, latitude, longitude, is_verified)
+            )
+        neighbours = waiting.pop(cell, {})
+        for block, candidates in blocks.items():
+            stats['blocks'] += 1
+            local = len(candidates)
+            candidates += neighbours.get(block, [])
+            for first, second in block_pairs(candidates, local):
+                stats['pairs'] += 1
+                scores = score_pair(candidates[first], candidates[second], threshold)
+                if scores and scores[0] >= threshold:
+                    keep, duplicate = keeper(candidates[first], candidates[second])
+                    found.append((keep.pk, duplicate.pk, scores))
+            for candidate in candidates[:local]:
+                for other_cell in neighbour_cells(candidate) - done:
+                    waiting[other_cell][block].append(candidate)
+        done.add(cell)
+        if len(found) >= READ_CHUNK:
+            stats['proposals'] += _save_proposals(found)
+            found = []
+    stats['proposals'] += _save_proposals(found)
+    return stats
+
+
+def _save_proposals(found):
+    """Save new proposals; returns how many were new."""
+    if not found:
+        return 0
+    pairs = [(keep, duplicate) for keep, duplicate, _ in found]
+    existing = set(
+        LocationMergeProposal.objects.filter(
+            keep_id__in={keep for keep, _ in pairs}, duplicate_id__in={duplicate for _, duplicate in pairs},
+        ).values_list('keep_id', 'duplicate_id')
+    )
+    new = [
+        LocationMergeProposal(
+            keep_id=keep, duplicate_id=duplicate,
+            score=round(score, 4), name_score=round(name_score, 4), address_score=round(address_score, 4),
+        )
+        for keep, duplicate, (score, name_score, address_score) in found
+        if (keep, duplicate) not in existing
+    ]
+    # ignore_conflicts: a concurrent run may have proposed the same pair
+    LocationMergeProposal.objects.bulk_create(new, ignore_conflicts=True, batch_size=1000)
+    return len(new)
+
+
+# ================================================================
+# MERGING
+# ================================================================
+
+def _resolve(mapping):
+    """Follow chains (C -> B -> A becomes C -> A); drops cycles."""
+    resolved = {}
+    for duplicate in mapping:
+        seen, target = {duplicate}, mapping[duplicate]
+        while target in mapping and target not in seen:
+            seen.add(target)
+            target = mapping[target]
+        if target not in seen:
+            resolved[duplicate] = target
+    return resolved
+
+
+@transaction.atomic
+def merge_locations(proposals):
+    """
+    Merge each pending proposal's duplicate into the location it keeps.
+
+    Events, Businesses and HauntedPlaces are moved with one UPDATE per
+    model, gaps in the kept location (ZIP code, coordinates, description)
+    are filled from the duplicate, and the duplicates are deleted, with
+    their other proposals. Raises MergeConflict, merging nothing, if a
+    duplicate and the location it goes into both have a HauntedPlace.
+    Returns how many locations were merged away.
+    """
+    mapping = _resolve(dict(proposals.filter(status='pending').values_list('duplicate_id', 'keep_id')))
+    if not mapping:
+        return 0
+
+    haunted = defaultdict(list)
+    for location_id in HauntedPlace.objects.filter(location_id__in=[*mapping, *mapping.values()]).values_list(
+        'location_id', flat=True,
+    ):
+        haunted[mapping.get(location_id, location_id)].append(location_id)
+    clashes = sorted(target for target, location_ids in haunted.items() if len(location_ids) > 1)
+    if clashes:
+        raise MergeConflict(f'Location(s) {clashes} would end up with more than one haunted place')
+
+    new_location = Case(*[When(location_id=duplicate, then=keep) for duplicate, keep in mapping.items()])
+    Event.objects.filter(location_id__in=mapping).update(location_id=new_location)
+    Business.objects.filter(location_id__in=mapping).update(location_id=new_location)
+    HauntedPlace.objects.filter(location_id__in=mapping).update(location_id=new_location)
+
+    # Locations a haunted place moved into, as if they had moved, so
+    # proximity indexes (core/proximity.py) pick up the new coordinates
+    arrivals = {target for target, location_ids in haunted.items() if any(pk in mapping for pk in location_ids)}
+    _fill_gaps(mapping, arrivals)
+    Location.objects.filter(pk__in=mapping).delete()
+    logger.info('Merged locations %s', mapping)
+    return len(mapping)
+
+
+def _fill_gaps(mapping, arrivals=()):
+    """
+    Copy fields the kept locations are missing from their duplicates, and
+    stamp moved_date on the kept locations in `arrivals`.
+    """
+    locations = Location.objects.in_bulk([*mapping, *mapping.values()])
+    changed = {}
+    for duplicate_id, keep_id in mapping.items():
+        keep, duplicate = changed.get(keep_id, locations[keep_id]), locations[duplicate_id]
+        if keep.latitude is None and duplicate.latitude is not None:
+            keep.latitude, keep.longitude = duplicate.latitude, duplicate.longitude
+            keep.geocode_precision = duplicate.geocode_precision
+        for field in ('zip_code', 'description'):
+            if not getattr(keep, field) and getattr(duplicate, field):
+                setattr(keep, field, getattr(duplicate, field))
+        keep.is_verified = keep.is_verified or duplicate.is_verified
+        changed[keep_id] = keep
+    for keep_id, keep in changed.items():
+        if keep_id in arrivals:
+            keep.moved_date = timezone.now()
+        keep.save()
+
+
+def reject_proposals(proposals):
+    """Mark proposals as not duplicates, so find_duplicates() doesn't propose them again."""
+    return proposals.filter(status='pending').update(status='rejected', reviewed_at=timezone.now())
@@ -0,0 +1,90 @@
+"""
+Geographic Helpers for ShriekedIn
+
+Small, dependency-free tools for "near me" queries.
+
+Grid cells:
+    The world is cut into squares of CELL_SIZE_DEG degrees (0.1° is about
+    11 km north-south). Every Location stores the key of the square it sits
+    in (Location.geo_cell, indexed). A radius search first asks the
+    database for locations in the few cells that cover the search circle
+    (an indexed IN lookup), then measures exact distances in Python for
+    that short list only.
+
+Example:
+    >>> cell_for(42.5195, -70.8967)          # Salem, MA
+    '425:-709'
+    >>> haversine_km(42.5195, -70.8967, 42.3601, -71.0589)
+    22.1...
+"""
+
+import math
+
+
+# Size of one grid cell in degrees (latitude and longitude)
+CELL_SIZE_DEG = 0.1
+
+# Mean Earth radius used for distances
+EARTH_RADIUS_KM = 6371.0088
+
+# Longer searches than this cover too many cells to be worth listing;
+# callers should fall back to a latitude/longitude bounding box
+MAX_COVERING_CELLS = 400
+
+_KM_PER_DEGREE_LAT = 111.32
+_LON_CELLS = round(360 / CELL_SIZE_DEG)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _lat_index(lat):
+    return math.floor(float(lat) / CELL_SIZE_DEG)
+
+
+def _lon_index(lon):
+    # Wrap so that 180°E and 180°W land in the same column
+    return (math.floor(float(lon) / CELL_SIZE_DEG) + _LON_CELLS // 2) % _LON_CELLS - _LON_CELLS // 2
+
+
+def cell_for(lat, lon):
+    """Grid cell key for a point, or '' if the point has no coordinates."""
+    if lat is None or lon is None:
+        return ''
+    return f'{_lat_index(lat)}:{_lon_index(lon)}'
+
+
+def bounding_box(lat, lon, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) of a box that contains the search circle."""
+    lat = float(lat)
+    lon = float(lon)
+    lat_delta = radius_km / _KM_PER_DEGREE_LAT
+    # Longitude degrees shrink towards the poles
+    cos_lat = max(math.cos(math.radians(min(89.9, abs(lat) + lat_delta))), 1e-6)
+    lon_delta = min(180.0, radius_km / (_KM_PER_DEGREE_LAT * cos_lat))
+    return lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta
+
+
+def cells_covering(lat, lon, radius_km):
+    """
+    Keys of every grid cell that overlaps the circle around (lat, lon).
+
+    Returns None when that would be more than MAX_COVERING_CELLS cells;
+    use bounding_box() for such wide searches instead.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    lat_range = range(_lat_index(max(-90.0, min_lat)), _lat_index(min(90.0, max_lat)) + 1)
+    lon_start = math.floor(min_lon / CELL_SIZE_DEG)
+    lon_stop = math.floor(max_lon / CELL_SIZE_DEG)
+    if len(lat_range) * (lon_stop - lon_start + 1) > MAX_COVERING_CELLS:
+        return None
+
+    lon_indexes = {_lon_index((i + 0.5) * CELL_SIZE_DEG) for i in range(lon_start, lon_stop + 1)}
+    return [f'{lat_i}:{lon_i}' for lat_i in lat_range for lon_i in sorted(lon_indexes)]
@@ -0,0 +1,300 @@
+"""
+Offline Geocoding for ShriekedIn
+
+Gives Locations coordinates from their address without calling any
+outside service, so it works the same on a laptop, in CI and in a
+request. Precise enough for "near me" lists and the map, not for
+directions:
+
+1. The address is normalized: lowercase, punctuation dropped, common
+   words shortened ("Street" -> "st"), state names turned into their
+   two-letter code and the ZIP cut to five digits. "1 Elm Street, Salem,
+   Massachusetts 01970-1234" and "1 elm st salem MA 01970" are the same
+   address.
+2. Each normalized address is looked up in GeocodedAddress, the cache of
+   earlier answers (also the ones that found nothing).
+3. Anything not cached is looked up in the gazetteer: the centre of its
+   ZIP code if we know it, otherwise the centre of its city. The
+   gazetteer is a GeoNames postal code file loaded into GazetteerPlace by
+   `manage.py load_gazetteer` (settings.GAZETTEER_PATH).
+
+Everything works a batch at a time: one cache query and one gazetteer
+query per batch, however many addresses it has. `manage.py
+geocode_locations` runs batches of Locations without coordinates in
+parallel worker processes.
+
+Example:
+    >>> geocode('1 Elm Street', 'Salem', 'Massachusetts', '01970')
+    GeocodeResult(latitude=Decimal('42.513900'), longitude=Decimal('-70.902300'), precision='zip', cached=False)
+"""
+
+import csv
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .geo import cell_for
+from .models import GazetteerPlace, GeocodedAddress, Location
+from .scale_data import insert_rows
+
+# Locations geocoded per batch (one transaction each)
+BATCH_SIZE = 1000
+
+US_STATES = {
+    'alabama': 'al', 'alaska': 'ak', 'arizona': 'az', 'arkansas': 'ar', 'california': 'ca',
+    'colorado': 'co', 'connecticut': 'ct', 'delaware': 'de', 'district of columbia': 'dc',
+    'florida': 'fl', 'georgia': 'ga', 'hawaii': 'hi', 'idaho': 'id', 'illinois': 'il',
+    'indiana': 'in', 'iowa': 'ia', 'kansas': 'ks', 'kentucky': 'ky', 'louisiana': 'la',
+    'maine': 'me', 'maryland': 'md', 'massachusetts': 'ma', 'michigan': 'mi', 'minnesota': 'mn',
+    'mississippi': 'ms', 'missouri': 'mo', 'montana': 'mt', 'nebraska': 'ne', 'nevada': 'nv',
+    'new hampshire': 'nh', 'new jersey': 'nj', 'new mexico': 'nm', 'new york': 'ny',
+    'north carolina': 'nc', 'north dakota': 'nd', 'ohio': 'oh', 'oklahoma': 'ok', 'oregon': 'or',
+    'pennsylvania': 'pa', 'puerto rico': 'pr', 'rhode island': 'ri', 'south carolina': 'sc',
+    'south dakota': 'sd', 'tennessee': 'tn', 'texas': 'tx', 'utah': 'ut', 'vermont': 'vt',
+    'virginia': 'va', 'washington': 'wa', 'west virginia': 'wv', 'wisconsin': 'wi', 'wyoming': 'wy',
+}
+US_NAMES = {'us', 'usa', 'united states', 'united states of america', 'america'}
+
+# Street words written out or abbreviated, reduced to one spelling
+STREET_WORDS = {
+    'avenue': 'ave', 'boulevard': 'blvd', 'court': 'ct', 'drive': 'dr', 'highway': 'hwy',
+    'lane': 'ln', 'parkway': 'pkwy', 'place': 'pl', 'road': 'rd', 'square': 'sq',
+    'street': 'st', 'terrace': 'ter', 'turnpike': 'tpke',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+# First word of a city name: "St. Augustine" is "Saint Augustine"
+CITY_PREFIXES = {'st': 'saint', 'ste': 'sainte', 'mt': 'mount', 'ft': 'fort'}
+
+_NOT_WORD = re.compile(r'[^0-9a-z]+')
+_ZIP = re.compile(r'\d{5}')
+
+
+@dataclass(frozen=True)
+class Address:
+    """A normalized address; equal addresses geocode the same."""
+    street: str
+    city: str
+    state: str  # two-letter code for US states
+    zip_code: str  # five digits, or ''
+    country: str  # 'us' for the United States
+
+    def __str__(self):
+        return ', '.join(part for part in (self.street, self.city, self.state, self.zip_code, self.country) if part)
+
+    @property
+    def key(self):
+        return hashlib.sha256(str(self).encode()).hexdigest()
+
+    def gazetteer_keys(self):
+        """GazetteerPlace keys to try, most precise first."""
+        if self.country != 'us':
+            return []
+        keys = []
+        if self.zip_code:
+            keys.append(('zip', f'zip:{self.zip_code}'))
+        if self.city and self.state:
+            keys.append(('city', f'city:{self.state}:{self.city}'))
+        return keys
+
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    latitude: Decimal = None
+    longitude: Decimal = None
+    precision: str = ''  # 'zip', 'city' or '' (not found)
+    cached: bool = False
+
+    @property
+    def found(self):
+        return self.latitude is not None
+
+
+# ================================================================
+# NORMALIZING
+# ================================================================
+
+def _words(text):
+    return _NOT_WORD.sub(' ', (text or '').lower()).split()
+
+
+def normalize_city(city):
+    words = _words(city)
+    if words and words[0] in CITY_PREFIXES:
+        words[0] = CITY_PREFIXES[words[0]]
+    return ' '.join(words)
+
+
+def normalize_state(state):
+    name = ' '.join(_words(state))
+    return US_STATES.get(name, name)
+
+
+def normalize_address(address, city, state, zip_code='', country='USA'):
+    """Address from a Location's fields."""
+    zip_match = _ZIP.match((zip_code or '').strip())
+    country = ' '.join(_words(country))
+    return Address(
+        street=' '.join(STREET_WORDS.get(word, word) for word in _words(address)),
+        city=normalize_city(city),
+        state=normalize_state(state),
+        zip_code=zip_match.group() if zip_match else '',
+        country='us' if country in US_NAMES or not country else country,
+    )
+
+
+# ================================================================
+# GEOCODING
+# ================================================================
+
+def geocode(address, city, state, zip_code='', country='USA'):
+    """GeocodeResult for one address (see geocode_addresses for many)."""
+    normalized = normalize_address(address, city, state, zip_code, country)
+    return geocode_addresses([normalized])[normalized]
+
+
+def geocode_addresses(addresses):
+    """
+    {Address: GeocodeResult} for normalized addresses.
+
+    One query for the cache and, if anything wasn't cached, one for the
+    gazetteer and one to cache the new answers.
+    """
+    addresses = set(addresses)
+    by_key = {address.key: address for address in addresses}
+    results = {}
+    for row in GeocodedAddress.objects.filter(address_key__in=by_key).values(
+        'address_key', 'latitude', 'longitude', 'precision',
+    ):
+        results[by_key[row['address_key']]] = GeocodeResult(
+            row['latitude'], row['longitude'], row['precision'], cached=True,
+        )
+
+    missing = [address for address in addresses if address not in results]
+    if not missing:
+        return results
+
+    wanted = {key for address in missing for _, key in address.gazetteer_keys()}
+    places = {
+        key: (latitude, longitude)
+        for key, latitude, longitude in GazetteerPlace.objects.filter(key__in=wanted).values_list(
+            'key', 'latitude', 'longitude',
+        )
+    }
+    for address in missing:
+        results[address] = next(
+            (GeocodeResult(*places[key], precision) for precision, key in address.gazetteer_keys() if key in places),
+            GeocodeResult(),
+        )
+
+    # ignore_conflicts: another worker may have cached the same address meanwhile
+    GeocodedAddress.objects.bulk_create([
+        GeocodedAddress(
+            address_key=address.key, address=str(address), precision=results[address].precision,
+            latitude=results[address].latitude, longitude=results[address].longitude,
+        )
+        for address in missing
+    ], ignore_conflicts=True)
+    return results
+
+
+def geocode_locations(pks):
+    """
+    Geocode these Locations and save the coordinates that were found.
+
+    Returns {'zip': n, 'city': n, 'not_found': n, 'cached': n}. Run in
+    worker processes by `manage.py geocode_locations`.
+    """
+    locations = Location.objects.filter(pk__in=pks).values_list(
+        'pk', 'address', 'city', 'state', 'zip_code', 'country', 'latitude', 'longitude', 'geocode_precision',
+    )
+    addresses, current = {}, {}
+    for pk, address, city, state, zip_code, country, *coordinates in locations:
+        addresses[pk] = normalize_address(address, city, state, zip_code, country)
+        current[pk] = tuple(coordinates)
+
+    counts = dict.fromkeys(['zip', 'city', 'not_found', 'cached'], 0)
+    with transaction.atomic():
+        results = geocode_addresses(addresses.values())
+        # Many locations share a ZIP or city centre, so there's one UPDATE
+        # per centre rather than a bulk_update(), whose CASE per row took
+        # about 95% of the time
+        changed = defaultdict(list)
+        now = timezone.now()
+        for pk, address in addresses.items():
+            result = results[address]
+            counts[result.precision or 'not_found'] += 1
+            counts['cached'] += result.cached
+            found = (result.latitude, result.longitude, result.precision)
+            if result.found and current[pk] != found:
+                changed[found].append(pk)
+        for (latitude, longitude, precision), changed_pks in changed.items():
+            # Set by hand: update() skips Location.save()
+            Location.objects.filter(pk__in=changed_pks).update(
+                latitude=latitude, longitude=longitude, geo_cell=cell_for(latitude, longitude),
+                geocode_precision=precision, moved_date=now,
+            )
+    return counts
+
+
+# ================================================================
+# LOADING THE GAZETTEER
+# ================================================================
+
+def read_gazetteer(path):
+    """
+    GazetteerPlace rows from a GeoNames postal code file (US.txt).
+
+    Tab-separated: country, postal code, place name, state name, state
+    code, county name, county code, community name, community code,
+    latitude, longitude, accuracy. Cities get the average of their ZIP
+    codes' centres.
+    """
+    places = {}
+    city_points = defaultdict(list)
+    city_names = {}
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE):
+            if len(row) < 11 or row[0] != 'US':
+                continue
+            zip_match = _ZIP.match(row[1])
+            state = normalize_state(row[4] or row[3])
+            latitude, longitude = float(row[9]), float(row[10])
+            if zip_match:
+                places[f'zip:{zip_match.group()}'] = (row[2], state, latitude, longitude)
+            city = normalize_city(row[2])
+            if city and state:
+                key = f'city:{state}:{city}'
+                city_points[key].append((latitude, longitude))
+                city_names.setdefault(key, (row[2], state))
+
+    for key, points in city_points.items():
+        places[key] = (
+            *city_names[key],
+            sum(latitude for latitude, _ in points) / len(points),
+            sum(longitude for _, longitude in points) / len(points),
+        )
+    return [
+        (key, name, state, f'{latitude:.6f}', f'{longitude:.6f}')
+        for key, (name, state, latitude, longitude) in places.items()
+    ]
+
+
+def load_gazetteer(path):
+    """
+    Replace the gazetteer with the places in `path`. Returns how many.
+
+    Cached geocoding results are dropped too, since they may now come out
+    differently.
+    """
+    rows = read_gazetteer(path)
+    with transaction.atomic():
+        GeocodedAddress.objects.all().delete()
+        GazetteerPlace.objects.all().delete()
+        with connection.cursor() as cursor:
+            insert_rows(cursor, GazetteerPlace._meta.db_table, ['key', 'name', 'state', 'latitude', 'longitude'], rows)
+    return len(rows)
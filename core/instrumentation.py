@@ -0,0 +1,271 @@
+"""
+Request Instrumentation for ShriekedIn
+
+Records how much work each view does, grouped by URL name:
+- Number of SQL queries and total SQL time
+- The slowest SQL statements
+- Template render time
+- Response size and total request time
+
+Metrics live in a rolling in-memory window per worker process, so they
+cost nothing to store and reset on every deploy. Staff can see them on the
+performance panel (linked from the dashboard).
+
+Pieces:
+- RequestInstrumentationMiddleware: measures each request
+- InstrumentedDjangoTemplates: template backend that times rendering
+- metrics_window(): the per-process MetricsWindow
+- assert_max_queries(): test helper that pins query counts and points
+  at N+1 patterns when the budget is exceeded
+"""
+
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+
+_local = threading.local()
+
+
+# ================================================================
+# METRICS STORAGE
+# ================================================================
+
+@dataclass
+class RequestMetrics:
+    """Measurements for a single request."""
+    url_name: str
+    method: str
+    status: int
+    duration_ms: float
+    query_count: int
+    sql_ms: float
+    template_ms: float
+    response_bytes: int
+    slow_queries: list = field(default_factory=list)  # [(ms, sql), ...]
+
+
+class MetricsWindow:
+    """
+    Keeps the most recent requests for each URL name.
+
+    Each URL name gets its own fixed-size deque, so a busy route never
+    pushes a quiet route's samples out of the window.
+    """
+
+    def __init__(self, size=200):
+        self.size = size
+        self._requests = defaultdict(lambda: deque(maxlen=self.size))
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        with self._lock:
+            self._requests[metrics.url_name].append(metrics)
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+
+    def summary(self, slowest=5):
+        """Return one summary dict per URL name, busiest SQL first."""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._requests.items()}
+
+        rows = []
+        for url_name, samples in snapshot.items():
+            durations = sorted(m.duration_ms for m in samples)
+            statements = sorted(
+                (query for m in samples for query in m.slow_queries),
+                key=lambda query: query[0],
+                reverse=True,
+            )
+            count = len(samples)
+            rows.append({
+                'url_name': url_name,
+                'requests': count,
+                'avg_ms': sum(durations) / count,
+                'p95_ms': durations[min(count - 1, int(count * 0.95))],
+                'avg_queries': sum(m.query_count for m in samples) / count,
+                'max_queries': max(m.query_count for m in samples),
+                'avg_sql_ms': sum(m.sql_ms for m in samples) / count,
+                'avg_template_ms': sum(m.template_ms for m in samples) / count,
+                'avg_bytes': sum(m.response_bytes for m in samples) / count,
+                'slowest_queries': statements[:slowest],
+            })
+        return sorted(rows, key=lambda row: row['avg_sql_ms'] * row['requests'], reverse=True)
+
+
+_window = None
+_window_lock = threading.Lock()
+
+
+def metrics_window():
+    """Return this process's MetricsWindow, creating it on first use."""
+    global _window
+    if _window is None:
+        with _window_lock:
+            if _window is None:
+                _window = MetricsWindow(getattr(settings, 'INSTRUMENTATION_WINDOW_SIZE', 200))
+    return _window
+
+
+# ================================================================
+# SQL AND TEMPLATE TIMING
+# ================================================================
+
+class QueryCollector:
+    """
+    Database execute wrapper that counts and times every query.
+
+    Only the slowest statements are kept, so memory stays flat even for
+    views that run thousands of queries.
+    """
+
+    def __init__(self, keep_slowest=5):
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if len(self.slowest) < self.keep_slowest or elapsed_ms > self.slowest[-1][0]:
+                self.slowest.append((elapsed_ms, sql))
+                self.slowest.sort(key=lambda query: query[0], reverse=True)
+                del self.slowest[self.keep_slowest:]
+
+
+class InstrumentedTemplate:
+    """Wraps a backend template and adds its render time to the current request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            _local.template_ms = getattr(_local, 'template_ms', 0.0) + (time.perf_counter() - started) * 1000
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend that times every top-level render.
+
+    Configure it as the TEMPLATES 'BACKEND'. Includes and {% extends %}
+    render inside the top-level template, so they are counted once.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name))
+
+
+# ================================================================
+# MIDDLEWARE
+# ================================================================
+
+class RequestInstrumentationMiddleware:
+    """
+    Records query count, SQL time, template time and response size per request.
+
+    Only used with REQUEST_INSTRUMENTATION = True in settings (the default
+    when DEBUG is on).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.keep_slowest = getattr(settings, 'INSTRUMENTATION_SLOW_QUERY_COUNT', 5)
+
+    def __call__(self, request):
+        collector = QueryCollector(keep_slowest=self.keep_slowest)
+        _local.template_ms = 0.0
+        started = time.perf_counter()
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(collector))
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        metrics_window().record(RequestMetrics(
+            url_name=match.view_name if match else '<unresolved>',
+            method=request.method,
+            status=response.status_code,
+            duration_ms=(time.perf_counter() - started) * 1000,
+            query_count=collector.count,
+            sql_ms=collector.total_ms,
+            template_ms=_local.template_ms,
+            response_bytes=0 if response.streaming else len(response.content),
+            slow_queries=collector.slowest,
+        ))
+        return response
+
+
+# ================================================================
+# TEST HELPER
+# ================================================================
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize_sql(sql):
+    """Replace literal values so repeated statements group together."""
+    return _LITERALS.sub('?', sql)
+
+
+@contextmanager
+def assert_max_queries(limit, using='default', max_repeats=None):
+    """
+    Fail if the block runs more than `limit` queries.
+
+    Unlike assertNumQueries, the failure message groups statements by
+    shape, so an N+1 loop shows up as one statement repeated N times.
+    Pass max_repeats to also fail when any single statement shape runs
+    more often than that, even within the overall budget.
+
+    Example:
+        with assert_max_queries(5, max_repeats=1):
+            self.client.get(reverse('core:businesses_list'))
+    """
+    # Imported here: django.test is a test-only dependency and slow to import,
+    # and this module is loaded by every web worker at start-up
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+
+    repeated = Counter(normalize_sql(query['sql']) for query in captured.captured_queries)
+    worst_sql, worst_count = repeated.most_common(1)[0] if repeated else ('', 0)
+    too_many = len(captured) > limit
+    too_repetitive = max_repeats is not None and worst_count > max_repeats
+
+    if too_many or too_repetitive:
+        lines = [f'{count}x {sql}' for sql, count in repeated.most_common(5)]
+        reason = (
+            f'{len(captured)} queries executed, limit is {limit}' if too_many
+            else f'a statement ran {worst_count} times, limit is {max_repeats}'
+        )
+        raise AssertionError(f'{reason}. Most repeated statements:\n' + '\n'.join(lines))
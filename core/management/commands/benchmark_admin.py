@@ -0,0 +1,132 @@
+import statistics
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from core.admin_mixins import FastChangeListMixin
+from core.benchmarks import BENCHMARK_SETTINGS, percentile
+from core.stats import estimate_row_count
+
+
+@contextmanager
+def django_defaults(model_admin):
+    """Temporarily turn FastChangeListMixin off on one admin, for comparison."""
+    overrides = {
+        'paginator': Paginator,
+        'show_full_result_count': True,
+        'change_list_template': None,
+        'get_list_select_related': partial(admin.ModelAdmin.get_list_select_related, model_admin),
+    }
+    for name, value in overrides.items():
+        setattr(model_admin, name, value)
+    try:
+        yield
+    finally:
+        for name in overrides:
+            delattr(model_admin, name)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark admin changelist pages against the data already in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='models',
+            help='Only this model, as app_label.model_name (repeatable, default: every admin)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10,
+            help='Requests per changelist (default: 10)',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help="Also measure each page with Django's default changelist behaviour",
+        )
+
+    def handle(self, *args, **options):
+        model_admins = self.selected_admins(options['models'])
+        client = Client()
+
+        self.stdout.write(f'🎃 Admin changelists on "{connection.settings_dict["NAME"]}" ({connection.vendor})')
+        self.stdout.write(f'  {"Changelist":<28} {"Rows":>11} {"":>8} {"p50":>9} {"p95":>9} {"Queries":>8}')
+
+        # Unlike benchmark_routes this reads the real data, so the temporary
+        # superuser and its session are rolled back at the end
+        setup_test_environment()
+        try:
+            with transaction.atomic(), override_settings(**BENCHMARK_SETTINGS):
+                user = User.objects.create_superuser('benchmark_admin', 'benchmark@example.com', None)
+                client.force_login(user)
+                for model, model_admin in model_admins:
+                    self.benchmark(client, model, model_admin, options['iterations'], options['compare'])
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+    def selected_admins(self, labels):
+        registered = sorted(admin.site._registry.items(), key=lambda item: item[0]._meta.label_lower)
+        if not labels:
+            return registered
+        wanted = {label.lower() for label in labels}
+        chosen = [(model, model_admin) for model, model_admin in registered if model._meta.label_lower in wanted]
+        missing = wanted - {model._meta.label_lower for model, _ in chosen}
+        if missing:
+            raise CommandError(f'No admin registered for: {", ".join(sorted(missing))}')
+        return chosen
+
+    def benchmark(self, client, model, model_admin, iterations, compare):
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        rows = estimate_row_count(model)
+        label = model._meta.label
+
+        fast = isinstance(model_admin, FastChangeListMixin)
+        runs = [('fast' if fast else 'default', None)]
+        if compare and fast:
+            # Default first, so the fast run doesn't merely profit from a warmer cache
+            runs.insert(0, ('default', django_defaults(model_admin)))
+
+        for mode, context in runs:
+            if context:
+                with context:
+                    result = self.measure(client, url, iterations)
+            else:
+                result = self.measure(client, url, iterations)
+            if result['status'] != 200:
+                self.stdout.write(self.style.ERROR(f'  {label:<28} answered {result["status"]}'))
+                return
+            self.stdout.write(
+                f'  {label:<28} {rows:>11,} {mode:>8} {result["p50_ms"]:>7.1f}ms {result["p95_ms"]:>7.1f}ms '
+                f'{result["queries"]:>8}'
+            )
+            label = ''
+
+    def measure(self, client, url, iterations):
+        client.get(url, secure=True)  # compile templates, fill caches
+        timings, queries, status = [], 0, None
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url, secure=True)
+                timings.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+            queries = max(queries, len(captured))
+        return {
+            'status': status,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': percentile(timings, 95),
+            'queries': queries,
+        }
@@ -0,0 +1,153 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from core.db_pool import checkout_metrics, connection_status
+from core.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Benchmark database connection checkouts under many concurrent request threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=64,
+            help='Concurrent request threads, like gunicorn --threads (default: 64)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Requests per thread (default: 50)',
+        )
+        parser.add_argument(
+            '--work-ms',
+            type=float,
+            default=5.0,
+            help='Non-database time per request, e.g. template rendering (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        per_thread = options['requests']
+        work_seconds = options['work_ms'] / 1000
+
+        mode = connection_status()[0]['mode']
+        self.stdout.write(
+            f'🎃 {threads} threads x {per_thread} requests on "{connection.alias}" '
+            f'({connection.vendor}, {mode} connections)'
+        )
+
+        # Start from a cold worker: no open connections, no samples
+        connection.close()
+        checkout_metrics.clear()
+
+        latencies = []
+        failures = []
+        peak = {'server_connections': None}
+        lock = threading.Lock()
+        done = threading.Event()
+        start_line = threading.Barrier(threads + 1)
+
+        def fake_request():
+            # What Django does around every request (request_started/request_finished)
+            close_old_connections()
+            started = time.perf_counter()
+            try:
+                list(Event.objects.filter(is_active=True).values_list('id', flat=True)[:20])
+                time.sleep(work_seconds)
+            finally:
+                close_old_connections()
+            return (time.perf_counter() - started) * 1000
+
+        def worker():
+            start_line.wait()
+            mine = []
+            for _ in range(per_thread):
+                try:
+                    mine.append(fake_request())
+                except Exception as error:
+                    with lock:
+                        failures.append(type(error).__name__)
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+
+        def watch_server_connections():
+            # PostgreSQL only: how many connections this database has open
+            if connection.vendor != 'postgresql':
+                return
+            from django.db import connections
+            watcher = connections.create_connection(connection.alias)
+            try:
+                while not done.is_set():
+                    with watcher.cursor() as cursor:
+                        cursor.execute(
+                            'SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()'
+                        )
+                        count = cursor.fetchone()[0] - 1  # minus the watcher itself
+                    peak['server_connections'] = max(peak['server_connections'] or 0, count)
+                    done.wait(0.05)
+            finally:
+                watcher.close()
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        watcher = threading.Thread(target=watch_server_connections)
+        for thread in pool:
+            thread.start()
+        watcher.start()
+
+        started = time.perf_counter()
+        start_line.wait()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        watcher.join()
+
+        self.report(latencies, failures, elapsed, peak['server_connections'])
+
+    def report(self, latencies, failures, elapsed, server_connections):
+        latencies.sort()
+        total = len(latencies) + len(failures)
+        status = connection_status()[0]
+        checkout = status['checkout']
+
+        def percentile(percent):
+            if not latencies:
+                return 0.0
+            return latencies[max(0, round(len(latencies) * percent / 100) - 1)]
+
+        self.stdout.write('')
+        self.stdout.write(f'  Throughput:          {total / elapsed:,.0f} requests/s ({total:,} in {elapsed:.2f}s)')
+        self.stdout.write(
+            f'  Request latency:     p50 {statistics.median(latencies) if latencies else 0:.1f} ms, '
+            f'p95 {percentile(95):.1f} ms, p99 {percentile(99):.1f} ms'
+        )
+        if checkout['checkouts']:
+            self.stdout.write(
+                f'  Checkout latency:    p50 {checkout["p50_ms"]:.2f} ms, p95 {checkout["p95_ms"]:.2f} ms, '
+                f'max {checkout["max_ms"]:.2f} ms ({checkout["checkouts"]:,} checkouts)'
+            )
+        else:
+            self.stdout.write('  Checkout latency:    not recorded (PostgreSQL only)')
+        if server_connections is not None:
+            self.stdout.write(f'  Peak DB connections: {server_connections}')
+        if status['pool']:
+            pool = status['pool']
+            queued = pool['requests_queued']
+            average_wait = pool['requests_wait_ms'] / queued if queued else 0
+            self.stdout.write(
+                f'  Pool:                size {pool["pool_size"]} (max {pool["pool_max"]}), '
+                f'{queued:,} waits averaging {average_wait:.1f} ms, {pool["requests_errors"]} timeouts'
+            )
+
+        if failures:
+            self.stdout.write(self.style.ERROR(f'  {len(failures):,} requests failed: {sorted(set(failures))}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('  No failed requests'))
@@ -0,0 +1,105 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import (
+    SIZES,
+    seed_benchmark_data,
+    run_benchmarks,
+    save_baseline,
+    load_baseline,
+    compare_with_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency, queries per request and throughput for every named route'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            choices=list(SIZES),
+            default='small',
+            help='Dataset size to seed before benchmarking (default: small)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=30,
+            help='Timed requests per route (default: 30)',
+        )
+        parser.add_argument(
+            '--route',
+            action='append',
+            dest='routes',
+            help='Only benchmark this route name, e.g. core:events_list (repeatable)',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Baseline JSON file (default: benchmarks/<size>-<database>.json)',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Write these results as the new baseline instead of comparing',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Allowed p95 slowdown before failing, as a fraction (default: 0.25)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the raw results to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        size = options['size']
+        baseline_path = Path(
+            options['baseline'] or settings.BASE_DIR / 'benchmarks' / f'{size}-{connection.vendor}.json'
+        )
+
+        # Benchmarks run in a throwaway test database so real data is never touched
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(f'🎃 Seeding "{size}" dataset...')
+            data = seed_benchmark_data(size)
+            self.stdout.write(f'⏱️  Benchmarking routes ({options["iterations"]} requests each)...')
+            results = run_benchmarks(
+                data,
+                iterations=options['iterations'],
+                route_names=options['routes'],
+                stdout=self.stdout,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            save_baseline(results, Path(options['output']))
+
+        if options['save_baseline']:
+            save_baseline(results, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f'✅ Baseline saved to {baseline_path}'))
+            return
+
+        baseline = load_baseline(baseline_path)
+        if baseline is None:
+            self.stdout.write(self.style.WARNING(
+                f'No baseline at {baseline_path}. Run with --save-baseline to create one.'
+            ))
+            return
+
+        regressions = compare_with_baseline(results, baseline, threshold=options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(f'  ✗ {regression}'))
+            raise CommandError(f'{len(regressions)} performance regression(s) against {baseline_path}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ No regressions against {baseline_path}'))
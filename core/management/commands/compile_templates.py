@@ -0,0 +1,91 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+from core.template_loaders import strip_template
+from core.warmup import template_names
+
+
+class Command(BaseCommand):
+    help = 'Compile every template (as the stripping loaders serve it) and report size and parse-time savings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='How many templates to list, biggest savings first (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        strip = getattr(settings, 'TEMPLATE_STRIP', True)
+        rows, errors = [], []
+
+        for engine in engines.all():
+            for name in template_names(engine):
+                try:
+                    source = self.read_source(engine, name)
+                except Exception as error:
+                    errors.append((name, error))
+                    continue
+                served = strip_template(source) if strip and name.endswith('.html') else source
+                try:
+                    raw_ms = self.compile_ms(engine, source)
+                    served_ms = self.compile_ms(engine, served)
+                    engine.get_template(name)  # fills the cached loader in this process
+                except Exception as error:
+                    errors.append((name, error))
+                    continue
+                rows.append((name, len(source.encode()), len(served.encode()), raw_ms, served_ms))
+
+        self.report(rows, options['top'], strip)
+
+        if errors:
+            for name, error in errors:
+                self.stderr.write(f'  ❌ {name}: {type(error).__name__}: {error}')
+            raise CommandError(f'{len(errors)} template(s) failed to compile')
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(rows)} templates compiled'))
+
+    def read_source(self, engine, name):
+        """The template's source as written on disk."""
+        for loader in engine.engine.template_loaders:
+            for inner in getattr(loader, 'loaders', [loader]):
+                for origin in inner.get_template_sources(name):
+                    try:
+                        with open(origin.name, encoding=engine.engine.file_charset) as handle:
+                            return handle.read()
+                    except FileNotFoundError:
+                        continue
+        raise FileNotFoundError(name)
+
+    def compile_ms(self, engine, source, repeat=3):
+        """Best-of-N time to lex and parse a template source."""
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            engine.engine.from_string(source)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def report(self, rows, top, strip):
+        raw_bytes = sum(row[1] for row in rows)
+        served_bytes = sum(row[2] for row in rows)
+        raw_ms = sum(row[3] for row in rows)
+        served_ms = sum(row[4] for row in rows)
+
+        state = 'on' if strip else 'off (TEMPLATE_STRIP=False)'
+        self.stdout.write(f'🎃 Stripping is {state}')
+        self.stdout.write(f'  {"Template":<44} {"Source":>9} {"Served":>9} {"Parse":>8} {"Parse":>8}')
+        self.stdout.write(f'  {"":<44} {"bytes":>9} {"bytes":>9} {"before":>8} {"after":>8}')
+        for name, before, after, before_ms, after_ms in sorted(rows, key=lambda row: row[2] - row[1])[:top]:
+            self.stdout.write(
+                f'  {name:<44} {before:>9,} {after:>9,} {before_ms:>6.2f}ms {after_ms:>6.2f}ms'
+            )
+        saved = 100 * (1 - served_bytes / raw_bytes) if raw_bytes else 0
+        self.stdout.write(
+            f'  {"All " + str(len(rows)) + " templates":<44} {raw_bytes:>9,} {served_bytes:>9,} '
+            f'{raw_ms:>6.1f}ms {served_ms:>6.1f}ms  ({saved:.0f}% smaller)'
+        )
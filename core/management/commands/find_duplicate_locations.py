@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dedup import THRESHOLD, find_duplicates
+
+
+class Command(BaseCommand):
+    help = 'Propose merging locations that look like the same place (see core/dedup.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=THRESHOLD,
+            help=f'Lowest similarity score (0-1) to propose (default: {THRESHOLD})',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError('--threshold must be between 0 and 1')
+
+        started = time.perf_counter()
+        stats = find_duplicates(threshold=options['threshold'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'  ✓ {stats["locations"]:,} locations in {stats["blocks"]:,} blocks, '
+            f'{stats["pairs"]:,} pairs compared'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {stats["proposals"]:,} new merge proposal(s) in {elapsed:.1f}s. '
+            f'Review them under Location Merge Proposals in the admin.'
+        ))
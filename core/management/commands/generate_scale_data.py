@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core.db_pool import close_pools
+from core.models import EventDailyRollup
+from core.scale_data import PRESETS, PHASES, build_plan, phase_chunks, write_chunk, reset_sequences
+
+
+class Command(BaseCommand):
+    help = 'Generate large volumes of realistic synthetic data for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            choices=list(PRESETS),
+            default='small',
+            help='Size preset: small (~100k rows), medium (~1M) or halloween_peak (~10M)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=31,
+            help='Random seed; the same seed always produces the same rows (default: 31)',
+        )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Multiply every preset row count by this factor (default: 1.0)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: one per CPU; SQLite always uses 1)',
+        )
+        parser.add_argument(
+            '--year',
+            type=int,
+            help='Year for the October event spike (default: this year)',
+        )
+        parser.add_argument(
+            '--yes',
+            action='store_true',
+            help="Don't ask for confirmation",
+        )
+
+    def handle(self, *args, **options):
+        plan = build_plan(options['size'], options['seed'], options['scale'], options['year'])
+        total = sum(plan.counts.values())
+
+        workers = max(1, options['workers'])
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write(self.style.WARNING('SQLite allows one writer at a time, using 1 worker.'))
+            workers = 1
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            workers = 1
+
+        self.stdout.write(f'🎃 Generating ~{total:,} rows ({options["size"]}, seed {plan.seed}):')
+        for table, rows in plan.counts.items():
+            self.stdout.write(f'  {table:<18} {rows:>12,}')
+        if not plan.templates:
+            self.stdout.write(self.style.WARNING(
+                'No active story templates, skipping completed Mad Libs. Run populate_madlibs first.'
+            ))
+        if not options['yes']:
+            answer = input(f'Write these rows to "{connection.settings_dict["NAME"]}"? [y/N] ')
+            if answer.lower() != 'y':
+                raise CommandError('Cancelled.')
+
+        method = 'COPY' if connection.vendor == 'postgresql' else 'batched INSERT'
+        self.stdout.write(f'Writing with {method} using {workers} worker(s)...')
+
+        started = time.perf_counter()
+        written = Counter()
+        for tables in PHASES:
+            chunks = phase_chunks(plan, tables)
+            if not chunks:
+                continue
+            phase_started = time.perf_counter()
+            for table, rows in self.run_chunks(plan, chunks, workers):
+                written[table] += rows
+            elapsed = time.perf_counter() - phase_started
+            done = sum(written[table] for table in tables)
+            self.stdout.write(f'  ✓ {", ".join(tables)}: {done:,} rows in {elapsed:.1f}s')
+
+        reset_sequences()
+
+        # Rows were written without model signals, so rebuild the calendar
+        rollups_started = time.perf_counter()
+        rollups = EventDailyRollup.rebuild_all()
+        self.stdout.write(
+            f'  ✓ calendar rollups: {rollups:,} rows in {time.perf_counter() - rollups_started:.1f}s'
+        )
+
+        elapsed = time.perf_counter() - started
+        total_written = sum(written.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Wrote {total_written:,} rows in {elapsed:.1f}s ({total_written / elapsed:,.0f} rows/s)'
+        ))
+
+    def run_chunks(self, plan, chunks, workers):
+        """Yield (table, rows written) for each chunk, in parallel when workers > 1."""
+        if workers == 1:
+            for chunk in chunks:
+                yield write_chunk(plan, chunk)
+            return
+
+        # Forked children must open their own database connections (and pools)
+        connections.close_all()
+        close_pools()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            yield from pool.imap_unordered(partial(write_chunk, plan), chunks)
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Q
+
+from core.db_pool import close_pools
+from core.geocoding import BATCH_SIZE, geocode_locations
+from core.models import GazetteerPlace, Location
+
+
+class Command(BaseCommand):
+    help = 'Fill in missing Location coordinates from the local gazetteer (see core/geocoding.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Locations per batch (default: {BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes (default: one per CPU; SQLite always uses 1)',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Also redo locations placed by an earlier run (e.g. after loading a bigger gazetteer)',
+        )
+
+    def handle(self, *args, **options):
+        if not GazetteerPlace.objects.exists():
+            raise CommandError('The gazetteer is empty. Run load_gazetteer first.')
+
+        workers = max(1, options['workers'])
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write(self.style.WARNING('SQLite allows one writer at a time, using 1 worker.'))
+            workers = 1
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            workers = 1
+
+        todo = Q(latitude__isnull=True) | Q(longitude__isnull=True)
+        if options['refresh']:
+            todo |= ~Q(geocode_precision='')
+        pks = list(Location.objects.filter(todo).order_by('pk').values_list('pk', flat=True))
+        size = max(1, options['batch_size'])
+        batches = [pks[start:start + size] for start in range(0, len(pks), size)]
+        self.stdout.write(f'📍 Geocoding {len(pks):,} locations in {len(batches):,} batch(es) using {workers} worker(s)...')
+
+        started = time.perf_counter()
+        counts = Counter()
+        for batch_counts in self.run_batches(batches, workers):
+            counts.update(batch_counts)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'  ✓ {counts["zip"]:,} by ZIP code, {counts["city"]:,} by city, {counts["not_found"]:,} not found '
+            f'({counts["cached"]:,} from the cache)'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Geocoded {len(pks):,} locations in {elapsed:.1f}s ({len(pks) / max(elapsed, 1e-6):,.0f}/s)'
+        ))
+
+    def run_batches(self, batches, workers):
+        """Yield each batch's counts, in parallel when workers > 1."""
+        if workers == 1 or len(batches) < 2:
+            for batch in batches:
+                yield geocode_locations(batch)
+            return
+
+        # Forked children must open their own database connections (and pools)
+        connections.close_all()
+        close_pools()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            yield from pool.imap_unordered(geocode_locations, batches)
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.geocoding import load_gazetteer
+
+
+class Command(BaseCommand):
+    help = 'Load ZIP code and city centres for offline geocoding from a GeoNames postal code file (see core/geocoding.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.GAZETTEER_PATH,
+            help='GeoNames postal code file, e.g. US.txt (default: settings.GAZETTEER_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            places = load_gazetteer(options['path'])
+        except OSError as error:
+            raise CommandError(f'Could not read the gazetteer: {error}')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Loaded {places:,} places from {options["path"]} in {elapsed:.1f}s (geocoding cache cleared)'
+        ))
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in small batches without long table locks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Sessions deleted per transaction (default: 5000)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to wait between batches, to leave room for live traffic (default: 0)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Stop after this many batches (default: until none are left)',
+        )
+
+    def handle(self, *args, **options):
+        # Fixed cutoff, so sessions expiring during the purge are left for next time
+        cutoff = timezone.now()
+        batch_size = max(1, options['batch_size'])
+        started = time.perf_counter()
+        deleted = 0
+        batches = 0
+
+        while options['max_batches'] is None or batches < options['max_batches']:
+            # Each batch is a short indexed read (expire_date) plus a primary
+            # key delete in its own autocommit transaction, so row locks are
+            # only held for a few milliseconds at a time
+            keys = list(
+                Session.objects.filter(expire_date__lt=cutoff)
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            count, _ = Session.objects.filter(session_key__in=keys).delete()
+            deleted += count
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  batch {batches}: {count:,} sessions')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Deleted {deleted:,} expired sessions in {batches} batch(es), {elapsed:.1f}s'
+        ))
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import EventDailyRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the event calendar rollup table from the events table'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = EventDailyRollup.rebuild_all()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {rows:,} calendar rollup rows in {elapsed:.1f}s'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.bulk_actions import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued admin bulk action jobs and resume stalled ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep checking for new jobs instead of exiting (for a worker dyno)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=5.0,
+            help='Seconds between checks with --loop (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for job in run_pending():
+                style = self.style.SUCCESS if job.status == 'done' else self.style.WARNING
+                detail = f': {job.error}' if job.error else ''
+                self.stdout.write(style(
+                    f'  job #{job.pk} {job.description}: {job.get_status_display().lower()}, '
+                    f'{job.processed:,} of {job.total or 0:,} rows{detail}'
+                ))
+            if not options['loop']:
+                break
+            # Drop connections the database may have closed while we slept
+            close_old_connections()
+            time.sleep(options['sleep'])
@@ -0,0 +1,145 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db_pool import close_pools
+from core.task_queue import Worker, autodiscover, periodic_tasks, queue_stats, supports_skip_locked
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks from the database queue (see core/task_queue.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Worker processes sharing the queue (default: 1; PostgreSQL only above 1)',
+        )
+        parser.add_argument(
+            '--queue',
+            action='append',
+            dest='queues',
+            help='Run tasks from this queue (repeatable, earlier queues first; default: "default")',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=1,
+            help='Tasks claimed per query (default: 1; more helps with many quick tasks)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when no task is ready (default: 1)',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no task is ready, instead of waiting for more',
+        )
+        parser.add_argument(
+            '--report-every',
+            type=float,
+            default=60.0,
+            help='Seconds between throughput reports per process (default: 60, 0 turns them off)',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue depth and throughput for the last hour, then exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        processes = options['processes']
+        if processes < 1:
+            raise CommandError('--processes must be at least 1')
+        if processes > 1 and not supports_skip_locked():
+            self.stdout.write(self.style.WARNING(
+                '⚠️  This database has no SELECT ... FOR UPDATE SKIP LOCKED; running 1 process'
+            ))
+            processes = 1
+
+        queues = options['queues'] or ['default']
+        autodiscover()
+        periodic = ', '.join(task.name for task in periodic_tasks()) or 'none'
+        self.stdout.write(f'👷 Worker: {processes} process(es), queue(s) {", ".join(queues)}; periodic: {periodic}')
+
+        if processes == 1:
+            self.work(options, queues)
+            return
+
+        # Children must open their own connections, not share the parent's
+        connections.close_all()
+        close_pools()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=self.work_in_child, args=(options, queues), name=f'worker-{number}')
+            for number in range(1, processes + 1)
+        ]
+        for child in children:
+            child.start()
+
+        def forward(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: each child finishes its current task
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for child in children:
+            child.join()
+        self.stdout.write('👋 All worker processes stopped')
+
+    def work(self, options, queues):
+        worker = Worker(
+            queues=queues,
+            batch_size=options['batch'],
+            report=lambda line: self.stdout.write(f'  {line}'),
+            report_interval=options['report_every'],
+        )
+
+        def stop(signum, frame):
+            worker.stop()
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            ran = worker.run(burst=options['burst'], sleep=options['sleep'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f'  {worker.name}: stopped after {ran:,} tasks; {worker.stats.summary()}')
+
+    def work_in_child(self, options, queues):
+        try:
+            self.work(options, queues)
+        finally:
+            # Say goodbye to the database instead of just dropping the socket
+            connections.close_all()
+
+    def print_stats(self):
+        rows = queue_stats()
+        if not rows:
+            self.stdout.write('No tasks queued, running, failed or finished in the last hour.')
+            return
+        self.stdout.write(
+            f'  {"Queue":<10} {"Task":<36} {"Ready":>7} {"Later":>7} {"Running":>8} {"Failed":>7} '
+            f'{"Done/h":>8} {"/min":>7} {"Oldest s":>9} {"Wait ms":>9} {"Run ms":>9}'
+        )
+        for row in rows:
+            self.stdout.write(
+                f'  {row["queue"]:<10} {row["name"]:<36} {row["ready"]:>7,} {row["scheduled"]:>7,} '
+                f'{row["running"]:>8,} {row["failed"]:>7,} {row["done"]:>8,} {row["per_minute"]:>7} '
+                f'{_or_dash(row["oldest_ready_s"]):>9} {_or_dash(row["avg_wait_ms"]):>9} {_or_dash(row["avg_run_ms"]):>9}'
+            )
+
+
+def _or_dash(value):
+    return '—' if value is None else str(value)
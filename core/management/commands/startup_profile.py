@@ -0,0 +1,198 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter (python -X importtime) so nothing is imported yet.
+# Prints one line "STARTUP_PROFILE {json}" with the measurements.
+PROBE = r'''
+import json, statistics, sys, time
+boot = time.perf_counter()
+mode, paths, samples = sys.argv[1], json.loads(sys.argv[2]), int(sys.argv[3])
+phases, ready_ms = {}, {}
+
+import django
+from django.apps.config import AppConfig
+
+# Time each app's ready() by wrapping it as the app registry creates the configs
+_create = AppConfig.create.__func__
+def create(cls, entry):
+    config = _create(cls, entry)
+    ready = config.ready
+    def timed_ready():
+        started = time.perf_counter()
+        ready()
+        ready_ms[config.label] = (time.perf_counter() - started) * 1000
+    config.ready = timed_ready
+    return config
+AppConfig.create = classmethod(create)
+
+started = time.perf_counter()
+from django.conf import settings
+settings.INSTALLED_APPS
+phases['settings'] = (time.perf_counter() - started) * 1000
+
+started = time.perf_counter()
+django.setup()
+phases['apps'] = (time.perf_counter() - started) * 1000
+
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+phases['wsgi'] = (time.perf_counter() - started) * 1000
+
+warmup = None
+if mode == 'warm':
+    started = time.perf_counter()
+    from core.warmup import warm_up
+    warmup = warm_up().as_dict()
+    phases['warmup'] = (time.perf_counter() - started) * 1000
+ready_wall = time.time()
+
+# Call the real WSGI application, exactly as gunicorn would
+import io
+host = next((h for h in settings.ALLOWED_HOSTS if h and '*' not in h and not h.startswith('.')), 'localhost')
+def get(path):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': host,
+        'SERVER_PORT': '443', 'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0), 'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+    }
+    status = []
+    body = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    b''.join(body)
+    body.close()  # sends request_finished, like a real server
+    return int(status[0].split()[0])
+
+requests, first_response_wall = [], None
+for path in paths:
+    timings, status = [], None
+    for _ in range(samples + 1):
+        started = time.perf_counter()
+        status = get(path)
+        timings.append((time.perf_counter() - started) * 1000)
+        if first_response_wall is None:
+            first_response_wall = time.time()
+    requests.append({'path': path, 'status': status, 'first_ms': timings[0],
+                     'steady_ms': statistics.median(timings[1:]) if samples else timings[0]})
+
+print('STARTUP_PROFILE ' + json.dumps({
+    'phases': phases, 'ready_ms': ready_ms, 'warmup': warmup, 'requests': requests,
+    'ready_wall': ready_wall, 'first_response_wall': first_response_wall,
+}))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Profile worker start-up: import times, app ready() times and time to the first fast response'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Page to request after boot (repeatable, default: /)',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=5,
+            help='Extra requests per page to measure steady-state speed (default: 5)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='How many of the slowest imports to list (default: 15)',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/']
+        self.stdout.write('🎃 Booting fresh interpreters (python -X importtime)...')
+        cold, imports = self.probe('cold', paths, options['samples'])
+        warm, _ = self.probe('warm', paths, options['samples'])
+
+        self.report_imports(imports, options['top'])
+        self.report_phases(cold, warm)
+        self.report_requests(cold, warm)
+
+    def probe(self, mode, paths, samples):
+        """Boot Django in a new process and return (measurements, import times)."""
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'spookyoctober.settings'))
+        started_wall = time.time()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, mode, json.dumps(paths), str(samples)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        line = next((line for line in result.stdout.splitlines() if line.startswith('STARTUP_PROFILE ')), None)
+        if result.returncode or line is None:
+            raise CommandError(f'Start-up probe failed:\n{result.stderr[-2000:]}')
+
+        data = json.loads(line.split(' ', 1)[1])
+        data['boot_to_ready_ms'] = (data['ready_wall'] - started_wall) * 1000
+        data['boot_to_first_response_ms'] = (data['first_response_wall'] - started_wall) * 1000
+
+        imports = []  # (module, self_us, cumulative_us, depth)
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, module = match.groups()
+                imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+        return data, imports
+
+    def report_imports(self, imports, top):
+        total_ms = sum(self_us for _, self_us, _, _ in imports) / 1000
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Imports: {len(imports):,} modules, {total_ms:,.0f} ms'))
+
+        by_package = defaultdict(int)
+        for module, self_us, _, _ in imports:
+            by_package[module.split('.')[0]] += self_us
+        self.stdout.write('  By top-level package (own time):')
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'    {package:<32} {self_us / 1000:>8.1f} ms')
+
+        self.stdout.write('  Slowest single imports (including what they import):')
+        # Depth 0 = imported directly by Django or the project, not by another slow import
+        direct = [item for item in imports if item[3] <= 1]
+        for module, _, cumulative_us, _ in sorted(direct, key=lambda item: -item[2])[:top]:
+            self.stdout.write(f'    {module:<48} {cumulative_us / 1000:>8.1f} ms')
+
+    def report_phases(self, cold, warm):
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING('Boot phases (warm run)'))
+        for name, ms in warm['phases'].items():
+            self.stdout.write(f'    {name:<32} {ms:>8.1f} ms')
+        for step in (warm['warmup'] or {}).get('steps', []):
+            note = f'  ⚠️ {step["error"]}' if step['error'] else ''
+            self.stdout.write(f'      warm-up {step["name"]:<22} {step["ms"]:>8.1f} ms  ({step["count"]}){note}')
+
+        self.stdout.write('  App ready() times:')
+        for label, ms in sorted(warm['ready_ms'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f'    {label:<32} {ms:>8.1f} ms')
+
+    def report_requests(self, cold, warm):
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING('First requests'))
+        for label, data in (('Without warm-up', cold), ('With warm-up', warm)):
+            self.stdout.write(f'  {label}:')
+            self.stdout.write(f'    Process start → ready:           {data["boot_to_ready_ms"]:>8.0f} ms')
+            self.stdout.write(f'    Process start → first response:  {data["boot_to_first_response_ms"]:>8.0f} ms')
+            for request in data['requests']:
+                self.stdout.write(
+                    f'    {request["path"]:<20} [{request["status"]}] first {request["first_ms"]:>7.1f} ms, '
+                    f'then {request["steady_ms"]:>6.1f} ms'
+                )
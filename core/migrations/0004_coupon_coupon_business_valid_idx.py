@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_contactmessage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(fields=['business', 'valid_until'], name='coupon_business_valid_idx'),
+        ),
+    ]
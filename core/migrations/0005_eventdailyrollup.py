@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:53
+
+from django.db import migrations, models
+
+
+def fill_rollups(apps, schema_editor):
+    """Build rollup rows for events that already exist."""
+    Event = apps.get_model('core', 'Event')
+    EventDailyRollup = apps.get_model('core', 'EventDailyRollup')
+
+    groups = (
+        Event.objects.filter(is_active=True)
+        .annotate(free=models.ExpressionWrapper(models.Q(cost=0), output_field=models.BooleanField()))
+        .order_by()
+        .values('event_date', 'event_category', 'age_appropriateness', 'free')
+        .annotate(total=models.Count('pk'))
+    )
+    EventDailyRollup.objects.bulk_create(
+        [
+            EventDailyRollup(
+                date=group['event_date'],
+                event_category=group['event_category'],
+                age_appropriateness=group['age_appropriateness'],
+                is_free=group['free'],
+                event_count=group['total'],
+            )
+            for group in groups
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_coupon_coupon_business_valid_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('event_category', models.CharField(choices=[('haunted_house', 'Haunted House'), ('costume_party', 'Costume Party'), ('trick_or_treat', 'Trick or Treat'), ('ghost_tour', 'Ghost Tour'), ('pumpkin_carving', 'Pumpkin Carving'), ('halloween_market', 'Halloween Market'), ('film_screening', 'Film Screening'), ('parade', 'Halloween Parade'), ('other', 'Other')], max_length=20)),
+                ('age_appropriateness', models.CharField(choices=[('all_ages', 'All Ages'), ('family_friendly', 'Family Friendly'), ('kids_only', 'Kids Only (under 12)'), ('teens', 'Teens (13-17)'), ('adults', 'Adults Only (18+)')], max_length=20)),
+                ('is_free', models.BooleanField()),
+                ('event_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Event Daily Rollup',
+                'verbose_name_plural': 'Event Daily Rollups',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'event_category', 'age_appropriateness', 'is_free'), name='event_rollup_unique_day_group')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
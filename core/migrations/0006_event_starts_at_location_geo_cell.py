@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:58
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+from core.geo import cell_for
+
+
+def backfill(apps, schema_editor):
+    """Fill starts_at and geo_cell for rows that already exist."""
+    Event = apps.get_model('core', 'Event')
+    Location = apps.get_model('core', 'Location')
+
+    batch = []
+    for event in Event.objects.only('event_date', 'start_time').iterator(chunk_size=2000):
+        event.starts_at = timezone.make_aware(datetime.combine(event.event_date, event.start_time))
+        batch.append(event)
+        if len(batch) == 2000:
+            Event.objects.bulk_update(batch, ['starts_at'])
+            batch = []
+    Event.objects.bulk_update(batch, ['starts_at'])
+
+    batch = []
+    for location in Location.objects.only('latitude', 'longitude').iterator(chunk_size=2000):
+        location.geo_cell = cell_for(location.latitude, location.longitude)
+        batch.append(location)
+        if len(batch) == 2000:
+            Location.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    Location.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_eventdailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='geo_cell',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['starts_at'], name='core_event_starts__2e18e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['location', 'starts_at'], name='core_event_locatio_d80c9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['geo_cell'], name='core_locati_geo_cel_d9b955_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_event_starts_at_location_geo_cell'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created_date', '-id'], name='core_commen_created_7fbf89_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['created_date'], name='core_like_created_199a33_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['name', '-id'], name='core_locati_name_b502bc_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_admin_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkActionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=200)),
+                ('model', models.CharField(help_text='app_label.ModelName of the rows being changed', max_length=100)),
+                ('query', models.BinaryField(help_text='Pickled Query that selects the rows')),
+                ('changes', models.JSONField(help_text="Field values to set, e.g. {'is_spam': true}")),
+                ('chunk_size', models.PositiveIntegerField(default=1000)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=20)),
+                ('total', models.PositiveIntegerField(blank=True, help_text='Rows selected, counted when the job starts', null=True)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('last_pk', models.BigIntegerField(blank=True, help_text='Last primary key done; the job resumes after it', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bulk_action_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bulk Action Job',
+                'verbose_name_plural': 'Bulk Action Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='core_bulkac_status_144f8c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:57
+
+import datetime
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_bulkactionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Registered task name, e.g. core.purge_sessions', max_length=200)),
+                ('args', models.JSONField(blank=True, default=list)),
+                ('kwargs', models.JSONField(blank=True, default=dict)),
+                ('queue', models.CharField(default='default', max_length=50)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Not started before this time')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3)),
+                ('timeout', models.DurationField(default=datetime.timedelta(seconds=300), help_text='Lease length: how long one attempt may run')),
+                ('last_error', models.TextField(blank=True)),
+                ('unique_key', models.CharField(blank=True, max_length=200, null=True)),
+                ('locked_by', models.CharField(blank=True, help_text='Worker running the task', max_length=100)),
+                ('locked_until', models.DateTimeField(blank=True, help_text='Lease; after it runs out the task is retried', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Background Task',
+                'verbose_name_plural': 'Background Tasks',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['queue', 'run_at'], name='task_ready_idx'), models.Index(condition=models.Q(('status', 'running')), fields=['locked_until'], name='task_lease_idx'), models.Index(fields=['status', 'finished_at'], name='core_backgr_status_95c797_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('unique_key',), name='task_unique_active_key')],
+            },
+        ),
+    ]
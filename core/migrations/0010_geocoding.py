@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_backgroundtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GazetteerPlace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('state', models.CharField(blank=True, max_length=2)),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+            ],
+            options={
+                'verbose_name': 'Gazetteer Place',
+                'verbose_name_plural': 'Gazetteer Places',
+                'ordering': ['key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GeocodedAddress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_key', models.CharField(max_length=64, unique=True)),
+                ('address', models.TextField(help_text='Normalized address')),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('precision', models.CharField(blank=True, choices=[('zip', 'ZIP code centroid'), ('city', 'City centroid'), ('', 'Not found')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Geocoded Address',
+                'verbose_name_plural': 'Geocoded Addresses',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='geocode_precision',
+            field=models.CharField(blank=True, choices=[('', 'Entered by hand'), ('zip', 'ZIP code centroid'), ('city', 'City centroid')], editable=False, max_length=10),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_geocoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationMergeProposal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='0-1, how alike the two locations are')),
+                ('name_score', models.FloatField()),
+                ('address_score', models.FloatField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('rejected', 'Not a duplicate')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merge_proposals', to='core.location')),
+                ('keep', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='merge_proposals_kept', to='core.location')),
+            ],
+            options={
+                'verbose_name': 'Location Merge Proposal',
+                'verbose_name_plural': 'Location Merge Proposals',
+                'ordering': ['-score', 'id'],
+                'indexes': [models.Index(fields=['status', '-score', 'id'], name='core_locati_status_fda0ed_idx')],
+                'unique_together': {('keep', 'duplicate')},
+            },
+        ),
+    ]
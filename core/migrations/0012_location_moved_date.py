@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_locationmergeproposal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='moved_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['moved_date'], name='core_locati_moved_d_0b3d42_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:05
+
+from django.db import migrations, models
+
+
+def stop_unfinished_jobs(apps, schema_editor):
+    """Jobs still selected by a pickled Query can't run any more; they have to be started again."""
+    BulkActionJob = apps.get_model('core', 'BulkActionJob')
+    BulkActionJob.objects.filter(status__in=['queued', 'running']).update(
+        status='failed', error='Stopped by an upgrade: run the admin action again',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_location_moved_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(stop_unfinished_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bulkactionjob',
+            name='query',
+        ),
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='pks',
+            field=models.JSONField(default=list, help_text='Selected primary keys, as [first, last] runs of consecutive ids'),
+        ),
+        migrations.AlterField(
+            model_name='bulkactionjob',
+            name='total',
+            field=models.PositiveIntegerField(blank=True, help_text='Rows selected, counted when the job is created', null=True),
+        ),
+    ]
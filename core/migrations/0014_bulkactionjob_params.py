@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 02:15
+
+from django.db import migrations, models
+
+
+def stop_unfinished_jobs(apps, schema_editor):
+    """Jobs still selected by primary key runs can't run any more; they have to be started again."""
+    BulkActionJob = apps.get_model('core', 'BulkActionJob')
+    BulkActionJob.objects.filter(status__in=['queued', 'running']).update(
+        status='failed', error='Stopped by an upgrade: run the admin action again',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_bulkactionjob_pks'),
+    ]
+
+    operations = [
+        migrations.RunPython(stop_unfinished_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bulkactionjob',
+            name='pks',
+        ),
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='max_pk',
+            field=models.BigIntegerField(blank=True, help_text='Highest primary key when the job was created; later rows are left alone', null=True),
+        ),
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='params',
+            field=models.JSONField(default=dict, help_text="Changelist query parameters that select the rows, e.g. {'is_read__exact': ['0']}"),
+        ),
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='selected',
+            field=models.JSONField(blank=True, help_text='Primary keys ticked on the page; null when every page was selected', null=True),
+        ),
+        migrations.AlterField(
+            model_name='bulkactionjob',
+            name='total',
+            field=models.PositiveIntegerField(blank=True, help_text='Rows selected, estimated when the job starts', null=True),
+        ),
+    ]
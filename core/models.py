@@ -8,6 +8,7 @@ Models:
 - UserProfile: Extended user profile with Halloween-themed fields
 - Location: Geographic locations for events and places
 - Event: Halloween events and gatherings
+- EventDailyRollup: Pre-computed per-day event counts for the calendar
 - Media: Images and files attached to various entities
 - HauntedPlace: Haunted locations with stories
 - Business: Halloween-themed businesses
@@ -15,12 +16,20 @@ Models:
 - Post: User-generated content
 - Like: Likes on content
 - Comment: Comments on content
+- ContactMessage: Messages sent through the contact form
+- BulkActionJob: Admin bulk actions running in the background
+- BackgroundTask: Work queued for manage.py run_worker
+- GazetteerPlace: ZIP code and city centroids for offline geocoding
+- GeocodedAddress: Cached geocoding result per normalized address
+- LocationMergeProposal: Two locations that look like the same place
 """
 
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
 import uuid
 
 
@@ -96,6 +105,18 @@ class Location(models.Model):
     # Geographic coordinates
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    # Grid square of the coordinates (set automatically, see core/geo.py)
+    geo_cell = models.CharField(max_length=16, blank=True, editable=False)
+    # Where the coordinates came from (see core/geocoding.py)
+    geocode_precision = models.CharField(
+        max_length=10,
+        choices=[('', 'Entered by hand'), ('zip', 'ZIP code centroid'), ('city', 'City centroid')],
+        blank=True,
+        editable=False,
+    )
+    # When the coordinates last changed (set automatically), so the nearest
+    # haunted places index (core/proximity.py) can tell that places moved
+    moved_date = models.DateTimeField(null=True, blank=True, editable=False)
 
     location_type = models.CharField(max_length=20, choices=LOCATION_TYPE_CHOICES, default='venue')
     description = models.TextField(blank=True)
@@ -110,10 +131,40 @@ class Location(models.Model):
         verbose_name_plural = "Locations"
         ordering = ['name']
         indexes = [
+            # Default ordering (plus the admin's -pk tie-breaker), so lists read
+            # the first rows instead of sorting the whole table
+            models.Index(fields=['name', '-id']),
             models.Index(fields=['latitude', 'longitude']),
             models.Index(fields=['city', 'state']),
+            models.Index(fields=['geo_cell']),
+            models.Index(fields=['moved_date']),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # As loaded, so save() can tell whether they changed
+        instance._loaded_coordinates = (instance.__dict__.get('latitude'), instance.__dict__.get('longitude'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .geo import cell_for
+        self.geo_cell = cell_for(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        coordinates = (self.latitude, self.longitude)
+        # Read by core/signals.py after the save
+        self._moved = (
+            coordinates != getattr(self, '_loaded_coordinates', (None, None))
+            and (update_fields is None or bool({'latitude', 'longitude'} & set(update_fields)))
+        )
+        if self._moved:
+            self.moved_date = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'moved_date'}
+        super().save(*args, **kwargs)
+        if self._moved:
+            self._loaded_coordinates = coordinates
+
     def __str__(self):
         return f"{self.name} - {self.city}, {self.state}"
 
@@ -162,6 +213,9 @@ class Event(models.Model):
     event_date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField(null=True, blank=True)
+    # event_date + start_time as one timestamp (set automatically in save)
+    # so "starting in the next few hours" is a single indexed range
+    starts_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     # Event details
     cost = models.DecimalField(max_digits=6, decimal_places=2, default=0.00, help_text="Entry fee (0 = free)")
@@ -193,9 +247,22 @@ class Event(models.Model):
             models.Index(fields=['event_date']),
             models.Index(fields=['event_category']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['starts_at']),
+            # "Happening now near me": events at nearby locations in a time window
+            models.Index(fields=['location', 'starts_at']),
         ]
 
+    @staticmethod
+    def combine_start(event_date, start_time):
+        """Aware datetime for a date and local start time (in settings.TIME_ZONE)."""
+        from datetime import datetime
+        from django.utils import timezone
+        if event_date is None or start_time is None:
+            return None
+        return timezone.make_aware(datetime.combine(event_date, start_time))
+
     def save(self, *args, **kwargs):
+        self.starts_at = self.combine_start(self.event_date, self.start_time)
         if not self.slug:
             self.slug = slugify(self.title)
             # Ensure uniqueness
@@ -217,6 +284,118 @@ class Event(models.Model):
         return self.cost == 0
 
 
+# ================================================================
+# EVENT CALENDAR ROLLUP
+# ================================================================
+
+# First half of the PostgreSQL advisory lock key for a day's rollup rows
+# (the second half is the date); see EventDailyRollup.rebuild_dates
+ROLLUP_LOCK_ID = 31031
+
+
+class EventDailyRollup(models.Model):
+    """
+    Pre-computed number of active events per day.
+
+    There is one row per (date, category, age group, free/paid)
+    combination that has events. The calendar API reads a whole month of
+    these small rows with one range scan on the unique index (which starts
+    with `date`) instead of loading and grouping every event.
+
+    Rows are kept up to date by signals on Event save/delete
+    (see core/signals.py). After bulk imports that skip signals, run:
+        python manage.py rebuild_event_rollups
+    """
+
+    date = models.DateField()
+    event_category = models.CharField(max_length=20, choices=Event.EVENT_CATEGORY_CHOICES)
+    age_appropriateness = models.CharField(max_length=20, choices=Event.AGE_CHOICES)
+    is_free = models.BooleanField()
+    event_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Event Daily Rollup"
+        verbose_name_plural = "Event Daily Rollups"
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'event_category', 'age_appropriateness', 'is_free'],
+                name='event_rollup_unique_day_group',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.event_count} {self.event_category}"
+
+    @classmethod
+    def _rows_for(cls, events):
+        """Yield unsaved rollup rows for the active events in `events`."""
+        groups = (
+            events.filter(is_active=True)
+            .annotate(free=models.ExpressionWrapper(models.Q(cost=0), output_field=models.BooleanField()))
+            .order_by()
+            .values('event_date', 'event_category', 'age_appropriateness', 'free')
+            .annotate(total=models.Count('pk'))
+        )
+        for group in groups.iterator():
+            yield cls(
+                date=group['event_date'],
+                event_category=group['event_category'],
+                age_appropriateness=group['age_appropriateness'],
+                is_free=group['free'],
+                event_count=group['total'],
+            )
+
+    @classmethod
+    def rebuild_dates(cls, dates):
+        """
+        Recompute the rollup rows for the given dates.
+
+        Two events saved on the same day at the same moment mustn't both
+        insert the same (date, group) row (the unique constraint fails) or
+        write a count from before the other one's event. So on PostgreSQL
+        each day is locked before it's counted, and everywhere rows are
+        upserted rather than deleted and inserted again. Groups with no
+        events left are deleted afterwards.
+        """
+        from django.db import connection, transaction
+
+        dates = {d for d in dates if d is not None}
+        if not dates:
+            return 0
+        group_fields = ['date', 'event_category', 'age_appropriateness', 'is_free']
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    # Same order in every transaction, so two can't deadlock
+                    for day in sorted(dates):
+                        cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [ROLLUP_LOCK_ID, day.toordinal()])
+            rows = list(cls._rows_for(Event.objects.filter(event_date__in=dates)))
+            cls.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=group_fields, update_fields=['event_count'],
+            )
+            kept = models.Q(pk__in=[])
+            for row in rows:
+                kept |= models.Q(**{field: getattr(row, field) for field in group_fields})
+            cls.objects.filter(date__in=dates).exclude(kept).delete()
+        return len(rows)
+
+    @classmethod
+    def rebuild_all(cls, batch_size=5000):
+        """Throw away every rollup row and recompute them from the events table."""
+        from django.db import transaction
+        from itertools import islice
+
+        created = 0
+        with transaction.atomic():
+            cls.objects.all().delete()
+            rows = cls._rows_for(Event.objects.all())
+            while batch := list(islice(rows, batch_size)):
+                cls.objects.bulk_create(batch)
+                created += len(batch)
+        return created
+
+
 # ================================================================
 # MEDIA (Sprint 3)
 # ================================================================
@@ -329,6 +508,39 @@ class HauntedPlace(models.Model):
 # BUSINESS (Sprint 5)
 # ================================================================
 
+class BusinessQuerySet(models.QuerySet):
+    """Database-side helpers for businesses."""
+
+    def with_active_coupon_count(self, on_date=None):
+        """
+        Annotate each business with `active_coupon_count`.
+
+        Uses a correlated subquery on the (business, valid_until) index
+        instead of loading every historical coupon just to count them.
+        """
+        from django.db.models.functions import Coalesce
+
+        active_coupons = (
+            Coupon.objects.valid(on_date)
+            .filter(business=models.OuterRef('pk'))
+            .order_by()
+            .values('business')
+            .annotate(total=models.Count('pk'))
+            .values('total')
+        )
+        return self.annotate(
+            active_coupon_count=Coalesce(models.Subquery(active_coupons), 0)
+        )
+
+    def prefetch_valid_coupons(self, on_date=None):
+        """Prefetch only currently valid coupons into `business.valid_coupons`."""
+        return self.prefetch_related(models.Prefetch(
+            'coupons',
+            queryset=Coupon.objects.valid(on_date).order_by('valid_until'),
+            to_attr='valid_coupons',
+        ))
+
+
 class Business(models.Model):
     """
     Halloween-themed businesses and vendors.
@@ -379,6 +591,8 @@ class Business(models.Model):
     modified_date = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    objects = BusinessQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Business"
         verbose_name_plural = "Businesses"
@@ -405,6 +619,65 @@ class Business(models.Model):
 # COUPON (Sprint 5)
 # ================================================================
 
+class CouponQuerySet(models.QuerySet):
+    """
+    Database-side helpers for coupons.
+
+    valid() is the SQL counterpart of Coupon.is_valid, so listings can
+    count or fetch only usable coupons without loading expired ones.
+    """
+
+    @staticmethod
+    def valid_q(on_date=None, prefix=''):
+        """
+        Q object matching valid coupons on `on_date` (default: today).
+
+        Use `prefix` to filter through a relation, e.g.
+        Count('coupons', filter=CouponQuerySet.valid_q(prefix='coupons__')).
+        """
+        from django.utils import timezone
+        on_date = on_date or timezone.now().date()
+        return (
+            models.Q(**{
+                f'{prefix}is_active': True,
+                f'{prefix}valid_from__lte': on_date,
+                f'{prefix}valid_until__gte': on_date,
+            })
+            & (
+                models.Q(**{f'{prefix}max_uses__isnull': True})
+                | models.Q(**{f'{prefix}current_uses__lt': models.F(f'{prefix}max_uses')})
+            )
+        )
+
+    def valid(self, on_date=None):
+        """Coupons that are active, in date, and not used up."""
+        return self.filter(self.valid_q(on_date))
+
+    def redeem(self, code, on_date=None):
+        """
+        Use up one redemption of the coupon with discount code `code`.
+
+        The validity check and the increment happen in a single
+        conditional UPDATE (... WHERE current_uses < max_uses), so the
+        database decides who gets the last use. Two shoppers racing for
+        the final redemption can never both succeed, no matter how many
+        web workers are running.
+
+        Returns the coupon with the use recorded, or None if there is no
+        valid coupon with that code. Its current_uses is exact: it's read
+        back in the UPDATE's transaction, while the row is still locked.
+        """
+        from django.db import router, transaction
+        coupons = self.using(router.db_for_write(self.model))
+        with transaction.atomic(using=coupons.db):
+            updated = coupons.filter(discount_code=code).valid(on_date).update(
+                current_uses=models.F('current_uses') + 1
+            )
+            if not updated:
+                return None
+            return coupons.get(discount_code=code)
+
+
 class Coupon(models.Model):
     """
     Promotional coupons and discounts from businesses.
@@ -436,6 +709,8 @@ class Coupon(models.Model):
     is_active = models.BooleanField(default=True)
     created_date = models.DateTimeField(auto_now_add=True)
 
+    objects = CouponQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Coupon"
         verbose_name_plural = "Coupons"
@@ -443,6 +718,8 @@ class Coupon(models.Model):
         indexes = [
             models.Index(fields=['discount_code']),
             models.Index(fields=['valid_from', 'valid_until']),
+            # Per-business lookups of current coupons skip expired history
+            models.Index(fields=['business', 'valid_until'], name='coupon_business_valid_idx'),
         ]
 
     def __str__(self):
@@ -450,6 +727,7 @@ class Coupon(models.Model):
 
     @property
     def is_valid(self):
+        """Python check for one loaded coupon. See CouponQuerySet.valid() for the SQL version."""
         from django.utils import timezone
         today = timezone.now().date()
         return (self.is_active and
@@ -542,6 +820,8 @@ class Like(models.Model):
         indexes = [
             models.Index(fields=['entity_type', 'entity_id']),
             models.Index(fields=['user']),
+            # Admin changelist date hierarchy
+            models.Index(fields=['created_date']),
         ]
 
     def __str__(self):
@@ -593,6 +873,8 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=['entity_type', 'entity_id']),
             models.Index(fields=['parent_comment']),
+            # Default ordering (plus the admin's -pk tie-breaker) and date hierarchy
+            models.Index(fields=['created_date', '-id']),
         ]
 
     def __str__(self):
@@ -600,7 +882,8 @@ class Comment(models.Model):
 
     @property
     def is_reply(self):
-        return self.parent_comment is not None
+        # Checks the id column, so listing comments doesn't load every parent
+        return self.parent_comment_id is not None
 
 
 # ================================================================
@@ -665,3 +948,264 @@ class ContactMessage(models.Model):
         """Flag this message as spam."""
         self.is_spam = True
         self.save(update_fields=['is_spam'])
+
+
+# ================================================================
+# BULK ACTION JOBS
+# ================================================================
+
+class BulkActionJob(models.Model):
+    """
+    An admin bulk action ("mark as spam", "make public") running in the background.
+
+    Instead of one UPDATE over the whole selection inside the request, the
+    rows are updated in chunks of `chunk_size`, walking the primary key in
+    order. Each chunk commits together with `last_pk` and `processed`, so
+    a job that stops halfway (deploy, crash) continues where it left off.
+
+    The selection is stored as the changelist's query parameters (plus
+    the ticked primary keys, unless every page was selected) and the
+    highest primary key at the time, never as the selected rows, so
+    "select all 200,000" costs nothing up front. See core/bulk_actions.py
+    for how jobs are created and run.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    description = models.CharField(max_length=200)
+    model = models.CharField(max_length=100, help_text="app_label.ModelName of the rows being changed")
+    params = models.JSONField(default=dict, help_text="Changelist query parameters that select the rows, e.g. {'is_read__exact': ['0']}")
+    selected = models.JSONField(null=True, blank=True, help_text="Primary keys ticked on the page; null when every page was selected")
+    max_pk = models.BigIntegerField(null=True, blank=True, help_text="Highest primary key when the job was created; later rows are left alone")
+    changes = models.JSONField(help_text="Field values to set, e.g. {'is_spam': true}")
+    chunk_size = models.PositiveIntegerField(default=1000)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total = models.PositiveIntegerField(null=True, blank=True, help_text="Rows selected, estimated when the job starts")
+    processed = models.PositiveIntegerField(default=0)
+    last_pk = models.BigIntegerField(null=True, blank=True, help_text="Last primary key done; the job resumes after it")
+    error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='bulk_action_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched after every chunk; a running job that stops updating has stalled
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Bulk Action Job"
+        verbose_name_plural = "Bulk Action Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.description} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """Percent done (0-100), or None before the rows have been counted."""
+        if self.status == 'done':
+            return 100
+        if not self.total:
+            return None
+        return min(100, round(100 * self.processed / self.total))
+
+
+# ================================================================
+# BACKGROUND TASKS
+# ================================================================
+
+class BackgroundTask(models.Model):
+    """
+    One piece of work waiting for (or done by) `manage.py run_worker`.
+
+    The queue lives in this table, so it needs no Redis or broker: a
+    worker claims ready rows with SELECT ... FOR UPDATE SKIP LOCKED, which
+    lets many worker processes share the queue without ever taking the
+    same task. `name` says which function to call (see core/task_queue.py
+    for the @task decorator), `args` and `kwargs` are its JSON arguments.
+
+    A claimed task carries a lease (`locked_until`). If the worker dies,
+    the lease runs out and another worker picks the task up again.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200, help_text="Registered task name, e.g. core.purge_sessions")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    queue = models.CharField(max_length=50, default='default')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now, help_text="Not started before this time")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    timeout = models.DurationField(default=timedelta(minutes=5), help_text="Lease length: how long one attempt may run")
+    last_error = models.TextField(blank=True)
+    # Only one queued or running task per key (used by periodic tasks)
+    unique_key = models.CharField(max_length=200, null=True, blank=True)
+
+    locked_by = models.CharField(max_length=100, blank=True, help_text="Worker running the task")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Lease; after it runs out the task is retried")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Background Task"
+        verbose_name_plural = "Background Tasks"
+        ordering = ['-created_at']
+        indexes = [
+            # The claim query; partial, so finished tasks never bloat it
+            models.Index(
+                fields=['queue', 'run_at'],
+                condition=models.Q(status='queued'),
+                name='task_ready_idx',
+            ),
+            models.Index(
+                fields=['locked_until'],
+                condition=models.Q(status='running'),
+                name='task_lease_idx',
+            ),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='task_unique_active_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def wait_time(self):
+        """How long the task waited for a worker after it was due."""
+        if self.started_at is None:
+            return None
+        return max(self.started_at - self.run_at, timedelta(0))
+
+    @property
+    def run_time(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+# ================================================================
+# GEOCODING
+# ================================================================
+
+class GazetteerPlace(models.Model):
+    """
+    The centre of a ZIP code or a city, from the local gazetteer file.
+
+    Filled by `manage.py load_gazetteer` and used by core/geocoding.py to
+    give addresses coordinates without calling any outside service. `key`
+    is what a normalized address is looked up by: 'zip:01970' or
+    'city:ma:salem'.
+    """
+
+    key = models.CharField(max_length=150, unique=True)
+    name = models.CharField(max_length=200)
+    state = models.CharField(max_length=2, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+
+    class Meta:
+        verbose_name = "Gazetteer Place"
+        verbose_name_plural = "Gazetteer Places"
+        ordering = ['key']
+
+    def __str__(self):
+        return self.key
+
+
+class GeocodedAddress(models.Model):
+    """
+    What geocoding one normalized address gave, so it's only worked out once.
+
+    Addresses that couldn't be placed are kept too (with no coordinates),
+    so running `manage.py geocode_locations` again is all cache hits.
+    Cleared when a new gazetteer is loaded.
+    """
+
+    PRECISION_CHOICES = [
+        ('zip', 'ZIP code centroid'),
+        ('city', 'City centroid'),
+        ('', 'Not found'),
+    ]
+
+    # sha256 of `address`; the address itself can be longer than an index allows
+    address_key = models.CharField(max_length=64, unique=True)
+    address = models.TextField(help_text="Normalized address")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    precision = models.CharField(max_length=10, choices=PRECISION_CHOICES, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Geocoded Address"
+        verbose_name_plural = "Geocoded Addresses"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.address
+
+
+# ================================================================
+# DUPLICATE LOCATIONS
+# ================================================================
+
+class LocationMergeProposal(models.Model):
+    """
+    Two locations that look like the same place, for an admin to decide.
+
+    Made by `manage.py find_duplicate_locations` (core/dedup.py). Merging
+    moves everything from `duplicate` to `keep` and deletes `duplicate`
+    (and with it this proposal). Rejected proposals are kept, so the same
+    pair isn't proposed again.
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('rejected', 'Not a duplicate'),
+    ]
+
+    keep = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='merge_proposals_kept')
+    duplicate = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='merge_proposals')
+    score = models.FloatField(help_text="0-1, how alike the two locations are")
+    name_score = models.FloatField()
+    address_score = models.FloatField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Location Merge Proposal"
+        verbose_name_plural = "Location Merge Proposals"
+        ordering = ['-score', 'id']
+        unique_together = ['keep', 'duplicate']
+        indexes = [
+            models.Index(fields=['status', '-score', 'id']),
+        ]
+
+    def __str__(self):
+        return f"#{self.duplicate_id} -> #{self.keep_id} ({self.score:.2f})"
@@ -0,0 +1,114 @@
+"""
+"Happening Now Near Me" Query Engine
+
+Finds active events that start within the next few hours close to a
+point, sorted by distance and then start time.
+
+How it stays fast (one SQL query, no full-table work):
+1. Time: Event.starts_at (indexed) limits the search to a short window
+2. Space: Location.geo_cell (indexed) limits it to the handful of grid
+   cells that cover the search circle (see core/geo.py)
+3. Only the matching candidates are loaded, with just the columns the
+   results need; exact haversine distances are computed for those alone
+4. At most MAX_CANDIDATES rows are ever loaded, so the worst case stays
+   inside the latency budget even on Halloween night in a dense city
+
+Used by the happening_now page and the api_happening_now JSON endpoint.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .geo import bounding_box, cells_covering, haversine_km
+from .models import Event
+
+
+DEFAULT_RADIUS_KM = 10
+MAX_RADIUS_KM = 100
+DEFAULT_HOURS = 3
+MAX_HOURS = 24
+MAX_RESULTS = 100
+
+# Upper bound on rows loaded per search (soonest events win if exceeded)
+MAX_CANDIDATES = 5000
+
+
+@dataclass
+class NearbyEvent:
+    """One search result: the event and how far away it is."""
+    event: Event
+    distance_km: float
+
+
+@dataclass
+class NearbySearch:
+    """Results of one search plus how it went, for the API response."""
+    results: list
+    candidates: int
+    truncated: bool
+    elapsed_ms: float
+
+
+def happening_now(lat, lon, radius_km=DEFAULT_RADIUS_KM, hours=DEFAULT_HOURS, limit=50, now=None):
+    """
+    Active events starting in the next `hours` within `radius_km` of (lat, lon).
+
+    Arguments are clamped to sensible limits (radius 100 km, 24 hours,
+    100 results). Returns a NearbySearch whose results are sorted by
+    distance, then start time.
+    """
+    started = time.perf_counter()
+    lat, lon = float(lat), float(lon)
+    radius_km = min(max(float(radius_km), 0.1), MAX_RADIUS_KM)
+    hours = min(max(float(hours), 0.25), MAX_HOURS)
+    limit = min(max(int(limit), 1), MAX_RESULTS)
+    now = now or timezone.now()
+
+    events = Event.objects.filter(
+        is_active=True,
+        starts_at__gte=now,
+        starts_at__lt=now + timedelta(hours=hours),
+    )
+
+    cells = cells_covering(lat, lon, radius_km)
+    if cells is not None:
+        events = events.filter(location__geo_cell__in=cells)
+    else:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        events = events.filter(
+            location__latitude__range=(min_lat, max_lat),
+            location__longitude__range=(min_lon, max_lon),
+        )
+
+    rows = list(
+        events.select_related('location')
+        .only(
+            'title', 'starts_at', 'event_date', 'start_time', 'cost', 'event_category',
+            'location__name', 'location__city', 'location__state',
+            'location__latitude', 'location__longitude',
+        )
+        .order_by('starts_at')[:MAX_CANDIDATES + 1]
+    )
+    truncated = len(rows) > MAX_CANDIDATES
+    rows = rows[:MAX_CANDIDATES]
+
+    results = []
+    for event in rows:
+        location = event.location
+        if location.latitude is None or location.longitude is None:
+            continue
+        distance = haversine_km(lat, lon, location.latitude, location.longitude)
+        if distance <= radius_km:
+            results.append(NearbyEvent(event=event, distance_km=distance))
+
+    results.sort(key=lambda item: (item.distance_km, item.event.starts_at))
+
+    return NearbySearch(
+        results=results[:limit],
+        candidates=len(rows),
+        truncated=truncated,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
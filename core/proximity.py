@@ -0,0 +1,209 @@
+"""
+Nearest Haunted Places
+
+"What's haunted near me?" ranks every haunted place by distance from the
+visitor. Doing that in the database means a haversine expression over
+every row, which no index helps with, and in Python it means a loop over
+every row. Instead each process keeps the coordinates in NumPy arrays
+and ranks them all at once:
+
+1. ProximityIndex holds one array each of HauntedPlace ids, scare levels
+   and location coordinates (float32 radians), sorted by scare level, so a
+   scare level filter is a slice of the arrays rather than a copy.
+2. A search works out the haversine term for every place in the slice in
+   a few array operations and picks the k smallest with
+   np.argpartition() (no full sort). Only those k places are then loaded
+   from the database, in one query.
+3. The arrays are built when a worker warms up (core/warmup.py), or else
+   on first use in each process. Saving or deleting a HauntedPlace, or
+   moving a Location, drops them in that process (core/signals.py);
+   other processes notice within REFRESH_SECONDS, by running two small
+   queries per interval (not per search) to see if the haunted places
+   changed or any location moved (Location.moved_date).
+
+Places whose location has no coordinates aren't in the index; run
+`manage.py geocode_locations` to place them.
+
+Example:
+    >>> [(item.place.story_title, round(item.distance_km, 1)) for item in nearest_haunted_places(42.52, -70.89, k=2)]
+    [('The Witch Trials', 0.7), ('Gallows Hill', 1.9)]
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from django.db.models import Count, FloatField, Max
+from django.db.models.functions import Cast
+
+from .geo import EARTH_RADIUS_KM
+from .models import HauntedPlace, Location
+
+DEFAULT_RESULTS = 10
+MAX_RESULTS = 100
+# How often each process checks whether the haunted places changed
+REFRESH_SECONDS = 60
+
+
+@dataclass
+class NearbyPlace:
+    """One search result: the haunted place and how far away it is."""
+    place: HauntedPlace
+    distance_km: float
+
+
+@dataclass
+class Coordinates:
+    """The index's arrays, one entry per haunted place, sorted by scare level."""
+    ids: np.ndarray
+    scare_levels: np.ndarray
+    latitudes: np.ndarray  # radians, float32
+    longitudes: np.ndarray  # radians, float32
+    cos_latitudes: np.ndarray  # float32
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scare_slice(self, min_scare=None, max_scare=None):
+        """Slice of the arrays with scare levels from min_scare to max_scare."""
+        start = 0 if min_scare is None else np.searchsorted(self.scare_levels, min_scare, side='left')
+        stop = len(self) if max_scare is None else np.searchsorted(self.scare_levels, max_scare, side='right')
+        return slice(int(start), int(stop))
+
+
+def _haversine_term(latitude, longitude, cos_latitude, latitudes, longitudes, cos_latitudes):
+    """
+    sin²(d / 2R) for every point: it grows with the distance d, so it ranks
+    the same, without the arcsin and square root per point.
+    """
+    term = np.sin((latitudes - latitude) / 2)
+    term *= term
+    across = np.sin((longitudes - longitude) / 2)
+    across *= across
+    across *= cos_latitudes
+    across *= cos_latitude
+    term += across
+    return term
+
+
+def _distance_km(term):
+    term = np.minimum(term.astype(np.float64), 1.0)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(term))
+
+
+class ProximityIndex:
+    """This process's haunted place coordinates, rebuilt when they change."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._coordinates = None
+        self._stamp = None
+        self._checked_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._coordinates = None
+
+    def warm(self):
+        """Build the arrays now rather than on the first search; returns how many places."""
+        return len(self._current())
+
+    def nearest(self, lat, lon, k=DEFAULT_RESULTS, min_scare=None, max_scare=None, max_km=None):
+        """
+        [(HauntedPlace id, distance in km)] of the k nearest places to
+        (lat, lon), nearest first.
+        """
+        coordinates = self._current()
+        part = coordinates.scare_slice(min_scare, max_scare)
+        if part.start >= part.stop or k < 1:
+            return []
+
+        latitude, longitude = math.radians(lat), math.radians(lon)
+        terms = _haversine_term(
+            latitude, longitude, math.cos(latitude),
+            coordinates.latitudes[part], coordinates.longitudes[part], coordinates.cos_latitudes[part],
+        )
+        if k < len(terms):
+            best = np.argpartition(terms, k - 1)[:k]
+        else:
+            best = np.arange(len(terms))
+        best = best[np.argsort(terms[best], kind='stable')]
+
+        distances = _distance_km(terms[best])
+        if max_km is not None:
+            within = distances <= max_km
+            best, distances = best[within], distances[within]
+        ids = coordinates.ids[part][best]
+        return list(zip(ids.tolist(), distances.tolist()))
+
+    def _current(self):
+        coordinates = self._coordinates
+        if coordinates is not None and time.monotonic() - self._checked_at < REFRESH_SECONDS:
+            return coordinates
+        with self._lock:
+            if self._coordinates is None or time.monotonic() - self._checked_at >= REFRESH_SECONDS:
+                stamp = haunted_places_stamp()
+                if self._coordinates is None or stamp != self._stamp:
+                    self._coordinates = build_coordinates()
+                    self._stamp = stamp
+                self._checked_at = time.monotonic()
+            return self._coordinates
+
+
+def haunted_places_stamp():
+    """
+    Changes whenever a haunted place is added, removed or edited, or a
+    location moves. Any location, haunted or not: a join to find out
+    costs more than the occasional unneeded rebuild.
+    """
+    stamp = HauntedPlace.objects.aggregate(places=Count('id'), updated=Max('modified_date'), last=Max('id'))
+    stamp.update(Location.objects.aggregate(moved=Max('moved_date')))
+    return stamp
+
+
+def build_coordinates():
+    """Coordinates of every haunted place whose location has them, from one query."""
+    rows = (
+        HauntedPlace.objects.filter(location__latitude__isnull=False, location__longitude__isnull=False)
+        # As floats in the database: converting a million Decimals costs more than the query
+        .annotate(
+            latitude=Cast('location__latitude', FloatField()),
+            longitude=Cast('location__longitude', FloatField()),
+        )
+        .order_by('scare_level', 'id')
+        .values_list('id', 'scare_level', 'latitude', 'longitude')
+    )
+    table = np.array(list(rows), dtype=np.float64).reshape(-1, 4)
+    latitudes = np.radians(table[:, 2])
+    # float32 is accurate to about half a metre here, and halves both the
+    # memory and the time per search
+    return Coordinates(
+        ids=table[:, 0].astype(np.int64),
+        scare_levels=table[:, 1].astype(np.int8),
+        latitudes=latitudes.astype(np.float32),
+        longitudes=np.radians(table[:, 3]).astype(np.float32),
+        cos_latitudes=np.cos(latitudes).astype(np.float32),
+    )
+
+
+haunted_index = ProximityIndex()
+
+
+def nearest_haunted_places(lat, lon, k=DEFAULT_RESULTS, min_scare=None, max_scare=None, max_km=None):
+    """
+    The k haunted places nearest to (lat, lon), nearest first, as
+    NearbyPlace with the place and its location loaded (one query).
+
+    min_scare/max_scare: only places with scare levels in that range.
+    max_km: leave out places further away than this.
+    """
+    k = min(max(int(k), 1), MAX_RESULTS)
+    nearest = haunted_index.nearest(float(lat), float(lon), k, min_scare, max_scare, max_km)
+    places = HauntedPlace.objects.select_related('location').in_bulk([place_id for place_id, _ in nearest])
+    # A place deleted in another process since the last refresh is skipped
+    return [
+        NearbyPlace(place=places[place_id], distance_km=distance)
+        for place_id, distance in nearest if place_id in places
+    ]
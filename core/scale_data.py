@@ -0,0 +1,488 @@
+"""
+Synthetic Scale Data for ShriekedIn
+
+Generates large, realistic volumes of data for load testing:
+Users, Locations, Events, Likes, Comments, ContactMessages and
+CompletedMadLibs. Used by `manage.py generate_scale_data`.
+
+How it stays fast:
+- Rows are built as plain tuples and written in batches with raw SQL
+  (PostgreSQL COPY when available, executemany everywhere else)
+- Each table is split into chunks that worker processes handle in parallel
+
+How it stays deterministic:
+- Every chunk gets its own random generator seeded from (seed, table,
+  chunk number), so the same seed produces the same rows no matter how
+  many worker processes are used or which order chunks finish in
+- Users, Locations and Events get explicit primary keys (continuing after
+  the current maximum), so later tables can reference them without
+  reading anything back
+
+How it stays realistic:
+- Locations cluster around "hot" Halloween cities (Salem, New Orleans...)
+- Event dates spike through October and peak on the 31st
+- Likes and comments follow a long-tail popularity curve, so a few events
+  get most of the engagement
+"""
+
+import io
+import json
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from .geo import cell_for
+from .models import Location, Event, Like, Comment, ContactMessage
+
+
+# ================================================================
+# PRESETS
+# ================================================================
+
+PRESETS = {
+    'small': {
+        'users': 1_000,
+        'locations': 5_000,
+        'events': 20_000,
+        'likes': 50_000,
+        'comments': 20_000,
+        'contact_messages': 5_000,
+        'completed_madlibs': 10_000,
+    },
+    'medium': {
+        'users': 10_000,
+        'locations': 50_000,
+        'events': 200_000,
+        'likes': 500_000,
+        'comments': 200_000,
+        'contact_messages': 50_000,
+        'completed_madlibs': 100_000,
+    },
+    # Roughly 10 million rows in total
+    'halloween_peak': {
+        'users': 100_000,
+        'locations': 500_000,
+        'events': 2_000_000,
+        'likes': 5_000_000,
+        'comments': 1_500_000,
+        'contact_messages': 400_000,
+        'completed_madlibs': 500_000,
+    },
+}
+
+CHUNK_ROWS = 20_000
+
+# (city, state, zip prefix, latitude, longitude, weight)
+HOT_CITIES = [
+    ('Salem', 'MA', '019', 42.5195, -70.8967, 30),
+    ('New Orleans', 'LA', '701', 29.9511, -90.0715, 20),
+    ('Sleepy Hollow', 'NY', '105', 41.0857, -73.8585, 12),
+    ('Savannah', 'GA', '314', 32.0809, -81.0912, 10),
+    ('St. Augustine', 'FL', '320', 29.9012, -81.3124, 8),
+    ('Gettysburg', 'PA', '173', 39.8309, -77.2311, 6),
+    ('Chicago', 'IL', '606', 41.8781, -87.6298, 5),
+    ('Los Angeles', 'CA', '900', 34.0522, -118.2437, 5),
+    ('Austin', 'TX', '787', 30.2672, -97.7431, 4),
+    ('Portland', 'OR', '972', 45.5152, -122.6784, 4),
+    ('Denver', 'CO', '802', 39.7392, -104.9903, 3),
+    ('Seattle', 'WA', '981', 47.6062, -122.3321, 3),
+]
+
+ADJECTIVES = ['Haunted', 'Spooky', 'Creepy', 'Ghostly', 'Midnight', 'Moonlit', 'Wicked', 'Eerie', 'Shadowy', 'Cursed']
+NOUNS = ['Manor', 'Graveyard', 'Hollow', 'Crypt', 'Barn', 'Lighthouse', 'Asylum', 'Mill', 'Chapel', 'Forest']
+STREETS = ['Elm', 'Raven', 'Crypt', 'Hollow', 'Lantern', 'Willow', 'Cemetery', 'Bone', 'Mist', 'Pumpkin']
+COMMENT_PHRASES = [
+    'Absolutely terrifying, loved it!',
+    'Great for the whole family.',
+    'The costumes were amazing.',
+    'Lines were long but worth it.',
+    'I heard footsteps in the attic...',
+    'Bring a flashlight!',
+    'Best haunted house in town.',
+    'Not scary enough for me.',
+]
+SUBJECTS = ['Question about tickets', 'Group booking', 'Lost item', 'Accessibility info', 'Partnership enquiry']
+
+EVENT_CATEGORIES = [choice for choice, _ in Event.EVENT_CATEGORY_CHOICES]
+AGE_CHOICES = [choice for choice, _ in Event.AGE_CHOICES]
+LOCATION_TYPES = [choice for choice, _ in Location.LOCATION_TYPE_CHOICES]
+
+# Unusable password hash, so generated users can never log in
+UNUSABLE_PASSWORD = '!scale-data'
+
+
+# ================================================================
+# TABLE PLAN
+# ================================================================
+
+@dataclass
+class Chunk:
+    """One unit of work: rows [start, stop) of one table."""
+    table: str
+    index: int
+    start: int
+    stop: int
+
+
+@dataclass
+class Plan:
+    """Everything a worker needs to generate any chunk."""
+    seed: int
+    counts: dict
+    user_offset: int
+    location_offset: int
+    event_offset: int
+    madlib_offset: int
+    templates: list  # (template id, version id, blank names) per active template
+    year: int
+    now: datetime
+
+    def chunks(self, table):
+        total = self.counts[table]
+        return [
+            Chunk(table, n, start, min(start + CHUNK_ROWS, total))
+            for n, start in enumerate(range(0, total, CHUNK_ROWS))
+        ]
+
+
+def build_plan(preset, seed, scale=1.0, year=None):
+    """Work out row counts and primary key offsets for a generation run."""
+    from games.models import StoryTemplate, CompletedMadLib
+
+    counts = {table: int(rows * scale) for table, rows in PRESETS[preset].items()}
+    # Likes are unique per (user, event), so each user can like every event at most once
+    counts['likes'] = min(counts['likes'], counts['users'] * counts['events'])
+
+    templates = []
+    for template in StoryTemplate.objects.filter(is_active=True):
+        version = template.current_version()
+        blanks = [f'{name}_{n}' for n, name in enumerate(template.get_placeholders(), 1)]
+        templates.append((template.pk, version.pk, blanks))
+    if not templates:
+        counts['completed_madlibs'] = 0
+
+    return Plan(
+        seed=seed,
+        counts=counts,
+        user_offset=_next_id(User),
+        location_offset=_next_id(Location),
+        event_offset=_next_id(Event),
+        madlib_offset=_next_id(CompletedMadLib),
+        templates=templates,
+        year=year or date.today().year,
+        now=datetime.now(dt_timezone.utc).replace(microsecond=0),
+    )
+
+
+def _next_id(model):
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return (last or 0) + 1
+
+
+# ================================================================
+# VALUE DISTRIBUTIONS
+# ================================================================
+
+def _rng(plan, chunk):
+    return random.Random(f'{plan.seed}:{chunk.table}:{chunk.index}')
+
+
+def _hot_city(rng):
+    return rng.choices(HOT_CITIES, weights=[city[5] for city in HOT_CITIES])[0]
+
+
+def _halloween_date(rng, year):
+    """75% of dates fall in October, piling up towards the 31st."""
+    if rng.random() < 0.75:
+        return date(year, 10, round(rng.triangular(1, 31, 31)))
+    return date(year, 1, 1) + timedelta(days=rng.randrange(365))
+
+
+def _popular_index(rng, total):
+    """
+    Pick an index in [0, total) from a long-tail (Pareto) distribution.
+
+    Low ranks are the popular ones. Multiplying by a large odd constant scatters
+    popular items across the id range instead of bunching them at the start.
+    """
+    rank = min(total - 1, int((rng.paretovariate(1.1) - 1) * 20))
+    return (rank * 2_654_435_761) % total
+
+
+def _timestamp(rng, plan, day=None):
+    day = day or _halloween_date(rng, plan.year)
+    moment = datetime.combine(day, time(rng.randrange(24), rng.randrange(60)), dt_timezone.utc)
+    return min(moment, plan.now)
+
+
+# ================================================================
+# ROW GENERATORS
+# ================================================================
+# Each generator returns (model, columns, rows) for one chunk.
+
+def user_rows(plan, chunk):
+    rng = _rng(plan, chunk)
+    rows = []
+    for i in range(chunk.start, chunk.stop):
+        pk = plan.user_offset + i
+        rows.append((
+            pk, UNUSABLE_PASSWORD, False, f'scale_user_{pk}', '', '',
+            f'scale_user_{pk}@example.com', False, True, _timestamp(rng, plan),
+        ))
+    columns = ['id', 'password', 'is_superuser', 'username', 'first_name', 'last_name',
+               'email', 'is_staff', 'is_active', 'date_joined']
+    return User, columns, rows
+
+
+def location_rows(plan, chunk):
+    rng = _rng(plan, chunk)
+    rows = []
+    for i in range(chunk.start, chunk.stop):
+        city, state, zip_prefix, lat, lon, _ = _hot_city(rng)
+        latitude = f'{lat + rng.gauss(0, 0.05):.6f}'
+        longitude = f'{lon + rng.gauss(0, 0.05):.6f}'
+        rows.append((
+            plan.location_offset + i,
+            f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+            f'{rng.randint(1, 9999)} {rng.choice(STREETS)} Street',
+            city, state, f'{zip_prefix}{rng.randint(0, 99):02d}', 'USA',
+            latitude, longitude, cell_for(latitude, longitude), '',
+            rng.choice(LOCATION_TYPES), '',
+            plan.user_offset + rng.randrange(plan.counts['users']),
+            _timestamp(rng, plan), rng.random() < 0.3,
+        ))
+    columns = ['id', 'name', 'address', 'city', 'state', 'zip_code', 'country',
+               'latitude', 'longitude', 'geo_cell', 'geocode_precision', 'location_type', 'description',
+               'created_by_id', 'created_date', 'is_verified']
+    return Location, columns, rows
+
+
+def event_rows(plan, chunk):
+    rng = _rng(plan, chunk)
+    rows = []
+    for i in range(chunk.start, chunk.stop):
+        pk = plan.event_offset + i
+        category = rng.choice(EVENT_CATEGORIES)
+        title = f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {category.replace("_", " ").title()}'
+        start_hour = rng.choice([10, 12, 16, 18, 19, 19, 20, 20, 21])
+        created = _timestamp(rng, plan)
+        event_date = _halloween_date(rng, plan.year)
+        rows.append((
+            pk, title, f'{slugify(title)}-{pk}', 'Join us for a frightfully fun night.',
+            plan.location_offset + _popular_index(rng, plan.counts['locations']),
+            event_date, time(start_hour, 0), time(min(start_hour + 3, 23), 0),
+            Event.combine_start(event_date, time(start_hour, 0)),
+            rng.choice(['0.00', '0.00', '5.00', '10.00', '25.00']),
+            rng.choice(AGE_CHOICES), category, '', '', '', rng.choice([None, 50, 200, 1000]),
+            plan.user_offset + rng.randrange(plan.counts['users']),
+            created, created, rng.random() < 0.95, rng.random() < 0.02,
+            int(rng.paretovariate(1.5) * 10), 0,
+        ))
+    columns = ['id', 'title', 'slug', 'description', 'location_id', 'event_date', 'start_time',
+               'end_time', 'starts_at', 'cost', 'age_appropriateness', 'event_category', 'performing_artists',
+               'contact_info', 'website_url', 'capacity', 'created_by_id', 'created_date',
+               'modified_date', 'is_active', 'is_featured', 'view_count', 'like_count']
+    return Event, columns, rows
+
+
+def like_rows(plan, chunk):
+    """
+    Likes are generated per user (chunk rows are user indexes here), so
+    each user's likes can be drawn without repeats and the
+    (user, entity_type, entity_id) unique constraint always holds.
+    """
+    rng = _rng(plan, chunk)
+    users, events = plan.counts['users'], plan.counts['events']
+    per_user = plan.counts['likes'] / users
+    rows = []
+    for user_index in range(chunk.start, chunk.stop):
+        wanted = min(events, int(rng.expovariate(1 / per_user)) if per_user else 0)
+        liked = set()
+        attempts = 0
+        while len(liked) < wanted and attempts < wanted * 4:
+            liked.add(_popular_index(rng, events))
+            attempts += 1
+        for event_index in liked:
+            rows.append((
+                plan.user_offset + user_index, 'event', plan.event_offset + event_index,
+                _timestamp(rng, plan),
+            ))
+    return Like, ['user_id', 'entity_type', 'entity_id', 'created_date'], rows
+
+
+def comment_rows(plan, chunk):
+    rng = _rng(plan, chunk)
+    rows = []
+    for _ in range(chunk.start, chunk.stop):
+        created = _timestamp(rng, plan)
+        rows.append((
+            plan.user_offset + rng.randrange(plan.counts['users']), 'event',
+            plan.event_offset + _popular_index(rng, plan.counts['events']),
+            rng.choice(COMMENT_PHRASES), created, created, False, True, rng.random() < 0.01, 0,
+        ))
+    columns = ['user_id', 'entity_type', 'entity_id', 'content', 'created_date', 'modified_date',
+               'is_edited', 'is_active', 'is_flagged', 'like_count']
+    return Comment, columns, rows
+
+
+def contact_message_rows(plan, chunk):
+    rng = _rng(plan, chunk)
+    rows = []
+    for i in range(chunk.start, chunk.stop):
+        rows.append((
+            f'Visitor {i}', f'visitor{i}@example.com', rng.choice(SUBJECTS),
+            'Hello! I have a question about your Halloween events.',
+            f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}', 'Mozilla/5.0', '',
+            _timestamp(rng, plan), rng.random() < 0.8, rng.random() < 0.5, rng.random() < 0.05, '',
+        ))
+    columns = ['name', 'email', 'subject', 'message', 'ip_address', 'user_agent', 'honeypot',
+               'submitted_at', 'is_read', 'is_responded', 'is_spam', 'response_notes']
+    return ContactMessage, columns, rows
+
+
+def completed_madlib_rows(plan, chunk):
+    from games.models import CompletedMadLib
+
+    rng = _rng(plan, chunk)
+    words = ['ghost', 'pumpkin', 'spooky', 'howl', 'eerily', 'bat', 'creepy', 'vanish']
+    rows = []
+    for i in range(chunk.start, chunk.stop):
+        template_id, version_id, blanks = rng.choice(plan.templates)
+        # Words only, like the app saves them; the text is rendered when shown
+        user_words = {blank: rng.choice(words) for blank in blanks}
+        rows.append((
+            plan.user_offset + rng.randrange(plan.counts['users']) if rng.random() < 0.3 else None,
+            template_id, version_id, '', json.dumps(user_words),
+            rng.random() < 0.4, _share_code(plan.madlib_offset + i), _timestamp(rng, plan),
+            int(rng.paretovariate(1.3)) - 1,
+        ))
+    columns = ['user_id', 'template_id', 'template_version_id', 'completed_text', 'user_words', 'is_public',
+               'share_code', 'created_at', 'view_count']
+    return CompletedMadLib, columns, rows
+
+
+def _share_code(number):
+    """
+    Ten-character base-36 code. Codes made by the app are eight
+    characters, so generated codes can never collide with them.
+    """
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    code = ''
+    while number:
+        number, remainder = divmod(number, 36)
+        code = digits[remainder] + code
+    return 'sd' + code.rjust(8, '0')
+
+
+GENERATORS = {
+    'users': user_rows,
+    'locations': location_rows,
+    'events': event_rows,
+    'likes': like_rows,
+    'comments': comment_rows,
+    'contact_messages': contact_message_rows,
+    'completed_madlibs': completed_madlib_rows,
+}
+
+# Tables in the same phase only reference tables from earlier phases
+PHASES = [
+    ['users'],
+    ['locations'],
+    ['events'],
+    ['likes', 'comments', 'contact_messages', 'completed_madlibs'],
+]
+
+# Tables whose primary keys are assigned explicitly and need their
+# sequences moved past the generated ids afterwards
+EXPLICIT_ID_MODELS = [User, Location, Event]
+
+
+def phase_chunks(plan, tables):
+    """List every chunk for a phase. Likes are chunked by user instead of by row."""
+    chunks = []
+    for table in tables:
+        if table == 'likes':
+            if plan.counts['likes']:
+                chunks.extend(
+                    Chunk('likes', n, start, min(start + CHUNK_ROWS // 10, plan.counts['users']))
+                    for n, start in enumerate(range(0, plan.counts['users'], CHUNK_ROWS // 10))
+                )
+        else:
+            chunks.extend(plan.chunks(table))
+    return chunks
+
+
+# ================================================================
+# WRITING
+# ================================================================
+
+def write_chunk(plan, chunk):
+    """Generate one chunk and write it in its own transaction. Returns (table, rows written)."""
+    model, columns, rows = GENERATORS[chunk.table](plan, chunk)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            insert_rows(cursor, model._meta.db_table, columns, rows)
+    return chunk.table, len(rows)
+
+
+def insert_rows(cursor, table, columns, rows):
+    """Bulk insert tuples, using COPY on PostgreSQL and executemany elsewhere."""
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    column_sql = ', '.join(quote(column) for column in columns)
+
+    if connection.vendor == 'postgresql':
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+        copy_sql = f'COPY {quote(table)} ({column_sql}) FROM STDIN'
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy'):
+            # psycopg 3
+            with raw_cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            # psycopg2
+            buffer.seek(0)
+            raw_cursor.copy_expert(copy_sql, buffer)
+    else:
+        placeholders = ', '.join(['%s'] * len(columns))
+        cursor.executemany(
+            f'INSERT INTO {quote(table)} ({column_sql}) VALUES ({placeholders})',
+            [tuple(_db_value(value) for value in row) for row in rows],
+        )
+
+
+def _copy_value(value):
+    """Format a value for PostgreSQL COPY text format."""
+    if value is None:
+        return r'\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text = value.isoformat() if isinstance(value, (date, time)) else str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def _db_value(value):
+    """Format dates and times the way Django stores them on non-PostgreSQL backends."""
+    if isinstance(value, datetime):
+        return connection.ops.adapt_datetimefield_value(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def reset_sequences():
+    """Move primary key sequences past explicitly inserted ids (PostgreSQL only)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), EXPLICIT_ID_MODELS)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,78 @@
+"""
+Signal handlers for the core app.
+
+Registered in CoreConfig.ready() (core/apps.py).
+
+Keeps EventDailyRollup in step with the events table: when an event is
+saved or deleted, the rollup rows for its date are recomputed. If the
+event moved to another day, the old day is recomputed too. Saves that
+only write fields the rollups don't count (view_count on every event
+page view) leave them alone.
+
+Drops this process's nearest haunted places index (core/proximity.py)
+when a haunted place is saved or deleted, or a location's coordinates
+change; it's rebuilt on the next search. Counting a view doesn't move a
+place, so saves of just view_count or visit_count leave it alone, as do
+location saves that keep the coordinates (e.g. verifying it).
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Event, EventDailyRollup, HauntedPlace, Location
+from .proximity import haunted_index
+
+# HauntedPlace fields that aren't in the proximity index
+NOT_IN_INDEX = {'view_count', 'visit_count'}
+# Event fields the rollup rows are counted from
+ROLLUP_FIELDS = {'event_date', 'event_category', 'age_appropriateness', 'cost', 'is_active'}
+
+
+def _changes_rollups(update_fields):
+    """False for saves that only write other fields (e.g. counting a page view)."""
+    return update_fields is None or bool(ROLLUP_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=Event)
+def remember_previous_event_date(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Note the date stored in the database before this save changes it."""
+    instance._previous_event_date = None
+    if instance.pk and not raw and _changes_rollups(update_fields):
+        instance._previous_event_date = (
+            Event.objects.filter(pk=instance.pk).values_list('event_date', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Event)
+def refresh_rollups_after_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        # Loading fixtures: run rebuild_event_rollups afterwards instead
+        return
+    if not _changes_rollups(update_fields):
+        return
+    EventDailyRollup.rebuild_dates([instance.event_date, getattr(instance, '_previous_event_date', None)])
+
+
+@receiver(post_delete, sender=Event)
+def refresh_rollups_after_delete(sender, instance, **kwargs):
+    EventDailyRollup.rebuild_dates([instance.event_date])
+
+
+@receiver(post_save, sender=HauntedPlace)
+def forget_proximity_after_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= NOT_IN_INDEX:
+        return
+    haunted_index.clear()
+
+
+@receiver(post_delete, sender=HauntedPlace)
+def forget_proximity_after_delete(sender, **kwargs):
+    haunted_index.clear()
+
+
+@receiver(post_save, sender=Location)
+def forget_proximity_after_location_move(sender, instance, created=False, raw=False, **kwargs):
+    # Location.save() notes whether the coordinates changed (and stamps
+    # moved_date, which other processes' indexes watch)
+    if not created and not raw and getattr(instance, '_moved', False):
+        haunted_index.clear()
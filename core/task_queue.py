@@ -0,0 +1,519 @@
+"""
+Database-Backed Task Queue for ShriekedIn
+
+Work that doesn't need to finish before the response (sending email,
+resizing images, clean-up jobs) can be handed to a background worker
+instead of running inside the request. The queue is the BackgroundTask
+table in our own database, so there's no Redis or broker to run:
+
+- @task turns a function into a task; task.delay(...) adds a row
+- manage.py run_worker claims ready rows with
+  SELECT ... FOR UPDATE SKIP LOCKED and runs them. Any number of worker
+  processes can share the queue: SKIP LOCKED makes each one pass over
+  rows another worker is claiming instead of waiting for them
+- a failed task is retried with exponential backoff (retry_delay,
+  2 x retry_delay, 4 x ...), up to max_attempts
+- task.enqueue(run_at=...) or countdown=... schedules a task for later,
+  and @task(every=timedelta(...)) makes it periodic: the worker queues
+  the next run when one finishes
+- queue_stats() reports queue depth, waiting time, run time and
+  throughput (the performance panel and run_worker --stats show it)
+
+A task is queued in the caller's transaction: if the request rolls back,
+the task was never queued. Tasks run at least once, not exactly once: a
+worker that dies (or runs past the task's timeout) loses its lease and
+another worker runs the task again, so tasks should be safe to repeat.
+
+Tasks live in each app's tasks.py (see core/tasks.py), which the worker
+imports on start-up, the same way the admin finds admin.py.
+
+Example:
+    >>> @task(max_attempts=5, retry_delay=30)
+    ... def send_welcome_email(user_id):
+    ...     ...
+    >>> send_welcome_email.delay(user.pk)
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, connections, router, transaction
+from django.db.models import Avg, Count, DateTimeField, DurationField, ExpressionWrapper, F, Min, Q, Value
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Seconds a task may run before its lease runs out and another worker retries it
+DEFAULT_TIMEOUT = 300
+# Longest wait between two attempts, however many have failed
+MAX_RETRY_DELAY = 3600
+# How often a worker looks for expired leases and missing periodic tasks
+HOUSEKEEPING_INTERVAL = 30
+
+_registry = {}
+
+
+# ================================================================
+# DEFINING AND QUEUEING TASKS
+# ================================================================
+
+class Task:
+    """A function registered with @task; call .delay() to run it in the background."""
+
+    def __init__(self, func, name, queue, max_attempts, retry_delay, timeout, every):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.every = every
+        self.__doc__ = func.__doc__
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def __call__(self, *args, **kwargs):
+        # Calling the task directly runs it right here, like the plain function
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Queue the task to run as soon as a worker is free."""
+        return self.enqueue(args=args, kwargs=kwargs)
+
+    def enqueue(self, args=(), kwargs=None, run_at=None, countdown=None, queue=None, unique_key=None):
+        """
+        Queue the task, returning its BackgroundTask.
+
+        run_at or countdown (seconds) delays it. With a unique_key, a task
+        that is already queued or running with that key is returned
+        instead of queueing a second one.
+        """
+        if run_at is None:
+            run_at = timezone.now() + timedelta(seconds=countdown or 0)
+        fields = {
+            'name': self.name,
+            'args': list(args),
+            'kwargs': kwargs or {},
+            'queue': queue or self.queue,
+            'run_at': run_at,
+            'max_attempts': self.max_attempts,
+            'timeout': timedelta(seconds=self.timeout),
+            'unique_key': unique_key,
+        }
+        if unique_key is None:
+            return BackgroundTask.objects.create(**fields)
+
+        active = BackgroundTask.objects.filter(unique_key=unique_key, status__in=['queued', 'running'])
+        existing = active.first()
+        if existing:
+            return existing
+        try:
+            # Savepoint, so losing the race doesn't break the caller's transaction
+            with transaction.atomic():
+                return BackgroundTask.objects.create(**fields)
+        except IntegrityError:
+            return active.first()
+
+    def backoff(self, attempts):
+        """Seconds to wait before the next attempt, after `attempts` have failed."""
+        delay = min(self.retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+        # Spread the retries out, so tasks that failed together don't retry together
+        return delay * random.uniform(0.8, 1.2)
+
+    @property
+    def periodic_key(self):
+        return f'periodic:{self.name}'
+
+    def schedule_next(self, after):
+        """Queue the next run of a periodic task, `every` after `after`."""
+        return self.enqueue(run_at=after + self.every, unique_key=self.periodic_key)
+
+
+def task(func=None, *, name=None, queue='default', max_attempts=3, retry_delay=10, timeout=DEFAULT_TIMEOUT, every=None):
+    """
+    Register a function as a background task.
+
+    Use as @task or @task(...). The name defaults to module.function and is
+    what gets stored in the queue, so renaming a task strands the rows
+    already queued under the old name.
+    """
+    def register(func):
+        registered = Task(
+            func,
+            name=name or f'{func.__module__}.{func.__name__}',
+            queue=queue,
+            max_attempts=max_attempts,
+            retry_delay=retry_delay,
+            timeout=timeout,
+            every=every,
+        )
+        _registry[registered.name] = registered
+        return registered
+
+    return register(func) if func is not None else register
+
+
+def autodiscover():
+    """Import every installed app's tasks.py, registering its tasks."""
+    autodiscover_modules('tasks')
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def periodic_tasks():
+    return [registered for registered in _registry.values() if registered.every]
+
+
+def ensure_periodic_tasks():
+    """Queue a first run of every periodic task that has none queued or running."""
+    for registered in periodic_tasks():
+        registered.enqueue(unique_key=registered.periodic_key)
+
+
+# ================================================================
+# THE WORKER
+# ================================================================
+
+class WorkerStats:
+    """Throughput counters for one worker process since the last report."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.retried = 0
+        self.failed = 0
+        self.busy = 0.0
+
+    def record(self, outcome, seconds):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        self.busy += seconds
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        finished = self.done + self.retried + self.failed
+        return (
+            f'{finished:,} tasks in {elapsed:.0f}s ({finished / elapsed:.1f}/s): '
+            f'{self.done:,} done, {self.retried:,} retried, {self.failed:,} failed, '
+            f'{100 * min(self.busy / elapsed, 1):.0f}% busy'
+        )
+
+
+class Worker:
+    """
+    Claims and runs tasks from the queue until stopped.
+
+    batch_size tasks are claimed per query. 1 (the default) shares slow
+    tasks best between processes; a larger batch saves a query per task
+    when there are many quick ones.
+    """
+
+    def __init__(self, queues=('default',), batch_size=1, name=None, report=None, report_interval=60):
+        self.queues = list(queues)
+        self.batch_size = max(1, batch_size)
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.report = report or logger.info
+        self.report_interval = report_interval
+        self.stats = WorkerStats()
+        self._stop = threading.Event()
+        self._last_housekeeping = None
+        autodiscover()
+
+    def stop(self):
+        """Finish the current task, then return from run()."""
+        self._stop.set()
+
+    @property
+    def stopping(self):
+        return self._stop.is_set()
+
+    def run(self, burst=False, sleep=1.0):
+        """
+        Run tasks until stop() is called.
+
+        With burst=True, return as soon as no task is ready instead.
+        Returns the number of tasks run.
+        """
+        total = 0
+        last_report = time.monotonic()
+        while not self.stopping:
+            self.housekeeping()
+            ran = self.run_batch()
+            total += ran
+
+            if self.report_interval and time.monotonic() - last_report >= self.report_interval:
+                self.report(f'{self.name}: {self.stats.summary()}')
+                self.stats.reset()
+                last_report = time.monotonic()
+
+            if not ran:
+                if burst:
+                    break
+                self._stop.wait(sleep)
+                # Like a new request: drop connections the database closed while we slept
+                close_old_connections()
+        return total
+
+    def run_batch(self):
+        """Claim up to batch_size ready tasks and run them; returns how many ran."""
+        claimed = self.claim()
+        ran = 0
+        for index, record in enumerate(claimed):
+            if self.stopping:
+                self.release(claimed[index:])
+                break
+            # The first task's claim already started it; later ones start now
+            if index and not self.start(record):
+                continue
+            if self.execute(record) != 'done':
+                # The error may have broken the connection
+                close_old_connections()
+            ran += 1
+        return ran
+
+    def housekeeping(self):
+        """Every HOUSEKEEPING_INTERVAL: requeue tasks of dead workers, queue missing periodic tasks."""
+        now = time.monotonic()
+        if self._last_housekeeping is not None and now - self._last_housekeeping < HOUSEKEEPING_INTERVAL:
+            return
+        self._last_housekeeping = now
+        requeue_expired()
+        ensure_periodic_tasks()
+
+    # ------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------
+
+    def claim(self):
+        """
+        Lock and mark as running up to batch_size ready tasks.
+
+        Queues are tried in the order given, so the first one has priority.
+        One query per queue lets the database read the (queue, run_at)
+        index in order instead of sorting every ready task.
+        """
+        now = timezone.now()
+        alias = router.db_for_write(BackgroundTask)
+        claim = self._claim_returning if connections[alias].vendor == 'postgresql' else self._claim_locked
+        for queue in self.queues:
+            claimed = claim(alias, queue, now)
+            if claimed:
+                return claimed
+        return []
+
+    def _claim_locked(self, alias, queue, now):
+        with transaction.atomic(using=alias):
+            ready = (
+                BackgroundTask.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='queued', queue=queue, run_at__lte=now)
+                .order_by('run_at')
+            )[:self.batch_size]
+            claimed = list(ready)
+            if not claimed:
+                return []
+            BackgroundTask.objects.filter(pk__in=[record.pk for record in claimed]).update(
+                status='running',
+                attempts=F('attempts') + 1,
+                locked_by=self.name,
+                locked_until=ExpressionWrapper(Value(now) + F('timeout'), output_field=DateTimeField()),
+                started_at=now,
+            )
+        for record in claimed:
+            record.attempts += 1
+            record.started_at = now
+        return claimed
+
+    def _claim_returning(self, alias, queue, now):
+        # Find, lock and update the tasks in one statement (and one commit):
+        # the hot path of every worker, so one round trip instead of four
+        table = BackgroundTask._meta.db_table
+        sql = f"""
+            UPDATE {table}
+            SET status = 'running', attempts = attempts + 1, locked_by = %s,
+                locked_until = %s + timeout, started_at = %s
+            WHERE id IN (
+                SELECT id FROM {table}
+                WHERE status = 'queued' AND queue = %s AND run_at <= %s
+                ORDER BY run_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *
+        """
+        params = [self.name, now, now, queue, now, self.batch_size]
+        claimed = list(BackgroundTask.objects.db_manager(alias).raw(sql, params))
+        return sorted(claimed, key=lambda record: record.run_at)
+
+    def start(self, record):
+        """Renew the lease of a task claimed in a batch; False if it was lost meanwhile."""
+        now = timezone.now()
+        record.started_at = now
+        return self._mine(record).update(started_at=now, locked_until=now + record.timeout) == 1
+
+    def release(self, records):
+        """Put claimed tasks back in the queue untouched (the worker is stopping)."""
+        BackgroundTask.objects.filter(
+            pk__in=[record.pk for record in records], status='running', locked_by=self.name,
+        ).update(
+            status='queued',
+            attempts=F('attempts') - 1,
+            locked_by='',
+            locked_until=None,
+            started_at=None,
+        )
+
+    # ------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------
+
+    def execute(self, record):
+        """Run one claimed task and record the outcome."""
+        registered = get_task(record.name)
+        started = time.perf_counter()
+        try:
+            if registered is None:
+                raise LookupError(f'No task registered as {record.name!r}')
+            registered.func(*record.args, **record.kwargs)
+        except Exception:
+            logger.exception('Task %s #%s failed (attempt %s of %s)', record.name, record.pk, record.attempts, record.max_attempts)
+            outcome = self.failed(record, registered, traceback.format_exc())
+        else:
+            outcome = self.succeeded(record, registered)
+        self.stats.record(outcome, time.perf_counter() - started)
+        return outcome
+
+    def _mine(self, record):
+        # Only while we still hold the lease: an expired task may be someone else's now
+        return BackgroundTask.objects.filter(pk=record.pk, status='running', locked_by=self.name)
+
+    def succeeded(self, record, registered):
+        now = timezone.now()
+        with transaction.atomic():
+            updated = self._mine(record).update(status='done', finished_at=now, locked_by='', locked_until=None)
+            if updated and registered.every:
+                registered.schedule_next(record.started_at)
+        return 'done'
+
+    def failed(self, record, registered, error):
+        now = timezone.now()
+        if registered is not None and record.attempts < record.max_attempts:
+            self._mine(record).update(
+                status='queued',
+                run_at=now + timedelta(seconds=registered.backoff(record.attempts)),
+                last_error=error,
+                locked_by='',
+                locked_until=None,
+            )
+            return 'retried'
+
+        with transaction.atomic():
+            updated = self._mine(record).update(
+                status='failed', finished_at=now, last_error=error, locked_by='', locked_until=None,
+            )
+            # A periodic task keeps its schedule even when one run gives up
+            if updated and registered is not None and registered.every:
+                registered.schedule_next(record.started_at)
+        return 'failed'
+
+
+def requeue_expired():
+    """
+    Hand back tasks whose worker stopped renewing its lease (crash, deploy, timeout).
+
+    Tasks with attempts left go back in the queue; the rest fail.
+    Returns (requeued, failed).
+    """
+    now = timezone.now()
+    expired = BackgroundTask.objects.filter(status='running', locked_until__lt=now)
+    message = 'Worker lease expired: the worker stopped or the task ran past its timeout.'
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, last_error=message, locked_by='', locked_until=None,
+    )
+    requeued = expired.update(
+        status='queued', run_at=now, last_error=message, locked_by='', locked_until=None,
+    )
+    if failed or requeued:
+        logger.warning('Requeued %s and failed %s tasks with expired leases', requeued, failed)
+    return requeued, failed
+
+
+def supports_skip_locked():
+    """True if the queue's database can share it between several worker processes."""
+    alias = router.db_for_write(BackgroundTask)
+    return connections[alias].features.has_select_for_update_skip_locked
+
+
+# ================================================================
+# METRICS
+# ================================================================
+
+def queue_stats(window=timedelta(hours=1)):
+    """
+    Per-task numbers for the queue, newest work only.
+
+    For every task name: how many are ready, scheduled for later,
+    running, failed (and not purged yet), and finished within `window`;
+    the oldest ready task's age; average wait (due until started) and
+    run time of the tasks finished within the window; and the finished
+    tasks per minute.
+    """
+    now = timezone.now()
+    since = now - window
+    recent = Q(status='done', finished_at__gte=since)
+    rows = (
+        BackgroundTask.objects
+        .filter(Q(status__in=['queued', 'running', 'failed']) | recent)
+        .values('queue', 'name')
+        .annotate(
+            ready=Count('pk', filter=Q(status='queued', run_at__lte=now)),
+            scheduled=Count('pk', filter=Q(status='queued', run_at__gt=now)),
+            running=Count('pk', filter=Q(status='running')),
+            failed=Count('pk', filter=Q(status='failed')),
+            done=Count('pk', filter=recent),
+            oldest_ready=Min('run_at', filter=Q(status='queued', run_at__lte=now)),
+            avg_wait=Avg(
+                ExpressionWrapper(F('started_at') - F('run_at'), output_field=DurationField()),
+                filter=recent,
+            ),
+            avg_run=Avg(
+                ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField()),
+                filter=recent,
+            ),
+        )
+        .order_by('queue', 'name')
+    )
+
+    def ms(duration):
+        return None if duration is None else round(max(duration.total_seconds(), 0) * 1000, 1)
+
+    stats = []
+    for row in rows:
+        stats.append({
+            'queue': row['queue'],
+            'name': row['name'],
+            'ready': row['ready'],
+            'scheduled': row['scheduled'],
+            'running': row['running'],
+            'failed': row['failed'],
+            'done': row['done'],
+            'per_minute': round(row['done'] / (window.total_seconds() / 60), 1),
+            'oldest_ready_s': None if row['oldest_ready'] is None else round((now - row['oldest_ready']).total_seconds(), 1),
+            'avg_wait_ms': ms(row['avg_wait']),
+            'avg_run_ms': ms(row['avg_run']),
+        })
+    return stats
@@ -0,0 +1,75 @@
+"""
+Background Tasks for the Core App
+
+Run by `manage.py run_worker` (see core/task_queue.py). The periodic
+tasks here replace cron jobs: a running worker keeps them on schedule.
+
+- ping: does nothing (or sleeps); queue it to check a worker is alive or
+  to load-test workers
+- run_bulk_action: runs one admin bulk action job (core/bulk_actions.py)
+- resume_bulk_actions: every 5 minutes, picks up stalled bulk action jobs
+- purge_sessions: daily, deletes expired sessions in small batches
+- purge_finished_tasks: hourly, deletes finished tasks after TASK_HISTORY_DAYS
+"""
+
+import logging
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from .models import BackgroundTask
+from .task_queue import task
+
+logger = logging.getLogger(__name__)
+
+# Finished tasks deleted per query by purge_finished_tasks
+PURGE_BATCH_SIZE = 5000
+
+
+@task
+def ping(seconds=0):
+    """Do nothing, after sleeping `seconds` (a stand-in for waiting on an email server)."""
+    if seconds:
+        time.sleep(seconds)
+
+
+@task(timeout=3600, max_attempts=1)
+def run_bulk_action(job_id):
+    """Run a BulkActionJob; a failure is recorded on the job itself."""
+    from .bulk_actions import run_job
+
+    run_job(job_id)
+
+
+@task(timeout=3600, max_attempts=1, every=timedelta(minutes=5))
+def resume_bulk_actions():
+    """Run queued bulk action jobs and resume stalled ones."""
+    from .bulk_actions import run_pending
+
+    run_pending()
+
+
+@task(every=timedelta(days=1))
+def purge_sessions():
+    """Delete expired sessions (manage.py purge_sessions)."""
+    out = StringIO()
+    call_command('purge_sessions', pause=0.05, stdout=out)
+    logger.info(out.getvalue().strip())
+
+
+@task(every=timedelta(hours=1))
+def purge_finished_tasks():
+    """Delete done and failed tasks that finished more than TASK_HISTORY_DAYS ago."""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'TASK_HISTORY_DAYS', 7))
+    finished = BackgroundTask.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    deleted = 0
+    while True:
+        # Small batches keep each delete (and its locks) short
+        pks = list(finished.values_list('pk', flat=True)[:PURGE_BATCH_SIZE])
+        if not pks:
+            return deleted
+        deleted += BackgroundTask.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,92 @@
+"""
+Template Loaders that Strip Comments and Indentation
+
+Our templates carry long teaching comments and deep indentation. Django
+parses all of that on first use in every worker, and HTML comments
+(<!-- ... -->) inside blocks are even sent to every visitor.
+
+These loaders are Django's filesystem and app_directories loaders with
+one extra step: when an .html template is read, strip_template() removes
+- template comments: {# ... #} and {% comment %} ... {% endcomment %}
+- HTML comments, except conditional comments and ones containing
+  template tags (removing those could unbalance {% block %} tags)
+- indentation, trailing spaces and blank lines
+
+Left untouched: <pre>, <textarea> and {% verbatim %} content (where
+whitespace matters), and HTML comments inside <script>/<style>. Other
+file types (.txt e-mails, .xml) are never changed.
+
+settings.TEMPLATES wraps these in Django's cached loader, so each template
+is read, stripped and compiled once per worker (once per deploy, with
+gunicorn's preload_app and core/warmup.py). Set TEMPLATE_STRIP=False to
+serve templates exactly as written, e.g. while debugging markup.
+"""
+
+import re
+
+from django.conf import settings
+from django.template.loaders import app_directories, filesystem
+
+
+# Regions whose whitespace and comments are part of the output
+_PROTECTED = re.compile(
+    r'(<pre\b.*?</pre>|<textarea\b.*?</textarea>|{%\s*verbatim\b.*?{%\s*endverbatim\s*%})',
+    re.S | re.I,
+)
+# Raw-text elements: "<!--" inside them isn't an HTML comment
+_RAW_TEXT = re.compile(r'(<script\b.*?</script>|<style\b.*?</style>)', re.S | re.I)
+
+_COMMENT_BLOCK = re.compile(r'{%\s*comment\b.*?%}.*?{%\s*endcomment\s*%}', re.S)
+_LINE_COMMENT = re.compile(r'{#.*?#}')
+_HTML_COMMENT = re.compile(r'<!--(?!\[if|<!|!)(?:(?!{%).)*?-->', re.S)
+_INDENT = re.compile(r'\n[ \t]+')
+_TRAILING = re.compile(r'[ \t]+\n')
+_BLANK_LINES = re.compile(r'\n{2,}')
+
+
+def _strip_markup(text):
+    parts = _RAW_TEXT.split(text)
+    # Even indexes are markup, odd indexes are <script>/<style> elements
+    parts[::2] = [_HTML_COMMENT.sub('', part) for part in parts[::2]]
+    return ''.join(parts)
+
+
+def _strip_chunk(text):
+    text = _COMMENT_BLOCK.sub('', text)
+    text = _LINE_COMMENT.sub('', text)
+    text = _strip_markup(text)
+    text = _TRAILING.sub('\n', text)
+    text = _INDENT.sub('\n', text)
+    return _BLANK_LINES.sub('\n', text)
+
+
+def strip_template(source):
+    """
+    Return template source without comments and insignificant whitespace.
+
+    Example:
+        >>> strip_template('<div>\\n    {# note #}\\n    <!-- hero -->\\n    <h1>Boo</h1>\\n</div>')
+        '<div>\\n<h1>Boo</h1>\\n</div>'
+    """
+    parts = _PROTECTED.split(source)
+    # Even indexes are ordinary template text, odd indexes are protected
+    parts[::2] = [_strip_chunk(part) for part in parts[::2]]
+    return ''.join(parts)
+
+
+class StrippingMixin:
+    """Strips .html template sources as they are read (see strip_template)."""
+
+    def get_contents(self, origin):
+        contents = super().get_contents(origin)
+        if getattr(settings, 'TEMPLATE_STRIP', True) and origin.name.endswith('.html'):
+            contents = strip_template(contents)
+        return contents
+
+
+class FilesystemLoader(StrippingMixin, filesystem.Loader):
+    """Loads templates from TEMPLATES['DIRS'], stripped."""
+
+
+class AppDirectoriesLoader(StrippingMixin, app_directories.Loader):
+    """Loads templates from each app's templates/ directory, stripped."""
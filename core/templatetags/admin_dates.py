@@ -0,0 +1,114 @@
+"""
+A Cheaper Admin Date Hierarchy
+
+Django's {% date_hierarchy %} tag lists the years, months or days that
+have rows with SELECT DISTINCT DATE_TRUNC(...), which reads every row in
+range. {% fast_date_hierarchy %} renders the same links from the first
+and last date (MIN/MAX, a couple of index lookups when the field is
+indexed) and lists every period between them. A period with no rows
+just shows an empty changelist when clicked.
+
+Used by templates/admin/fast_change_list.html (see core/admin_mixins.py).
+"""
+
+import datetime
+
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.contrib.admin.utils import get_fields_from_path
+from django.db import models
+from django.template import Library
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = Library()
+
+
+def _date_span(queryset, field_name, is_datetime):
+    """(first, last) date of the changelist's rows, or (None, None) if there are none."""
+    span = queryset.aggregate(first=models.Min(field_name), last=models.Max(field_name))
+    first, last = span['first'], span['last']
+    if first is None or last is None:
+        return None, None
+    if is_datetime:
+        first, last = [timezone.localtime(value) if timezone.is_aware(value) else value for value in (first, last)]
+        first, last = first.date(), last.date()
+    return first, last
+
+
+def fast_date_hierarchy(cl):
+    """Same context as Django's date_hierarchy(), without the DISTINCT queries."""
+    field_name = cl.date_hierarchy
+    year_field = f'{field_name}__year'
+    month_field = f'{field_name}__month'
+    day_field = f'{field_name}__day'
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    if year_lookup and month_lookup and day_lookup:
+        # A single day needs no query at all
+        return date_hierarchy(cl)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    field = get_fields_from_path(cl.model, field_name)[-1]
+    first, last = _date_span(cl.queryset, field_name, isinstance(field, models.DateTimeField))
+    if first is None:
+        return {'show': False}
+
+    # Start at the deepest level the rows span, like Django does
+    if not year_lookup and first.year == last.year:
+        year_lookup = first.year
+        if first.month == last.month:
+            month_lookup = first.month
+
+    if year_lookup and month_lookup:
+        year, month = int(year_lookup), int(month_lookup)
+        days = [datetime.date(year, month, day) for day in range(first.day, last.day + 1)]
+        return {
+            'show': True,
+            'back': {'link': link({year_field: year_lookup}), 'title': str(year_lookup)},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    'title': capfirst(formats.date_format(day, 'MONTH_DAY_FORMAT')),
+                }
+                for day in days
+            ],
+        }
+    if year_lookup:
+        year = int(year_lookup)
+        months = [datetime.date(year, month, 1) for month in range(first.month, last.month + 1)]
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [
+                {
+                    'link': link({year_field: year_lookup, month_field: month.month}),
+                    'title': capfirst(formats.date_format(month, 'YEAR_MONTH_FORMAT')),
+                }
+                for month in months
+            ],
+        }
+    return {
+        'show': True,
+        'back': None,
+        'choices': [
+            {'link': link({year_field: str(year)}), 'title': str(year)}
+            for year in range(first.year, last.year + 1)
+        ],
+    }
+
+
+@register.tag(name='fast_date_hierarchy')
+def fast_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=fast_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
@@ -70,6 +70,25 @@ urlpatterns = [
     # Requires login - will redirect to login page if not authenticated
     path('dashboard/', views.dashboard, name='dashboard'),
 
+    # PERFORMANCE PANEL
+    # URL: /dashboard/performance/
+    # View: views.performance_panel
+    # Template: templates/performance_panel.html
+    # Purpose: Staff-only view of per-route query counts and timings
+    path('dashboard/performance/', views.performance_panel, name='performance_panel'),
+
+    # URL: /dashboard/performance/db-pool.json
+    # View: views.db_pool_metrics
+    # Purpose: Staff-only JSON export of connection checkout and pool metrics
+    path('dashboard/performance/db-pool.json', views.db_pool_metrics, name='db_pool_metrics'),
+
+    # READINESS CHECK
+    # URL: /readyz/
+    # View: views.readyz
+    # Purpose: 200 once this worker is warmed up (core/warmup.py) and the
+    # database answers, 503 otherwise. Used by load balancers and deploys.
+    path('readyz/', views.readyz, name='readyz'),
+
     #################################################################
     # LEGAL PAGES
     #################################################################
@@ -145,6 +164,18 @@ urlpatterns = [
     #   <a href="{% url 'core:haunted_detail' place.id %}">View Details</a>
     path('haunted/<int:place_id>/', views.haunted_detail, name='haunted_detail'),
 
+    # NEAREST HAUNTED PLACES API
+    # URL: /api/haunted/nearby/?lat=..&lon=..&k=..&min_scare=..&max_scare=..&km=..
+    # View: views.api_nearby_haunted
+    # Purpose: Haunted places nearest the visitor, nearest first (see core/proximity.py)
+    path('api/haunted/nearby/', views.api_nearby_haunted, name='api_nearby_haunted'),
+
+    # GHOST TOUR API
+    # URL: /api/haunted/tour/?places=12,7,31&round_trip=1
+    # View: views.api_ghost_tour
+    # Purpose: A short walking order for the chosen haunted places (see core/tours.py)
+    path('api/haunted/tour/', views.api_ghost_tour, name='api_ghost_tour'),
+
     #################################################################
     # EVENTS
     #################################################################
@@ -161,6 +192,25 @@ urlpatterns = [
     # Purpose: Display detailed information about a specific event
     path('events/<int:event_id>/', views.event_detail, name='event_detail'),
 
+    # HAPPENING NOW
+    # URL: /events/happening-now/
+    # View: views.happening_now
+    # Template: templates/happening_now.html
+    # Purpose: Events starting in the next few hours near the visitor
+    path('events/happening-now/', views.happening_now, name='happening_now'),
+
+    # HAPPENING NOW API
+    # URL: /api/events/happening-now/?lat=..&lon=..&km=..&hours=..
+    # View: views.api_happening_now
+    # Purpose: JSON version of the page above (see core/nearby.py)
+    path('api/events/happening-now/', views.api_happening_now, name='api_happening_now'),
+
+    # EVENT CALENDAR API
+    # URL: /events/calendar/<int:year>/<int:month>/
+    # View: views.event_calendar
+    # Purpose: JSON per-day event counts for a month (from EventDailyRollup)
+    path('events/calendar/<int:year>/<int:month>/', views.event_calendar, name='event_calendar'),
+
     #################################################################
     # BUSINESSES
     #################################################################
@@ -177,6 +227,12 @@ urlpatterns = [
     # Purpose: Display detailed information about a specific business
     path('businesses/<slug:slug>/', views.business_detail, name='business_detail'),
 
+    # COUPON REDEMPTION API
+    # URL: /coupons/redeem/ (POST)
+    # View: views.redeem_coupon
+    # Purpose: Record one use of a coupon code, safely under heavy concurrency
+    path('coupons/redeem/', views.redeem_coupon, name='redeem_coupon'),
+
     #################################################################
     # FUTURE URLs (Coming in later sprints)
     #################################################################
@@ -13,17 +13,23 @@ For developers new to Django:
 """
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.contrib.auth.models import User
-from django.contrib.sessions.models import Session
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from django.db import connection
 from django.conf import settings
 import sys
 
 # Import our models
-from .models import Location, Event, HauntedPlace, Business
+from .models import Location, Event, EventDailyRollup, HauntedPlace, Business, Coupon
+from . import warmup
+from .db_pool import connection_status
+from .db_routers import replica_status
+from .stats import estimated_active_sessions
 
 
 def home(request):
@@ -149,6 +155,84 @@ def dashboard(request):
     })
 
 
+@user_passes_test(lambda user: user.is_staff, login_url='core:login')
+def performance_panel(request):
+    """
+    Performance Panel View (staff only)
+
+    Shows per-view metrics collected by RequestInstrumentationMiddleware:
+    query counts, SQL time, slowest statements, template render time and
+    response size, grouped by URL name. Also shows the background task
+    queue (core/task_queue.py) for the last hour.
+
+    Metrics are kept in memory per worker process, so each refresh may be
+    served by a different worker with its own window. POST clears the
+    window for the worker that handles it.
+
+    Template: templates/performance_panel.html
+    URL: /dashboard/performance/
+    """
+    from .instrumentation import metrics_window
+    from .task_queue import queue_stats
+
+    window = metrics_window()
+    if request.method == 'POST':
+        window.clear()
+        messages.success(request, 'Performance metrics cleared for this worker.')
+        return redirect('core:performance_panel')
+
+    return render(request, 'performance_panel.html', {
+        'rows': window.summary(),
+        'window_size': window.size,
+        'instrumentation_enabled': getattr(settings, 'REQUEST_INSTRUMENTATION', False),
+        'session_engine': settings.SESSION_ENGINE.rsplit('.', 1)[-1],
+        'active_sessions': estimated_active_sessions(),
+        'replicas': replica_status(),
+        'databases': connection_status(),
+        'tasks': queue_stats(),
+        'warmup': warmup.last_report(),
+    })
+
+
+@user_passes_test(lambda user: user.is_staff, login_url='core:login')
+def db_pool_metrics(request):
+    """
+    Connection checkout and pool metrics as JSON (staff only).
+
+    Numbers are for the worker process that answers the request, so
+    scrape it a few times (or per worker) for a full picture.
+    See core/db_pool.py for what each number means.
+    """
+    return JsonResponse({'databases': connection_status()})
+
+
+def readyz(request):
+    """
+    Readiness check for this worker process.
+
+    The first call warms the worker up if gunicorn hasn't already (see
+    core/warmup.py), so templates, URLs and connections are ready before
+    real visitors arrive. Answers 200 when that worked and the default
+    database responds, 503 otherwise; unreachable replicas only show up
+    as warnings in the report. Anyone but staff gets only the step names
+    and statuses; the error messages are logged and shown on the
+    performance panel. Never cached.
+    """
+    report = warmup.ensure_warm()
+    database_ok = warmup.databases_answer()
+    ready = report.warm and database_ok
+    response = JsonResponse(
+        {
+            'ready': ready,
+            'database': database_ok,
+            'warmup': report.as_dict() if request.user.is_staff else report.summary(),
+        },
+        status=200 if ready else 503,
+    )
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
 def get_technical_stats():
     """
     Helper function to gather technical statistics
@@ -167,34 +251,24 @@ def get_technical_stats():
     except Exception:
         db_size = "N/A"
 
-    # Get all database tables with row counts
+    # Get all database tables with (estimated) row counts
+    # Planner statistics instead of COUNT(*) on every table, which would read
+    # every row of big tables like django_session (see core/stats.py)
     database_tables = []
     try:
         with connection.cursor() as cursor:
-            # Get all tables in the current database
             cursor.execute("""
-                SELECT table_name
-                FROM information_schema.tables
-                WHERE table_schema = 'public'
-                ORDER BY table_name;
+                SELECT c.relname, c.reltuples::bigint
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 'public' AND c.relkind = 'r'
+                ORDER BY c.relname;
             """)
-            tables = cursor.fetchall()
-
-            # Get row count for each table
-            for table in tables:
-                table_name = table[0]
-                try:
-                    cursor.execute(f'SELECT COUNT(*) FROM "{table_name}";')
-                    count = cursor.fetchone()[0]
-                    database_tables.append({
-                        'name': table_name,
-                        'count': count
-                    })
-                except Exception:
-                    database_tables.append({
-                        'name': table_name,
-                        'count': 'N/A'
-                    })
+            for table_name, estimate in cursor.fetchall():
+                database_tables.append({
+                    'name': table_name,
+                    'count': estimate if estimate >= 0 else 'N/A'
+                })
     except Exception:
         database_tables = [{'name': 'Error fetching tables', 'count': 'N/A'}]
 
@@ -207,7 +281,7 @@ def get_technical_stats():
     return {
         # User Statistics
         'total_users': User.objects.count(),
-        'active_sessions': Session.objects.count(),
+        'active_sessions': estimated_active_sessions(),
 
         # System Information
         'django_version': settings.DJANGO_VERSION_STRING if hasattr(settings, 'DJANGO_VERSION_STRING') else 'Django 5.2.7',
@@ -321,6 +395,104 @@ def haunted_detail(request, place_id):
     return render(request, 'haunted_detail.html', context)
 
 
+def api_nearby_haunted(request):
+    """
+    Nearest Haunted Places API
+
+    GET /api/haunted/nearby/?lat=42.52&lon=-70.89&k=10&min_scare=2&max_scare=4&km=25
+    Returns: {"count": 2, "places": [{"id", "title", "url", "scare_level",
+              "distance_km", "location": {...}}, ...]}
+
+    Nearest first. k (default 10, at most 100), the scare levels and km
+    are optional. See core/proximity.py.
+    """
+    from .proximity import DEFAULT_RESULTS, nearest_haunted_places
+
+    params = request.GET
+    if not params.get('lat') or not params.get('lon'):
+        return JsonResponse({'error': 'lat and lon are required'}, status=400)
+    try:
+        lat = float(params['lat'])
+        lon = float(params['lon'])
+        k = int(params.get('k') or DEFAULT_RESULTS)
+        min_scare = int(params['min_scare']) if params.get('min_scare') else None
+        max_scare = int(params['max_scare']) if params.get('max_scare') else None
+        max_km = float(params['km']) if params.get('km') else None
+    except ValueError:
+        return JsonResponse({'error': 'lat, lon, k, min_scare, max_scare and km must be numbers'}, status=400)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return JsonResponse({'error': 'Coordinates out of range'}, status=400)
+
+    results = nearest_haunted_places(lat, lon, k=k, min_scare=min_scare, max_scare=max_scare, max_km=max_km)
+    return JsonResponse({
+        'count': len(results),
+        'places': [
+            {
+                'id': item.place.id,
+                'title': item.place.story_title,
+                'url': reverse('core:haunted_detail', args=[item.place.id]),
+                'scare_level': item.place.scare_level,
+                'distance_km': round(item.distance_km, 2),
+                'location': {
+                    'name': item.place.location.name,
+                    'city': item.place.location.city,
+                    'state': item.place.location.state,
+                    'latitude': float(item.place.location.latitude),
+                    'longitude': float(item.place.location.longitude),
+                },
+            }
+            for item in results
+        ],
+    })
+
+
+def api_ghost_tour(request):
+    """
+    Ghost Tour API
+
+    GET /api/haunted/tour/?places=12,7,31,4&round_trip=1
+    Returns: {"stops": [{"id", "title", "url", "latitude", "longitude",
+              "next_km"}, ...], "total_km": 3.4, "walking_minutes": 41,
+              "round_trip": true, "finished": true, "elapsed_ms": 1.2}
+
+    The tour starts at the first place listed; the others are put in a
+    short walking order. See core/tours.py.
+    """
+    from .tours import TourError, plan_tour
+
+    try:
+        place_ids = [int(place_id) for place_id in request.GET.get('places', '').split(',') if place_id.strip()]
+    except ValueError:
+        return JsonResponse({'error': 'places must be a comma-separated list of ids'}, status=400)
+    # Ids past a 64-bit integer overflow the database driver rather than just not matching
+    if any(not 0 < place_id < 2 ** 63 for place_id in place_ids):
+        return JsonResponse({'error': 'places must be a comma-separated list of ids'}, status=400)
+    try:
+        tour = plan_tour(place_ids, round_trip=request.GET.get('round_trip') in ('1', 'true'))
+    except TourError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    return JsonResponse({
+        'stops': [
+            {
+                'id': place.id,
+                'title': place.story_title,
+                'url': reverse('core:haunted_detail', args=[place.id]),
+                'latitude': float(place.location.latitude),
+                'longitude': float(place.location.longitude),
+                # Distance to the next stop (back to the start for the last stop of a round trip)
+                'next_km': round(tour.legs_km[index], 3) if index < len(tour.legs_km) else None,
+            }
+            for index, place in enumerate(tour.stops)
+        ],
+        'total_km': round(tour.total_km, 3),
+        'walking_minutes': round(tour.walking_minutes),
+        'round_trip': tour.round_trip,
+        'finished': tour.finished,
+        'elapsed_ms': round(tour.elapsed_ms, 2),
+    })
+
+
 def events_list(request):
     """
     Events Listing View
@@ -369,6 +541,103 @@ def events_list(request):
     return render(request, 'events_list.html', context)
 
 
+def _happening_now_search(params):
+    """
+    Run a happening-now search from GET parameters (lat, lon, km, hours).
+
+    Returns None if lat/lon are missing; raises ValueError if they are not
+    valid coordinates.
+    """
+    from .nearby import happening_now, DEFAULT_RADIUS_KM, DEFAULT_HOURS
+
+    if not params.get('lat') or not params.get('lon'):
+        return None
+    lat = float(params['lat'])
+    lon = float(params['lon'])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('Coordinates out of range')
+    return happening_now(
+        lat, lon,
+        radius_km=float(params.get('km') or DEFAULT_RADIUS_KM),
+        hours=float(params.get('hours') or DEFAULT_HOURS),
+    )
+
+
+def happening_now(request):
+    """
+    Happening Now Page
+
+    Events starting in the next few hours near the visitor. The browser's
+    location fills in lat/lon (see the template); the search itself runs
+    on the server, so the page also works from a plain form submit.
+
+    Template: templates/happening_now.html
+    URL: /events/happening-now/?lat=42.52&lon=-70.89&km=10&hours=3
+    """
+    from .nearby import DEFAULT_RADIUS_KM, DEFAULT_HOURS
+
+    error = None
+    try:
+        search = _happening_now_search(request.GET)
+    except ValueError:
+        search = None
+        error = 'Please enter a valid latitude and longitude.'
+
+    context = {
+        'search': search,
+        'error': error,
+        'lat': request.GET.get('lat', ''),
+        'lon': request.GET.get('lon', ''),
+        'km': request.GET.get('km') or DEFAULT_RADIUS_KM,
+        'hours': request.GET.get('hours') or DEFAULT_HOURS,
+    }
+    return render(request, 'happening_now.html', context)
+
+
+def api_happening_now(request):
+    """
+    Happening Now API
+
+    GET /api/events/happening-now/?lat=42.52&lon=-70.89&km=10&hours=3
+    Returns: {"count": 2, "elapsed_ms": 3.1, "truncated": false,
+              "events": [{"id", "title", "url", "starts_at", "distance_km",
+                          "category", "is_free", "location": {...}}, ...]}
+
+    Sorted by distance, then start time. See core/nearby.py.
+    """
+    try:
+        search = _happening_now_search(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'lat, lon, km and hours must be numbers'}, status=400)
+    if search is None:
+        return JsonResponse({'error': 'lat and lon are required'}, status=400)
+
+    return JsonResponse({
+        'count': len(search.results),
+        'elapsed_ms': round(search.elapsed_ms, 2),
+        'truncated': search.truncated,
+        'events': [
+            {
+                'id': item.event.id,
+                'title': item.event.title,
+                'url': reverse('core:event_detail', args=[item.event.id]),
+                'starts_at': item.event.starts_at.isoformat(),
+                'distance_km': round(item.distance_km, 2),
+                'category': item.event.event_category,
+                'is_free': item.event.is_free,
+                'location': {
+                    'name': item.event.location.name,
+                    'city': item.event.location.city,
+                    'state': item.event.location.state,
+                    'latitude': float(item.event.location.latitude),
+                    'longitude': float(item.event.location.longitude),
+                },
+            }
+            for item in search.results
+        ],
+    })
+
+
 def event_detail(request, event_id):
     """
     Event Detail View
@@ -392,6 +661,62 @@ def event_detail(request, event_id):
     return render(request, 'event_detail.html', context)
 
 
+def event_calendar(request, year, month):
+    """
+    Event Calendar API
+
+    Per-day event counts for one month, split by category, age group and
+    free/paid. Reads the pre-computed EventDailyRollup rows with a single
+    range scan on the date index, so even the October peak never touches
+    the events table.
+
+    Returns:
+        {"year": 2025, "month": 10, "total": 123,
+         "days": [{"date": "2025-10-31", "total": 40, "free": 25, "paid": 15,
+                   "by_category": {"parade": 3, ...},
+                   "by_age": {"all_ages": 20, ...}}, ...]}
+
+    Days without events are left out.
+
+    URL: /events/calendar/<year>/<month>/
+    """
+    import calendar
+    from datetime import date
+
+    try:
+        first_day = date(year, month, 1)
+    except (ValueError, OverflowError):
+        # OverflowError: a year too big for a C int (/events/calendar/99999999999999999999/10/)
+        return JsonResponse({'error': 'Invalid year or month'}, status=400)
+    last_day = first_day.replace(day=calendar.monthrange(year, month)[1])
+
+    rows = EventDailyRollup.objects.filter(date__range=(first_day, last_day)).values_list(
+        'date', 'event_category', 'age_appropriateness', 'is_free', 'event_count'
+    )
+
+    days = {}
+    for day, category, age, is_free, count in rows:
+        totals = days.setdefault(day, {
+            'date': day.isoformat(),
+            'total': 0,
+            'free': 0,
+            'paid': 0,
+            'by_category': {},
+            'by_age': {},
+        })
+        totals['total'] += count
+        totals['free' if is_free else 'paid'] += count
+        totals['by_category'][category] = totals['by_category'].get(category, 0) + count
+        totals['by_age'][age] = totals['by_age'].get(age, 0) + count
+
+    return JsonResponse({
+        'year': year,
+        'month': month,
+        'total': sum(day['total'] for day in days.values()),
+        'days': [days[day] for day in sorted(days)],
+    })
+
+
 def businesses_list(request):
     """
     Businesses Listing View
@@ -405,7 +730,13 @@ def businesses_list(request):
     from django.db.models import Q
 
     # Start with all active businesses
-    businesses = Business.objects.filter(is_active=True).select_related('location', 'user').prefetch_related('coupons')
+    # The coupon badge only needs a count, so it's computed in SQL rather
+    # than prefetching every (mostly expired) coupon for every business
+    businesses = (
+        Business.objects.filter(is_active=True)
+        .select_related('location', 'user')
+        .with_active_coupon_count()
+    )
 
     # Handle search query
     search_query = request.GET.get('search', '').strip()
@@ -450,8 +781,9 @@ def business_detail(request, slug):
     URL: /businesses/<slug:slug>/
     """
     # Get the business from database (or return 404 if not found)
+    # Only currently valid coupons are prefetched (into business.valid_coupons)
     business = get_object_or_404(
-        Business.objects.select_related('location', 'user').prefetch_related('coupons'),
+        Business.objects.select_related('location', 'user').prefetch_valid_coupons(),
         slug=slug,
         is_active=True
     )
@@ -463,6 +795,68 @@ def business_detail(request, slug):
     return render(request, 'business_detail.html', context)
 
 
+@require_POST
+def redeem_coupon(request):
+    """
+    Coupon Redemption API
+
+    Records one use of a coupon at checkout. Send the code as JSON
+    ({"code": "BOO20"}) or as a form field named "code".
+
+    The check and the increment are one conditional UPDATE
+    (see CouponQuerySet.redeem), so limited coupons are never
+    over-redeemed, even when many people redeem at the same moment.
+
+    Responses:
+        200 - redeemed: {"code", "title", "current_uses", "max_uses"}
+        400 - no code sent
+        401 - not logged in
+        404 - unknown code
+        409 - all uses taken, or the coupon has not started yet
+        410 - the coupon has expired or was switched off
+
+    URL: /coupons/redeem/ (POST)
+    """
+    import json
+
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Log in to redeem coupons'}, status=401)
+
+    if request.content_type == 'application/json':
+        try:
+            code = json.loads(request.body or b'{}').get('code', '')
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    else:
+        code = request.POST.get('code', '')
+    code = str(code).strip()
+    if not code:
+        return JsonResponse({'error': 'Missing coupon code'}, status=400)
+
+    coupon = Coupon.objects.redeem(code)
+
+    if coupon is None:
+        # One indexed read (discount_code is unique) to explain why the
+        # conditional UPDATE matched no row
+        coupon = Coupon.objects.filter(discount_code=code).first()
+        if coupon is None:
+            return JsonResponse({'error': 'Unknown coupon code'}, status=404)
+        from django.utils import timezone
+        today = timezone.now().date()
+        if not coupon.is_active or coupon.valid_until < today:
+            return JsonResponse({'error': 'This coupon has expired'}, status=410)
+        if coupon.valid_from > today:
+            return JsonResponse({'error': f'This coupon starts on {coupon.valid_from:%b %d}'}, status=409)
+        return JsonResponse({'error': 'This coupon has been fully redeemed'}, status=409)
+
+    return JsonResponse({
+        'code': coupon.discount_code,
+        'title': coupon.title,
+        'current_uses': coupon.current_uses,
+        'max_uses': coupon.max_uses,
+    })
+
+
 def terms(request):
     """
     Terms and Conditions Page
@@ -0,0 +1,356 @@
+"""
+Worker Warm-Up for ShriekedIn
+
+A freshly started worker does a lot of one-off work on its first requests:
+compiling templates, building URL resolvers, loading the static files
+manifest, connecting to the database, building the nearest haunted
+places index and importing whatever the first view, middleware and
+context processors need. warm_up() does all of it before the worker
+takes traffic, finishing with one internal GET of each page in
+settings.WARMUP_PATHS, so the first visitor gets a normal-speed page.
+
+Where it runs:
+- gunicorn.conf.py calls warm_up() in each worker before it accepts
+  connections (post_worker_init)
+- /readyz/ runs it on first use (e.g. under runserver, without the
+  sample requests since it is a request itself), then answers 200 once
+  the worker is warm and the default database answers, 503 otherwise.
+  Later probes only re-check the database; the warm-up is not repeated.
+- manage.py startup_profile measures boot time with and without it
+
+Example:
+    >>> from core.warmup import warm_up
+    >>> report = warm_up()
+    >>> [(step.name, step.count) for step in report.steps]
+    [('templates', 78), ('urls', 159), ('static', 139), ('databases', 1), ('replicas', 0), ('proximity', 12), ('requests', 1)]
+
+Read replicas are warmed too, but a replica that can't be reached is only
+a warning: reads fall back to the default database (core/db_routers.py),
+so it never makes the worker unready.
+"""
+
+import io
+import logging
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class WarmupStep:
+    """One part of the warm-up: what it did, how many things and how long it took."""
+    name: str
+    count: int = 0
+    ms: float = 0.0
+    error: str = ''
+    warning: str = ''  # a problem the worker can run with (an unreachable replica)
+
+    @property
+    def status(self):
+        return 'error' if self.error else 'warning' if self.warning else 'ok'
+
+
+@dataclass
+class WarmupReport:
+    steps: list = field(default_factory=list)
+    total_ms: float = 0.0
+
+    @property
+    def ok(self):
+        return not any(step.error for step in self.steps)
+
+    @property
+    def warm(self):
+        """
+        True if every step that doesn't need the database worked. /readyz/
+        checks the database itself on every call, so a database that was
+        down while warming up doesn't keep the worker unready.
+        """
+        return not any(step.error for step in self.steps if step.name not in DATABASE_STEPS)
+
+    def as_dict(self):
+        return {'ok': self.ok, 'total_ms': round(self.total_ms, 1), 'steps': [asdict(step) for step in self.steps]}
+
+    def summary(self):
+        """
+        Step names and statuses only. The messages can name database
+        hosts, users and file paths, so they're logged and shown on the
+        staff performance panel, not to anonymous /readyz/ callers.
+        """
+        return {'ok': self.ok, 'steps': [{'name': step.name, 'status': step.status} for step in self.steps]}
+
+
+_report = None
+_lock = threading.Lock()
+
+
+# ================================================================
+# WARM-UP STEPS
+# ================================================================
+
+def template_directories(engine):
+    """Directories the engine's loaders read from (looking inside the cached loader)."""
+    directories = []
+    for loader in engine.engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            if hasattr(inner, 'get_dirs'):
+                directories += [directory for directory in inner.get_dirs() if directory not in directories]
+    return directories
+
+
+def template_names(engine):
+    """Every template file the engine can load, as names relative to its directories."""
+    directories = template_directories(engine)
+    names = set()
+    for directory in directories:
+        directory = Path(directory)
+        for path in directory.rglob('*'):
+            if path.is_file() and path.suffix in ('.html', '.txt', '.xml'):
+                names.add(path.relative_to(directory).as_posix())
+    return sorted(names)
+
+
+def compile_templates():
+    """Load every template, so the cached loader keeps the compiled version."""
+    count = 0
+    for engine in engines.all():
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except Exception:
+                # Partial templates meant for other engines (e.g. e-mail bodies) can fail
+                continue
+            count += 1
+    return count
+
+
+def _compile_patterns(patterns):
+    count = 0
+    for pattern in patterns:
+        pattern.pattern.regex  # compiled on first use, then cached
+        if isinstance(pattern, URLResolver):
+            pattern.reverse_dict  # build reverse() lookups for included URLconfs
+            count += _compile_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            count += 1
+    return count
+
+
+def resolve_urls():
+    """Import every URLconf and build the resolve() and reverse() tables."""
+    resolver = get_resolver()
+    resolver.reverse_dict
+    resolver.namespace_dict
+    return _compile_patterns(resolver.url_patterns)
+
+
+def load_static_manifest():
+    """Load the static files manifest (ManifestStaticFilesStorage reads it once)."""
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    return len(getattr(staticfiles_storage, 'hashed_files', {}) or {})
+
+
+def _connect(alias):
+    """Connect to one database (filling the pool when pooling is on)."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    if connection.settings_dict['OPTIONS'].get('pool'):
+        # Give the connection back; the pool keeps it open for requests
+        connection.close()
+
+
+def open_databases():
+    """Connect to the default database."""
+    _connect('default')
+    return 1
+
+
+def open_replicas():
+    """Connect to each read replica, trying them all before reporting the ones that failed."""
+    count = 0
+    failed = []
+    for alias in getattr(settings, 'DATABASE_REPLICAS', []):
+        try:
+            _connect(alias)
+        except Exception as error:
+            failed.append(f'{alias}: {type(error).__name__}: {error}')
+        else:
+            count += 1
+    if failed:
+        raise RuntimeError('; '.join(failed))
+    return count
+
+
+def build_proximity_index():
+    """Build the nearest haunted places arrays (core/proximity.py): seconds with a million places."""
+    from .proximity import haunted_index
+
+    return haunted_index.warm()
+
+
+def _warmup_host():
+    """A Host header that passes ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and '*' not in host:
+            return host
+    return 'localhost'
+
+
+def _get(application, path, host):
+    """GET a path through the WSGI application, as gunicorn would, and return the status code."""
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    status = []
+    response = application(environ, lambda line, headers, exc_info=None: status.append(line))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return int(status[0].split()[0])
+
+
+def warm_requests():
+    """
+    Serve each page in settings.WARMUP_PATHS once through the full middleware stack.
+
+    Runs in its own thread so that per-request state (instrumentation,
+    replica stickiness, the thread's database connection) never mixes
+    with a request that is already in progress, such as /readyz/.
+    """
+    application = import_string(settings.WSGI_APPLICATION)
+    host = _warmup_host()
+    paths = getattr(settings, 'WARMUP_PATHS', ['/'])
+    outcome = {}
+
+    def run():
+        try:
+            outcome['statuses'] = [_get(application, path, host) for path in paths]
+        except Exception as error:
+            outcome['error'] = error
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name='warmup-requests')
+    thread.start()
+    thread.join()
+
+    if 'error' in outcome:
+        raise outcome['error']
+    failed = [f'{path} answered {status}' for path, status in zip(paths, outcome['statuses']) if status >= 500]
+    if failed:
+        raise RuntimeError(', '.join(failed))
+    return len(paths)
+
+
+STEPS = (
+    ('templates', compile_templates),
+    ('urls', resolve_urls),
+    ('static', load_static_manifest),
+    ('databases', open_databases),
+    ('replicas', open_replicas),
+    ('proximity', build_proximity_index),
+    ('requests', warm_requests),
+)
+
+# Steps that need the database, skipped by warm_up(databases=False)
+DATABASE_STEPS = {'databases', 'replicas', 'proximity', 'requests'}
+# Steps whose failures are recorded as warnings and leave the report ok
+OPTIONAL_STEPS = {'replicas'}
+
+
+def warm_up(databases=True, requests=True):
+    """
+    Run every warm-up step and return a WarmupReport.
+
+    A step that fails is recorded (WarmupStep.error, or WarmupStep.warning
+    for OPTIONAL_STEPS) instead of raising, so one broken template can't
+    stop a worker from booting. Pass
+    databases=False before forking, when connections must not be opened,
+    and requests=False while serving a request.
+    """
+    global _report
+    report = WarmupReport()
+    started = time.perf_counter()
+    for name, step in STEPS:
+        if name in DATABASE_STEPS and not databases:
+            continue
+        if name == 'requests' and not requests:
+            continue
+        step_started = time.perf_counter()
+        result = WarmupStep(name)
+        try:
+            result.count = step()
+        except Exception as error:
+            message = f'{type(error).__name__}: {error}'
+            if name in OPTIONAL_STEPS:
+                result.warning = message
+                logger.warning('Warm-up step %s: %s', name, message)
+            else:
+                result.error = message
+                logger.error('Warm-up step %s failed: %s', name, message)
+        result.ms = round((time.perf_counter() - step_started) * 1000, 1)
+        report.steps.append(result)
+    report.total_ms = (time.perf_counter() - started) * 1000
+
+    if databases:
+        _report = report
+    return report
+
+
+def ensure_warm():
+    """
+    Warm this process up once and return the report.
+
+    Called from inside a request (/readyz/), so the sample requests are
+    left out; gunicorn's post_worker_init runs the full warm-up. A failed
+    warm-up isn't retried: /readyz/ is unauthenticated, and every probe
+    would otherwise redo all of it. The database, the part that can come
+    back on its own, is checked on each probe by databases_answer().
+    """
+    if _report is None:
+        with _lock:
+            if _report is None:
+                warm_up(requests=False)
+    return _report
+
+
+def last_report():
+    """This process's last warm-up report with the database, or None."""
+    return _report
+
+
+def databases_answer():
+    """True if the default database answers right now."""
+    try:
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except Exception:
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GamesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "games"
+
+    def ready(self):
+        # Connect signal handlers (gallery card cache, word suggestions)
+        from . import signals  # noqa: F401
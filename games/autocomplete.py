@@ -0,0 +1,139 @@
+"""
+Word Suggestions for Mad Libs
+
+As a player types into a blank on the play page, the typeahead endpoint
+(games/views.py, api_suggest_words) suggests vocabulary words of the
+right part of speech that start with what they've typed so far.
+
+Every keystroke is a request, so suggestions come from memory, not the
+database:
+
+- One PrefixTrie per part of speech, for kid-friendly words only and for
+  every word. Each node of a trie keeps its best few words, so a lookup
+  walks down the typed prefix and returns that node's list; it doesn't
+  search anything.
+- Words are ranked by VocabularyWord.use_count, how often players picked
+  them recently (counted hourly by the count_word_usage task in
+  games/tasks.py), then shorter words first.
+- The tries are built on first use in each process. Saving or deleting a
+  VocabularyWord drops them in that process (games/signals.py); other
+  processes notice within REFRESH_SECONDS, by running one small query per
+  interval (not per keystroke) to see if the vocabulary changed.
+
+Example:
+    >>> suggest('noun', 'gh')
+    ['ghost', 'ghoul']
+"""
+
+import threading
+import time
+
+from django.db.models import Count, Max, Q, Sum
+
+from .models import VocabularyWord
+
+# Most suggestions kept per trie node (and returned per request)
+MAX_SUGGESTIONS = 10
+# How often each process checks whether the vocabulary changed
+REFRESH_SECONDS = 60
+
+
+def normalize(text):
+    """What's matched: lowercase, with underscores as spaces (haunted_house)."""
+    return text.strip().lower().replace('_', ' ')
+
+
+class PrefixTrie:
+    """
+    Words by prefix, best first.
+
+    Words must be added best first; every node on a word's path keeps it
+    if it has fewer than `size` words so far, so each node ends up holding
+    its best `size` completions, already in order.
+    """
+
+    __slots__ = ('root', 'size')
+
+    def __init__(self, size=MAX_SUGGESTIONS):
+        self.root = ({}, [])  # (children by character, best words)
+        self.size = size
+
+    def add(self, key, word):
+        node = self.root
+        if len(node[1]) < self.size:
+            node[1].append(word)
+        for character in key:
+            node = node[0].setdefault(character, ({}, []))
+            if len(node[1]) < self.size:
+                node[1].append(word)
+
+    def lookup(self, prefix, limit=MAX_SUGGESTIONS):
+        node = self.root
+        for character in prefix:
+            node = node[0].get(character)
+            if node is None:
+                return []
+        return node[1][:limit]
+
+
+class WordIndex:
+    """This process's tries, rebuilt when the vocabulary changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tries = None  # (part of speech, kid-friendly only) -> PrefixTrie
+        self._stamp = None
+        self._checked_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._tries = None
+
+    def suggest(self, part_of_speech, prefix, kid_friendly=True, limit=MAX_SUGGESTIONS):
+        """Up to `limit` words starting with `prefix`, best first."""
+        trie = self._current().get((part_of_speech, kid_friendly))
+        if trie is None:
+            return []
+        return trie.lookup(normalize(prefix), limit)
+
+    def _current(self):
+        tries = self._tries
+        if tries is not None and time.monotonic() - self._checked_at < REFRESH_SECONDS:
+            return tries
+        with self._lock:
+            if self._tries is None or time.monotonic() - self._checked_at >= REFRESH_SECONDS:
+                stamp = vocabulary_stamp()
+                if self._tries is None or stamp != self._stamp:
+                    self._tries = build_tries()
+                    self._stamp = stamp
+                self._checked_at = time.monotonic()
+            return self._tries
+
+
+def vocabulary_stamp():
+    """Changes whenever a word is added, removed, edited or recounted."""
+    return VocabularyWord.objects.aggregate(
+        words=Count('id'),
+        kid_friendly=Count('id', filter=Q(is_kid_friendly=True)),
+        updated=Max('updated_at'),
+        uses=Sum('use_count'),
+    )
+
+
+def build_tries():
+    """{(part of speech, kid-friendly only): PrefixTrie} from one query."""
+    words = VocabularyWord.objects.values_list('word', 'part_of_speech', 'is_kid_friendly', 'use_count')
+    ranked = sorted(words, key=lambda row: (-row[3], len(row[0]), normalize(row[0])))
+    tries = {}
+    for word, part_of_speech, is_kid_friendly, _ in ranked:
+        key = normalize(word)
+        for kid_friendly_only in ([True, False] if is_kid_friendly else [False]):
+            tries.setdefault((part_of_speech, kid_friendly_only), PrefixTrie()).add(key, word)
+    return tries
+
+
+word_index = WordIndex()
+
+
+def suggest(part_of_speech, prefix, kid_friendly=True, limit=MAX_SUGGESTIONS):
+    return word_index.suggest(part_of_speech, prefix, kid_friendly, limit)
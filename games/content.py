@@ -0,0 +1,267 @@
+"""
+Built-in Mad Libs Content
+
+The story templates and vocabulary the game ships with, and sync_content(),
+which makes the database match them. `manage.py populate_madlibs` runs it,
+and it's safe to run on every deploy:
+
+- Nothing is deleted. Deleting a template would delete every story played
+  from it (CompletedMadLib.template is CASCADE), so a template taken out
+  of TEMPLATES is only deactivated.
+- Only rows that differ are written, all in one transaction. Templates
+  are matched by slug; new and changed ones are written with a single
+  upsert (INSERT ... ON CONFLICT DO UPDATE). Missing words are added in
+  one INSERT.
+- What's set in the admin stays: a template switched off stays off, and
+  existing words (and words added in the admin) aren't touched.
+- When nothing changed it's just two SELECTs.
+
+Templates made before slugs existed are matched by title the first time
+and given their slug, so their stories stay attached.
+
+Example:
+    >>> sync_content()
+    SyncResult(templates_created=0, templates_updated=1, templates_deactivated=0, words_created=3)
+"""
+
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from .autocomplete import word_index
+from .models import StoryTemplate, VocabularyWord
+
+# StoryTemplate fields set from TEMPLATES (besides slug)
+TEMPLATE_FIELDS = ['title', 'author', 'difficulty', 'word_count', 'original_text', 'template_text']
+
+# ================================================================
+# CONTENT
+# ================================================================
+
+TEMPLATES = [
+    {
+        'title': 'The Raven (Edgar Allan Poe)',
+        'slug': 'the-raven-edgar-allan-poe',
+        'author': 'Edgar Allan Poe',
+        'difficulty': 'medium',
+        'word_count': 10,
+        'original_text': 'Once upon a midnight dreary, while I pondered, weak and weary, Over many a quaint and curious volume of forgotten lore...',
+        'template_text': '''Once upon a [ADJECTIVE] midnight, while I [VERB], [ADJECTIVE] and [ADJECTIVE],
+Over many a [ADJECTIVE] and [ADJECTIVE] volume of forgotten [NOUN].
+While I [VERB], nearly [VERB], suddenly there came a [NOUN],
+As of someone [ADVERB] [VERB] at my chamber [NOUN].'''
+    },
+    {
+        'title': 'Trick or Treat Night',
+        'slug': 'trick-or-treat-night',
+        'author': 'ShriekedIn Original',
+        'difficulty': 'easy',
+        'word_count': 5,
+        'original_text': 'A fun Halloween adventure about dressing up in costume and going trick-or-treating around the neighborhood collecting candy.',
+        'template_text': '''On Halloween night, I dressed up as a [NOUN] and went trick-or-treating.
+My costume was so [ADJECTIVE] that everyone [VERB] when they saw me!
+I collected candy in my [ADJECTIVE] [NOUN] and had a [ADJECTIVE] time!'''
+    },
+    {
+        'title': 'The Haunted House',
+        'slug': 'the-haunted-house',
+        'author': 'ShriekedIn Original',
+        'difficulty': 'easy',
+        'word_count': 8,
+        'original_text': 'A spooky tale about an old house at the end of the street that everyone says is haunted by mysterious creatures.',
+        'template_text': '''There was an old [ADJECTIVE] house at the end of [NOUN] Street.
+Everyone said it was [ADJECTIVE] by a [NOUN] and a [NOUN].
+One night, I [ADVERB] walked up to the [ADJECTIVE] door and heard someone [VERB].
+I [VERB] away as fast as I could!'''
+    },
+    {
+        'title': 'The Friendly Ghost',
+        'slug': 'the-friendly-ghost',
+        'author': 'ShriekedIn Original',
+        'difficulty': 'easy',
+        'word_count': 7,
+        'original_text': 'A heartwarming story about a friendly ghost who loves making friends with children every Halloween.',
+        'template_text': '''Once there was a [ADJECTIVE] ghost named [NOUN].
+Unlike other ghosts, [NOUN] was very [ADJECTIVE] and loved to [VERB].
+Every Halloween, [NOUN] would [ADVERB] [VERB] around the neighborhood,
+making friends with all the [ADJECTIVE] children.'''
+    },
+    {
+        'title': 'The Tell-Tale Heart (Edgar Allan Poe)',
+        'slug': 'the-tell-tale-heart-edgar-allan-poe',
+        'author': 'Edgar Allan Poe',
+        'difficulty': 'hard',
+        'word_count': 15,
+        'original_text': 'True! Nervous, very, very dreadfully nervous I had been and am; but why will you say that I am mad?',
+        'template_text': '''True! [ADJECTIVE], very, very [ADVERB] [ADJECTIVE] I had been and am!
+But why will you say that I am [ADJECTIVE]?
+The [NOUN] sharpened my senses, not [VERB] them.
+Above all was the sense of [NOUN] [ADJECTIVE].
+I heard all things in the [NOUN] and in the [NOUN].
+I heard many things in [NOUN].
+How, then, am I [ADJECTIVE]?
+[VERB] how [ADVERB] I [VERB]!
+Observe how [ADVERB], how [ADVERB], how [ADVERB] I proceeded!'''
+    },
+    {
+        'title': 'The Witch\'s Brew',
+        'slug': 'the-witchs-brew',
+        'author': 'ShriekedIn Original',
+        'difficulty': 'medium',
+        'word_count': 10,
+        'original_text': 'A magical story about a witch brewing a mysterious potion in her cauldron with strange ingredients.',
+        'template_text': '''In a [ADJECTIVE] cauldron, the old witch began to [VERB].
+First, she added three [ADJECTIVE] [NOUN] and a pinch of [NOUN].
+Then she [ADVERB] stirred in some [ADJECTIVE] [NOUN].
+The potion bubbled and turned [ADJECTIVE]!
+"Perfect!" she cackled [ADVERB]. "Now anyone who drinks this will [VERB] like a [NOUN]!"'''
+    },
+    {
+        'title': 'Graveyard at Midnight',
+        'slug': 'graveyard-at-midnight',
+        'author': 'ShriekedIn Original',
+        'difficulty': 'medium',
+        'word_count': 12,
+        'original_text': 'A chilling encounter in a foggy graveyard at midnight where mysterious sounds and figures appear among the tombstones.',
+        'template_text': '''The old graveyard was [ADJECTIVE] and [ADJECTIVE] at midnight.
+Fog [ADVERB] [VERB] between the [ADJECTIVE] tombstones.
+Suddenly, I heard a [ADJECTIVE] [NOUN] coming from behind a [NOUN].
+My heart began to [VERB] [ADVERB].
+I wanted to [VERB], but my [ADJECTIVE] legs wouldn't move!
+Then I saw it—a [ADJECTIVE] figure [VERB] toward me!'''
+    }
+]
+
+VOCABULARY = {
+    'noun': [
+        'ghost', 'witch', 'vampire', 'zombie', 'skeleton', 'pumpkin', 'cauldron',
+        'broomstick', 'graveyard', 'tombstone', 'haunted_house', 'spider', 'bat',
+        'black_cat', 'werewolf', 'monster', 'goblin', 'ghoul', 'phantom', 'specter',
+        'shadow', 'moon', 'night', 'darkness', 'fog', 'mist', 'castle', 'dungeon',
+        'coffin', 'crypt', 'potion', 'spell', 'wand', 'candy', 'costume', 'mask',
+        'door', 'window', 'stairs', 'hallway', 'room', 'attic', 'basement', 'forest',
+        'tree', 'owl', 'rat', 'scream', 'whisper', 'laugh', 'howl',
+    ],
+    'adjective': [
+        'spooky', 'creepy', 'haunted', 'eerie', 'mysterious', 'frightening', 'scary',
+        'dark', 'ghostly', 'wicked', 'evil', 'sinister', 'gloomy', 'shadowy', 'ominous',
+        'ancient', 'old', 'abandoned', 'lonely', 'silent', 'quiet', 'loud', 'terrible',
+        'horrible', 'dreadful', 'awful', 'hideous', 'gruesome', 'macabre', 'ghastly',
+        'pale', 'cold', 'frozen', 'dead', 'lifeless', 'strange', 'weird', 'bizarre',
+        'peculiar', 'odd', 'unusual', 'twisted', 'crooked', 'bent', 'broken', 'shattered',
+        'bloody', 'rotten', 'decayed', 'moldy', 'dusty',
+    ],
+    'verb': [
+        'scream', 'haunt', 'frighten', 'lurk', 'cackle', 'howl', 'shriek', 'whisper',
+        'disappear', 'float', 'fly', 'cast', 'brew', 'transform', 'vanish', 'appear',
+        'creep', 'crawl', 'sneak', 'hide', 'watch', 'follow', 'chase', 'run', 'walk',
+        'stumble', 'trip', 'fall', 'climb', 'jump', 'dance', 'spin', 'twirl', 'shake',
+        'shiver', 'tremble', 'quake', 'shudder', 'gasp', 'sob', 'cry', 'laugh', 'giggle',
+        'moan', 'groan', 'wail', 'howl', 'yell', 'call', 'summon',
+    ],
+    'adverb': [
+        'mysteriously', 'frighteningly', 'eerily', 'silently', 'suddenly', 'slowly',
+        'spookily', 'wickedly', 'ominously', 'hauntingly', 'darkly', 'gloomily',
+        'quickly', 'rapidly', 'swiftly', 'carefully', 'cautiously', 'nervously',
+        'anxiously', 'fearfully', 'terribly', 'horribly', 'dreadfully', 'awfully',
+        'strangely', 'oddly', 'weirdly', 'bizarrely', 'quietly', 'loudly', 'softly',
+        'gently', 'roughly', 'violently', 'wildly', 'madly', 'crazily',
+    ],
+}
+
+
+# ================================================================
+# SYNC
+# ================================================================
+
+@dataclass
+class SyncResult:
+    templates_created: int = 0
+    templates_updated: int = 0
+    templates_deactivated: int = 0
+    words_created: int = 0
+
+    @property
+    def changed(self):
+        return any(vars(self).values())
+
+
+def sync_content(templates=TEMPLATES, vocabulary=VOCABULARY):
+    """
+    Insert, update and deactivate rows so the database matches the content.
+
+    templates: dicts with 'slug' and TEMPLATE_FIELDS.
+    vocabulary: {part of speech: [words]}, added as kid-friendly 'halloween' words.
+    """
+    result = SyncResult()
+    with transaction.atomic():
+        _sync_templates(templates, result)
+        _sync_vocabulary(vocabulary, result)
+    if result.words_created:
+        # bulk_create() doesn't send post_save, so games/signals.py doesn't see it
+        word_index.clear()
+    return result
+
+
+def _sync_templates(templates, result):
+    wanted = {data['slug']: data for data in templates}
+    existing = {template.slug: template for template in StoryTemplate.objects.filter(slug__isnull=False)}
+
+    unmatched = {data['title']: slug for slug, data in wanted.items() if slug not in existing}
+    if unmatched:
+        # Made by an older populate_madlibs, before templates had slugs
+        adopted = []
+        for template in StoryTemplate.objects.filter(slug__isnull=True, title__in=unmatched).order_by('pk'):
+            slug = unmatched[template.title]
+            if slug not in existing:
+                template.slug = slug
+                existing[slug] = template
+                adopted.append(template)
+        StoryTemplate.objects.bulk_update(adopted, ['slug'])
+
+    now = timezone.now()
+    upserts = []
+    for slug, data in wanted.items():
+        current = existing.get(slug)
+        if current is None:
+            result.templates_created += 1
+        elif all(getattr(current, name) == data[name] for name in TEMPLATE_FIELDS):
+            continue
+        else:
+            result.templates_updated += 1
+        upserts.append(StoryTemplate(slug=slug, **{name: data[name] for name in TEMPLATE_FIELDS}))
+    if upserts:
+        # is_active isn't updated: a template switched off in the admin stays off
+        StoryTemplate.objects.bulk_create(
+            upserts,
+            update_conflicts=True,
+            unique_fields=['slug'],
+            update_fields=TEMPLATE_FIELDS + ['updated_at'],
+        )
+        # bulk_create() skips save(), which records a version when the text changes
+        for template in StoryTemplate.objects.filter(slug__in=[template.slug for template in upserts]):
+            template.current_version()
+
+    retired = [template.pk for slug, template in existing.items() if slug not in wanted and template.is_active]
+    if retired:
+        result.templates_deactivated = StoryTemplate.objects.filter(pk__in=retired).update(
+            is_active=False, updated_at=now,
+        )
+
+
+def _sync_vocabulary(vocabulary, result):
+    """Add missing words. Words already there keep their settings from the admin."""
+    # A set: the same word can be listed twice
+    wanted = {(word, part_of_speech) for part_of_speech, words in vocabulary.items() for word in words}
+    existing = set(
+        VocabularyWord.objects.filter(word__in={word for word, _ in wanted}).values_list('word', 'part_of_speech')
+    )
+    missing = sorted(wanted - existing)
+    if missing:
+        # ignore_conflicts: another deploy may be adding the same words right now
+        VocabularyWord.objects.bulk_create(
+            [VocabularyWord(word=word, part_of_speech=part_of_speech) for word, part_of_speech in missing],
+            ignore_conflicts=True,
+        )
+        result.words_created = len(missing)
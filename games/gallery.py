@@ -0,0 +1,174 @@
+"""
+Public Mad Libs Gallery
+
+Lists the stories players chose to share (CompletedMadLib.is_public),
+newest or most viewed first. Two things keep it fast with millions of
+stories:
+
+- Keyset pagination. Instead of ?page=5000 (OFFSET, which reads and
+  throws away every row before the page), each page link carries a
+  cursor: the sort value and id of the last story shown. The next page
+  starts right after it in a partial index that only holds public
+  stories, so every page costs the same.
+- Cached story cards. A story's text never changes once it's written,
+  so each card's HTML is cached per share_code. The page query reads
+  only the index columns; full rows are loaded only for cards that
+  aren't cached yet.
+
+Example:
+    >>> page = gallery_page(sort='popular')
+    >>> page.next_cursor     # pass back as ?after=... for the next page
+    'MTJ8NDU2'
+"""
+
+import base64
+import binascii
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.template.loader import render_to_string
+from django.utils.dateparse import parse_datetime
+from django.utils.safestring import mark_safe
+
+from .models import CompletedMadLib
+
+# Stories per gallery page
+PAGE_SIZE = 24
+# How long a rendered card is kept; saving the story clears it sooner
+CARD_CACHE_SECONDS = 24 * 60 * 60
+
+# ?sort= value -> field the gallery is ordered by (descending, then by id)
+SORTS = {
+    'newest': 'created_at',
+    'popular': 'view_count',
+}
+
+
+class InvalidCursor(ValueError):
+    """The ?after= value wasn't made by encode_cursor()."""
+
+
+@dataclass
+class GalleryPage:
+    sort: str
+    cards: list = field(default_factory=list)
+    next_cursor: str = None
+
+
+# ================================================================
+# CURSORS
+# ================================================================
+
+def encode_cursor(value, pk):
+    """Opaque, URL-safe cursor for the story with this sort value and id."""
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = f'{value}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """(sort value, id) from a cursor; raises InvalidCursor if it's malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        pk = int(pk)
+        if SORTS[sort] == 'created_at':
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError(value)
+        else:
+            value = int(value)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise InvalidCursor(cursor) from error
+    return value, pk
+
+
+# ================================================================
+# PAGES AND CARDS
+# ================================================================
+
+def card_cache_key(share_code):
+    return f'madlibs:card:{share_code}'
+
+
+def forget_card(share_code):
+    cache.delete(card_cache_key(share_code))
+
+
+def _before(order, value, pk):
+    """
+    WHERE (order, id) < (value, pk), as a row comparison.
+
+    Written as "order < value OR (order = value AND id < pk)" the index
+    scan can only start at `value`, then has to skip every story with
+    that same value, tens of thousands for "0 views". A row comparison
+    starts right at the cursor. PostgreSQL, SQLite and MySQL all have it.
+    """
+    connection = connections[router.db_for_read(CompletedMadLib)]
+    quote = connection.ops.quote_name
+    opts = CompletedMadLib._meta
+    table = quote(opts.db_table)
+    columns = ', '.join(f'{table}.{quote(opts.get_field(name).column)}' for name in (order, 'id'))
+    # Raw SQL skips Django's conversion, e.g. of datetimes for SQLite
+    value = opts.get_field(order).get_db_prep_value(value, connection)
+    return RawSQL(f'({columns}) < (%s, %s)', (value, pk), output_field=BooleanField())
+
+
+def gallery_page(sort='newest', cursor=None, page_size=PAGE_SIZE):
+    """
+    One page of public stories, with their rendered cards.
+
+    Raises KeyError for an unknown sort and InvalidCursor for a bad cursor.
+    """
+    order = SORTS[sort]
+    stories = CompletedMadLib.objects.filter(is_public=True)
+    if cursor:
+        value, pk = decode_cursor(cursor, sort)
+        stories = stories.filter(_before(order, value, pk))
+
+    rows = list(
+        stories.order_by(f'-{order}', '-pk')
+        .values('pk', 'share_code', 'created_at', 'view_count', 'template__updated_at')[:page_size + 1]
+    )
+    page = GalleryPage(sort=sort)
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        page.next_cursor = encode_cursor(rows[-1][order], rows[-1]['pk'])
+
+    html = render_cards(rows)
+    page.cards = [
+        {'share_code': row['share_code'], 'view_count': row['view_count'], 'html': html[row['pk']]}
+        for row in rows
+        if row['pk'] in html  # deleted since the page query
+    ]
+    return page
+
+
+def render_cards(rows):
+    """{story id: card HTML}, from the cache where possible."""
+    # A card is only reused while its template (title, difficulty) is unchanged
+    stamps = {row['pk']: row['template__updated_at'].isoformat() for row in rows}
+    keys = {row['pk']: card_cache_key(row['share_code']) for row in rows}
+    cached = cache.get_many(keys.values())
+
+    html, missing = {}, []
+    for pk, key in keys.items():
+        entry = cached.get(key)
+        if entry and entry['stamp'] == stamps[pk]:
+            # Our own rendered template, so safe even if the cache lost the SafeString type
+            html[pk] = mark_safe(entry['html'])
+        else:
+            missing.append(pk)
+
+    if missing:
+        fresh = {}
+        stories = CompletedMadLib.objects.filter(pk__in=missing).select_related('template', 'template_version', 'user')
+        for story in stories:
+            html[story.pk] = render_to_string('games/story_card.html', {'story': story})
+            fresh[keys[story.pk]] = {'stamp': stamps[story.pk], 'html': html[story.pk]}
+        cache.set_many(fresh, CARD_CACHE_SECONDS)
+    return html
@@ -0,0 +1,83 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from games.batch import generate_stories
+from games.models import StoryTemplate
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Generate completed Mad Libs stories in bulk from the vocabulary (see games/batch.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of stories to make')
+        parser.add_argument(
+            '--template',
+            type=int,
+            action='append',
+            dest='templates',
+            help='Use this template id (repeatable; default: every active template)',
+        )
+        parser.add_argument(
+            '--difficulty',
+            choices=['easy', 'medium', 'hard'],
+            help='Only use templates of this difficulty',
+        )
+        parser.add_argument(
+            '--user',
+            help='Username the stories belong to (default: anonymous)',
+        )
+        parser.add_argument(
+            '--public',
+            action='store_true',
+            help='Show the stories in the public gallery',
+        )
+        parser.add_argument(
+            '--all-words',
+            action='store_true',
+            help='Also use words not marked kid-friendly',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, for the same words every run',
+        )
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError('count must be at least 1')
+
+        templates = StoryTemplate.objects.filter(is_active=True)
+        if options['templates']:
+            templates = templates.filter(pk__in=options['templates'])
+        if options['difficulty']:
+            templates = templates.filter(difficulty=options['difficulty'])
+        templates = list(templates)
+        if not templates:
+            raise CommandError('No matching active story templates. Run populate_madlibs first.')
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named "{options["user"]}"')
+
+        started = time.perf_counter()
+        batch = generate_stories(
+            templates,
+            options['count'],
+            user=user,
+            is_public=options['public'],
+            kid_friendly=not options['all_words'],
+            seed=options['seed'],
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Created {len(batch):,} stories from {len(templates)} template(s) in {elapsed:.1f}s '
+            f'({len(batch) / max(elapsed, 1e-6):,.0f} stories/s)'
+        ))
@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
+from games.batch import generate_stories
 from games.models import StoryTemplate, CompletedMadLib
 import random
 
@@ -49,61 +50,27 @@ class Command(BaseCommand):
         except:
             admin_user = None
 
-        stories_created = 0
-
-        for i in range(10):
-            # Randomly select a template
-            template = random.choice(templates)
-
-            # Get placeholders from template
-            placeholders = template.get_placeholders()
-
-            # Build user_words dictionary and completed text
-            user_words = {}
-            completed_text = template.template_text
-
-            for idx, placeholder in enumerate(placeholders, 1):
-                # Get a random word of the appropriate type
-                word_type = placeholder.split('_')[0]  # Get NOUN, ADJECTIVE, etc.
-                word = random.choice(sample_words.get(word_type, ['mystery']))
-
-                # Store in user_words
-                field_name = f'{placeholder}_{idx}'
-                user_words[field_name] = word
-
-                # Replace in completed text
-                completed_text = completed_text.replace(f'[{placeholder}]', word, 1)
+        # Make all 10 in one go (see games/batch.py)
+        batch = generate_stories(templates, 10, words=sample_words)
+        stories = list(CompletedMadLib.objects.filter(share_code__in=batch.share_codes).select_related('template'))
 
+        for number, story in enumerate(stories, 1):
             # Randomly assign user or make anonymous (70% anonymous, 30% with user)
-            story_user = None
             if admin_user and random.random() > 0.7:
-                story_user = admin_user
-
-            # Create story with varied creation time (spread over last 3 days)
-            hours_ago = random.randint(1, 72)
-            created_at = timezone.now() - timedelta(hours=hours_ago)
-
-            # Create the completed story
-            story = CompletedMadLib.objects.create(
-                user=story_user,
-                template=template,
-                completed_text=completed_text,
-                user_words=user_words,
-                is_public=False
-            )
+                story.user = admin_user
 
-            # Manually set created_at to vary the times
-            story.created_at = created_at
+            # Vary the creation time (spread over last 3 days) and view counts
+            story.created_at = timezone.now() - timedelta(hours=random.randint(1, 72))
             story.view_count = random.randint(0, 25)
-            story.save()
 
-            stories_created += 1
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'✅ Created story {stories_created}/10: "{template.title}" '
+                    f'✅ Created story {number}/10: "{story.template.title}" '
                     f'(share_code: {story.share_code})'
                 )
             )
+        CompletedMadLib.objects.bulk_update(stories, ['user', 'created_at', 'view_count'])
+        stories_created = len(stories)
 
         self.stdout.write(
             self.style.SUCCESS(
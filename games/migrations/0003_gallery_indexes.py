@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0002_admin_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='completedmadlib',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at', '-id'], name='madlib_gallery_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='completedmadlib',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-view_count', '-id'], name='madlib_gallery_popular_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def first_versions(apps, schema_editor):
+    """Every existing template's current text becomes its version 1."""
+    StoryTemplate = apps.get_model('games', 'StoryTemplate')
+    StoryTemplateVersion = apps.get_model('games', 'StoryTemplateVersion')
+    StoryTemplateVersion.objects.bulk_create([
+        StoryTemplateVersion(template_id=pk, number=1, template_text=text)
+        for pk, text in StoryTemplate.objects.values_list('pk', 'template_text')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0003_gallery_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='completedmadlib',
+            name='completed_text',
+            field=models.TextField(blank=True, help_text="Full story text, only if it can't be rendered from template_version"),
+        ),
+        migrations.CreateModel(
+            name='StoryTemplateVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(help_text='1 for the first text, then counting up')),
+                ('template_text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='games.storytemplate')),
+            ],
+            options={
+                'ordering': ['template', 'number'],
+                'unique_together': {('template', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='completedmadlib',
+            name='template_version',
+            field=models.ForeignKey(blank=True, help_text='Template text the story was played with', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stories', to='games.storytemplateversion'),
+        ),
+        migrations.RunPython(first_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+import re
+from collections import defaultdict
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+# A frozen copy of games.stories.fill_in() as it was when this migration
+# was written, so later changes to rendering can't change what it does.
+PLACEHOLDER = re.compile(r'\[(\w+)\]')
+MISSING = '[MISSING]'
+
+
+def fill_in(template_text, user_words):
+    count = 0
+
+    def word(match):
+        nonlocal count
+        count += 1
+        return user_words.get(f'{match.group(1)}_{count}', MISSING)
+
+    return PLACEHOLDER.sub(word, template_text)
+
+
+def _renders_to(template_text, user_words, text):
+    try:
+        return fill_in(template_text, user_words) == text
+    except TypeError:  # words that aren't all strings
+        return False
+
+
+def compact(apps, schema_editor):
+    """
+    Link existing stories to their template's version 1 and drop their
+    stored text, if rendering the words gives back exactly the same story.
+
+    Stories that don't match (written before their template was edited,
+    or by hand) keep their text and no version. Each batch is committed on
+    its own, so on a big table this can be stopped and run again.
+    """
+    CompletedMadLib = apps.get_model('games', 'CompletedMadLib')
+    StoryTemplateVersion = apps.get_model('games', 'StoryTemplateVersion')
+    db = schema_editor.connection.alias
+
+    versions = {
+        template_id: (pk, text)
+        for pk, template_id, text in StoryTemplateVersion.objects.using(db)
+        .filter(number=1).values_list('pk', 'template_id', 'template_text')
+    }
+    stories = CompletedMadLib.objects.using(db).filter(template_version__isnull=True).order_by('pk')
+    last = 0
+    while True:
+        batch = list(
+            stories.filter(pk__gt=last).values_list('pk', 'template_id', 'completed_text', 'user_words')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last = batch[-1][0]
+
+        matching = defaultdict(list)
+        for pk, template_id, text, user_words in batch:
+            version = versions.get(template_id)
+            if version and isinstance(user_words, dict) and _renders_to(version[1], user_words, text):
+                matching[version[0]].append(pk)
+        with transaction.atomic(using=db):
+            for version_id, pks in matching.items():
+                CompletedMadLib.objects.using(db).filter(pk__in=pks).update(
+                    template_version_id=version_id, completed_text='',
+                )
+
+
+def expand(apps, schema_editor):
+    """Store the full text again for every story that's rendered on demand."""
+    CompletedMadLib = apps.get_model('games', 'CompletedMadLib')
+    db = schema_editor.connection.alias
+
+    stories = CompletedMadLib.objects.using(db).filter(completed_text='', template_version__isnull=False).order_by('pk')
+    last = 0
+    while True:
+        batch = list(
+            stories.filter(pk__gt=last).values_list('pk', 'template_version__template_text', 'user_words')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last = batch[-1][0]
+        CompletedMadLib.objects.using(db).bulk_update(
+            [CompletedMadLib(pk=pk, completed_text=fill_in(text, words)) for pk, text, words in batch],
+            ['completed_text'],
+        )
+
+
+class Migration(migrations.Migration):
+    # Commit batch by batch instead of rewriting every story in one transaction
+    atomic = False
+
+    dependencies = [
+        ('games', '0004_story_template_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact, expand),
+    ]
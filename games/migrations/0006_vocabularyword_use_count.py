@@ -0,0 +1,23 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_compact_completed_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vocabularyword',
+            name='use_count',
+            field=models.PositiveIntegerField(default=0, help_text='Times players used this word recently; ranks suggestions (see games/tasks.py)'),
+        ),
+        migrations.AddField(
+            model_name='vocabularyword',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_vocabularyword_use_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storytemplate',
+            name='slug',
+            field=models.SlugField(blank=True, help_text='Set on the built-in templates that populate_madlibs keeps in sync (see games/content.py)', max_length=200, null=True, unique=True),
+        ),
+    ]
@@ -1,8 +1,11 @@
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
 import secrets
 import string
 
+from .stories import fill_in, placeholders, render_story
+
 
 class StoryTemplate(models.Model):
     """
@@ -16,6 +19,10 @@ class StoryTemplate(models.Model):
     ]
 
     title = models.CharField(max_length=200, help_text="Story title")
+    slug = models.SlugField(
+        max_length=200, unique=True, null=True, blank=True,
+        help_text="Set on the built-in templates that populate_madlibs keeps in sync (see games/content.py)"
+    )
     author = models.CharField(max_length=100, help_text="Original author (e.g., Edgar Allan Poe)")
     original_text = models.TextField(help_text="Original unmodified text", blank=True)
     template_text = models.TextField(
@@ -33,11 +40,52 @@ class StoryTemplate(models.Model):
     def __str__(self):
         return f"{self.title} ({self.get_difficulty_display()})"
 
+    def save(self, *args, **kwargs):
+        """Save, then record a new version if template_text changed."""
+        super().save(*args, **kwargs)
+        self.current_version()
+
     def get_placeholders(self):
         """Extract all placeholders from template text."""
-        import re
-        placeholders = re.findall(r'\[(\w+)\]', self.template_text)
-        return placeholders
+        return placeholders(self.template_text)
+
+    def current_version(self):
+        """
+        The StoryTemplateVersion matching template_text.
+
+        Made on the spot when the text has changed since the last version,
+        or when there's no version yet (templates made with bulk_create()).
+        """
+        latest = self.versions.order_by('-number').first()
+        if latest is not None and latest.template_text == self.template_text:
+            return latest
+        number = latest.number + 1 if latest else 1
+        try:
+            with transaction.atomic():
+                return self.versions.create(number=number, template_text=self.template_text)
+        except IntegrityError:
+            # Someone else made it at the same moment
+            return self.versions.get(number=number)
+
+
+class StoryTemplateVersion(models.Model):
+    """
+    The text of a StoryTemplate as it was at some point.
+
+    Never edited: completed stories are rendered from the version they
+    were played with, so editing a template doesn't change old stories.
+    """
+    template = models.ForeignKey(StoryTemplate, on_delete=models.CASCADE, related_name='versions')
+    number = models.PositiveIntegerField(help_text="1 for the first text, then counting up")
+    template_text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['template', 'number']
+        unique_together = ['template', 'number']
+
+    def __str__(self):
+        return f"{self.template.title} v{self.number}"
 
 
 class VocabularyWord(models.Model):
@@ -62,7 +110,12 @@ class VocabularyWord(models.Model):
     part_of_speech = models.CharField(max_length=20, choices=PART_OF_SPEECH_CHOICES)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='halloween')
     is_kid_friendly = models.BooleanField(default=True, help_text="Appropriate for children")
+    use_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Times players used this word recently; ranks suggestions (see games/tasks.py)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['part_of_speech', 'word']
@@ -75,6 +128,11 @@ class VocabularyWord(models.Model):
 class CompletedMadLib(models.Model):
     """
     Stores completed Mad Libs for sharing and saving.
+
+    Only the words are stored: the story is rendered from template_version
+    when it's read (see games/stories.py). completed_text holds a full copy
+    only for stories saved with MADLIBS_STORE_TEXT on, or written from a
+    template text that no longer exists.
     """
     user = models.ForeignKey(
         User,
@@ -85,7 +143,18 @@ class CompletedMadLib(models.Model):
         help_text="User who created this (optional for anonymous play)"
     )
     template = models.ForeignKey(StoryTemplate, on_delete=models.CASCADE)
-    completed_text = models.TextField(help_text="Story with blanks filled in")
+    template_version = models.ForeignKey(
+        StoryTemplateVersion,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stories',
+        help_text="Template text the story was played with"
+    )
+    completed_text = models.TextField(
+        blank=True,
+        help_text="Full story text, only if it can't be rendered from template_version"
+    )
     user_words = models.JSONField(help_text="Dictionary of words used: {'NOUN_1': 'ghost', ...}")
     is_public = models.BooleanField(default=False, help_text="Show in public gallery")
     share_code = models.CharField(
@@ -99,11 +168,46 @@ class CompletedMadLib(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default ordering (plus the admin's -pk tie-breaker), so lists read
+            # the newest rows instead of sorting the whole table
+            models.Index(fields=['-created_at', '-id']),
+            # Public gallery pages (games/gallery.py); partial, so they only
+            # hold the shared stories however many private ones there are
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_public=True),
+                name='madlib_gallery_newest_idx',
+            ),
+            models.Index(
+                fields=['-view_count', '-id'],
+                condition=models.Q(is_public=True),
+                name='madlib_gallery_popular_idx',
+            ),
+        ]
 
     def __str__(self):
         username = self.user.username if self.user else "Anonymous"
         return f"{self.template.title} by {username} ({self.share_code})"
 
+    @property
+    def text(self):
+        """The story with its blanks filled in."""
+        if self.completed_text or self.template_version_id is None:
+            return self.completed_text
+        return render_story(self.template_version.template_text, self.user_words)
+
+    @classmethod
+    def from_words(cls, template, user_words, **fields):
+        """
+        An unsaved story for these words, played with the template's
+        current text. Stores a full copy of the text if MADLIBS_STORE_TEXT is on.
+        """
+        version = template.current_version()
+        if getattr(settings, 'MADLIBS_STORE_TEXT', False):
+            fields['completed_text'] = fill_in(version.template_text, user_words)
+        return cls(template=template, template_version=version, user_words=user_words, **fields)
+
     def save(self, *args, **kwargs):
         """Generate unique share code if not set."""
         if not self.share_code:
@@ -0,0 +1,41 @@
+"""
+Signal handlers for the games app.
+
+Registered in GamesConfig.ready() (games/apps.py).
+
+Drops a story's cached gallery card (games/gallery.py) when the story is
+edited or deleted. Counting a view doesn't change the card, so saves of
+just view_count or is_public leave it alone.
+
+Drops this process's word suggestion tries (games/autocomplete.py) when
+a vocabulary word is saved or deleted; they're rebuilt on the next
+suggestion request.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import word_index
+from .gallery import forget_card
+from .models import CompletedMadLib, VocabularyWord
+
+# Fields that aren't part of the cached card
+NOT_ON_CARD = {'view_count', 'is_public'}
+
+
+@receiver(post_save, sender=CompletedMadLib)
+def forget_card_after_save(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= NOT_ON_CARD):
+        return
+    forget_card(instance.share_code)
+
+
+@receiver(post_delete, sender=CompletedMadLib)
+def forget_card_after_delete(sender, instance, **kwargs):
+    forget_card(instance.share_code)
+
+
+@receiver(post_save, sender=VocabularyWord)
+@receiver(post_delete, sender=VocabularyWord)
+def forget_suggestions(sender, **kwargs):
+    word_index.clear()
@@ -0,0 +1,69 @@
+"""
+Rendering Mad Libs Stories
+
+A finished story is just its template's text with the player's words
+dropped into the blanks, so a CompletedMadLib doesn't need to keep its own
+copy of the whole text: it keeps the words and the StoryTemplateVersion
+it was played from, and the text is put back together when it's shown.
+Versions are never edited (changing a template makes a new version), so
+old stories keep rendering exactly as they were written.
+
+Rendering is a single regex pass, and recently rendered stories are kept
+in a small per-process LRU cache, so a popular story being viewed over
+and over is rendered once.
+
+Example:
+    >>> fill_in('A [ADJECTIVE] [NOUN].', {'ADJECTIVE_1': 'spooky', 'NOUN_2': 'ghost'})
+    'A spooky ghost.'
+    >>> fill_in('A [NOUN].', {})
+    'A [MISSING].'
+"""
+
+import re
+from functools import lru_cache
+
+# A blank in a template: [NOUN], [ADJECTIVE], [VERB], [ADVERB], ...
+PLACEHOLDER = re.compile(r'\[(\w+)\]')
+# Shown in place of a blank the player didn't fill in
+MISSING = '[MISSING]'
+# Rendered stories kept per process (a few KB each)
+RENDER_CACHE_SIZE = 2048
+
+
+def placeholders(template_text):
+    """Blanks in the template, in order: ['ADJECTIVE', 'NOUN', ...]."""
+    return PLACEHOLDER.findall(template_text)
+
+
+def fill_in(template_text, user_words):
+    """
+    The template with its blanks filled in.
+
+    The n-th blank (counting from 1) is filled with
+    user_words['<PLACEHOLDER>_<n>'], the names the play form uses.
+    Words are inserted in one pass, so a word that itself looks like a
+    blank ("[NOUN]") is left as typed.
+    """
+    count = 0
+
+    def word(match):
+        nonlocal count
+        count += 1
+        return user_words.get(f'{match.group(1)}_{count}', MISSING)
+
+    return PLACEHOLDER.sub(word, template_text)
+
+
+def render_story(template_text, user_words):
+    """fill_in(), remembering recently rendered stories."""
+    return _render(template_text, tuple(sorted(user_words.items())))
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render(template_text, words):
+    return fill_in(template_text, dict(words))
+
+
+def render_cache_info():
+    """Hits, misses and size of this process's render cache."""
+    return _render.cache_info()
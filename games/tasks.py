@@ -0,0 +1,57 @@
+"""
+Background Tasks for the Games App
+
+Run by `manage.py run_worker` (see core/task_queue.py).
+
+- count_word_usage: hourly, counts how often players used each vocabulary
+  word recently, to rank word suggestions (games/autocomplete.py)
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.task_queue import task
+
+from .autocomplete import normalize
+from .batch import PARTS_OF_SPEECH
+from .models import CompletedMadLib, VocabularyWord
+
+# How far back count_word_usage looks
+WORD_USAGE_DAYS = 90
+
+
+@task(every=timedelta(hours=1))
+def count_word_usage(days=WORD_USAGE_DAYS):
+    """
+    Set VocabularyWord.use_count from the stories of the last `days` days.
+
+    Only words whose count changed are saved. Returns how many that was.
+    """
+    since = timezone.now() - timedelta(days=days)
+    # Counted here rather than with jsonb_each() in PostgreSQL: on one CPU
+    # that was slower (24s against 17s for 490,000 stories)
+    stories = CompletedMadLib.objects.filter(created_at__gte=since).order_by().values_list('user_words', flat=True)
+    counts = Counter()
+    for user_words in stories.iterator(chunk_size=5000):
+        if not isinstance(user_words, dict):
+            continue
+        for blank, word in user_words.items():
+            # 'NOUN_3' -> 'noun'
+            part_of_speech = PARTS_OF_SPEECH.get(blank.rsplit('_', 1)[0])
+            if part_of_speech and isinstance(word, str):
+                counts[part_of_speech, normalize(word)] += 1
+
+    now = timezone.now()
+    changed = []
+    for word in VocabularyWord.objects.only('word', 'part_of_speech', 'use_count'):
+        use_count = counts[word.part_of_speech, normalize(word.word)]
+        if use_count != word.use_count:
+            word.use_count = use_count
+            # Set by hand: bulk_update() skips auto_now, and running
+            # processes look at updated_at to rebuild their suggestions
+            word.updated_at = now
+            changed.append(word)
+    VocabularyWord.objects.bulk_update(changed, ['use_count', 'updated_at'], batch_size=500)
+    return len(changed)
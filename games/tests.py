@@ -1,3 +1,421 @@
-from django.test import TestCase
+import importlib
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tests import TEST_SETTINGS
+
+from .autocomplete import PrefixTrie, suggest, word_index
+from .batch import generate_stories
+from .content import sync_content
+from .gallery import InvalidCursor, card_cache_key, decode_cursor, encode_cursor, gallery_page
+from .models import CompletedMadLib, StoryTemplate, VocabularyWord
+from .stories import fill_in, render_cache_info, render_story
+from .tasks import count_word_usage
+
+
+@override_settings(**TEST_SETTINGS)
+class MadLibsGalleryTests(TestCase):
+    """The public gallery should page by cursor and reuse cached story cards."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.template = StoryTemplate.objects.create(title='The Raven', author='Poe', template_text='A [NOUN].')
+        now = timezone.now()
+        stories = [
+            CompletedMadLib(
+                template=cls.template,
+                completed_text=f'A ghost number {i}.',
+                user_words={'NOUN_1': 'ghost'},
+                is_public=i % 4 != 0,  # every 4th one stays private
+                share_code=f'story{i:03}',
+                view_count=i % 3,  # lots of ties
+            )
+            for i in range(40)
+        ]
+        CompletedMadLib.objects.bulk_create(stories)
+        # Two stories share a timestamp, so ids have to break the tie
+        for i, story in enumerate(CompletedMadLib.objects.order_by('pk')):
+            CompletedMadLib.objects.filter(pk=story.pk).update(created_at=now - timedelta(minutes=min(i, 38)))
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, sort, page_size):
+        codes, cursor = [], None
+        while True:
+            page = gallery_page(sort=sort, cursor=cursor, page_size=page_size)
+            codes += [card['share_code'] for card in page.cards]
+            cursor = page.next_cursor
+            if not cursor:
+                return codes
+
+    def test_pages_cover_every_public_story_once_in_order(self):
+        public = CompletedMadLib.objects.filter(is_public=True)
+        for sort, order in [('newest', '-created_at'), ('popular', '-view_count')]:
+            with self.subTest(sort=sort):
+                expected = list(public.order_by(order, '-pk').values_list('share_code', flat=True))
+                self.assertEqual(len(expected), 30)
+                self.assertEqual(self.walk(sort, page_size=7), expected)
+
+    def test_cards_are_cached_and_refreshed(self):
+        with self.assertNumQueries(2):  # the page, then the stories behind the cards
+            first = gallery_page(page_size=5)
+        with self.assertNumQueries(1):  # cards from the cache
+            again = gallery_page(page_size=5)
+        self.assertEqual([card['html'] for card in first.cards], [card['html'] for card in again.cards])
+        self.assertIn('The Raven', first.cards[0]['html'])
+
+        # Counting a view keeps the card; editing the story drops it
+        story = CompletedMadLib.objects.get(share_code=first.cards[0]['share_code'])
+        story.view_count += 1
+        story.save(update_fields=['view_count'])
+        self.assertIsNotNone(cache.get(card_cache_key(story.share_code)))
+        story.completed_text = 'A pumpkin.'
+        story.save()
+        self.assertIsNone(cache.get(card_cache_key(story.share_code)))
+
+        # Renaming the template makes every card stale
+        self.template.title = 'The Crow'
+        self.template.save()
+        self.assertIn('The Crow', gallery_page(page_size=5).cards[1]['html'])
+
+    def test_cursors_round_trip_and_reject_junk(self):
+        moment = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(moment, 12), 'newest'), (moment, 12))
+        self.assertEqual(decode_cursor(encode_cursor(7, 12), 'popular'), (7, 12))
+        for junk in ['!!!', encode_cursor('soon', 3), encode_cursor(1, 'x')]:
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(junk, 'newest')
+
+    def test_gallery_view(self):
+        url = reverse('games:madlibs_gallery')
+        response = self.client.get(url, {'sort': 'popular'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'rel="next"')
+        self.assertContains(response, 'views')
+        self.assertNotContains(response, '&lt;h3')  # cards aren't escaped twice
+        self.assertNotContains(response, 'story000')  # private
+
+        self.assertRedirects(self.client.get(url, {'sort': 'newest', 'after': 'nonsense'}), f'{url}?sort=newest')
+        self.assertEqual(self.client.get(url, {'sort': 'bogus'}).status_code, 200)
+
+    def test_home_shows_only_public_stories(self):
+        response = self.client.get(reverse('games:games_home'))
+        shown = [story.share_code for story in response.context['recent_stories']]
+        self.assertEqual(len(shown), 5)
+        self.assertTrue(CompletedMadLib.objects.filter(share_code__in=shown, is_public=True).count() == 5)
+
+    def test_sharing_from_the_form(self):
+        url = reverse('games:madlibs_submit', args=[self.template.pk])
+        self.client.post(url, {'NOUN_1': 'bat', 'is_public': 'on'})
+        self.client.post(url, {'NOUN_1': 'cat'})
+        self.assertEqual(
+            list(CompletedMadLib.objects.filter(user_words__NOUN_1__in=['bat', 'cat']).order_by('pk').values_list('is_public', flat=True)),
+            [True, False],
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class MadLibsStorageTests(TestCase):
+    """Stories should keep only their words and render from the template version they were played with."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.template = StoryTemplate.objects.create(
+            title='The Raven', author='Poe', template_text='Once upon a [ADJECTIVE] midnight, a [NOUN] and a [NOUN].',
+        )
+
+    def play(self, **words):
+        self.client.post(reverse('games:madlibs_submit', args=[self.template.pk]), words)
+        return CompletedMadLib.objects.latest('pk')
+
+    def test_fill_in(self):
+        text = 'A [ADJECTIVE] [NOUN] met a [NOUN].'
+        words = {'ADJECTIVE_1': 'spooky', 'NOUN_2': '[NOUN]', 'NOUN_3': 'bat'}
+        self.assertEqual(fill_in(text, words), 'A spooky [NOUN] met a bat.')
+        self.assertEqual(fill_in(text, {}), 'A [MISSING] [MISSING] met a [MISSING].')
+
+        before = render_cache_info().hits
+        self.assertEqual(render_story(text, dict(words)), render_story(text, words))
+        self.assertEqual(render_cache_info().hits, before + 1)
+
+    def test_only_words_are_stored(self):
+        story = self.play(ADJECTIVE_1='dreary', NOUN_2='ghost', NOUN_3='bat')
+        self.assertEqual(story.completed_text, '')
+        self.assertEqual(story.template_version.number, 1)
+        self.assertEqual(story.text, 'Once upon a dreary midnight, a ghost and a bat.')
+
+        response = self.client.get(reverse('games:madlibs_result', args=[story.share_code]))
+        self.assertContains(response, 'Once upon a dreary midnight, a ghost and a bat.')
+
+        with override_settings(MADLIBS_STORE_TEXT=True):
+            stored = self.play(ADJECTIVE_1='weak', NOUN_2='raven', NOUN_3='door')
+        self.assertEqual(stored.completed_text, 'Once upon a weak midnight, a raven and a door.')
+
+    def test_editing_a_template_keeps_old_stories(self):
+        old = self.play(ADJECTIVE_1='dreary', NOUN_2='ghost', NOUN_3='bat')
+
+        self.template.title = 'The Raven (Poe)'
+        self.template.save()
+        self.assertEqual(self.template.versions.count(), 1)  # same text, same version
+
+        self.template.template_text = 'Quoth the [NOUN]: "[ADJECTIVE]!"'
+        self.template.save()
+        new = self.play(NOUN_1='pumpkin', ADJECTIVE_2='Nevermore')
+
+        self.assertEqual(CompletedMadLib.objects.get(pk=old.pk).text, 'Once upon a dreary midnight, a ghost and a bat.')
+        self.assertEqual(new.template_version.number, 2)
+        self.assertEqual(new.text, 'Quoth the pumpkin: "Nevermore!"')
+
+    def test_templates_without_versions_get_one(self):
+        StoryTemplate.objects.bulk_create([StoryTemplate(title='Bulk', author='Poe', template_text='A [NOUN].')])
+        template = StoryTemplate.objects.get(title='Bulk')
+        self.assertFalse(template.versions.exists())
+        self.assertEqual(template.current_version().number, 1)
+        self.assertEqual(template.current_version().number, 1)
+
+    def test_migration_compacts_matching_stories(self):
+        migration = importlib.import_module('games.migrations.0005_compact_completed_text')
+        schema_editor = SimpleNamespace(connection=connection)
+        self.template.current_version()
+        words = {'ADJECTIVE_1': 'dreary', 'NOUN_2': 'ghost', 'NOUN_3': 'bat'}
+        CompletedMadLib.objects.bulk_create([
+            CompletedMadLib(template=self.template, user_words=words, share_code='same',
+                            completed_text='Once upon a dreary midnight, a ghost and a bat.'),
+            # Written before the template was edited
+            CompletedMadLib(template=self.template, user_words=words, share_code='older',
+                            completed_text='Long ago, a ghost.'),
+        ])
+
+        migration.compact(apps, schema_editor)
+        same = CompletedMadLib.objects.get(share_code='same')
+        older = CompletedMadLib.objects.get(share_code='older')
+        self.assertEqual((same.completed_text, same.template_version.number), ('', 1))
+        self.assertEqual(same.text, 'Once upon a dreary midnight, a ghost and a bat.')
+        self.assertEqual((older.text, older.template_version), ('Long ago, a ghost.', None))
+
+        migration.expand(apps, schema_editor)
+        same.refresh_from_db()
+        self.assertEqual(same.completed_text, 'Once upon a dreary midnight, a ghost and a bat.')
+
+
+@override_settings(**TEST_SETTINGS)
+class MadLibsBatchTests(TestCase):
+    """Batch generation should fill every blank from the vocabulary and save stories in bulk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.raven = StoryTemplate.objects.create(title='The Raven', author='Poe', template_text='A [ADJECTIVE] [NOUN].')
+        cls.cat = StoryTemplate.objects.create(title='The Black Cat', author='Poe', template_text='[NOUN] [VERB] [ADVERB]!')
+        VocabularyWord.objects.bulk_create([
+            VocabularyWord(word=word, part_of_speech=part, is_kid_friendly=word != 'gory')
+            for part, word in [('noun', 'ghost'), ('noun', 'bat'), ('adjective', 'eerie'), ('adjective', 'gory'),
+                               ('verb', 'howl'), ('adverb', 'softly')]
+        ])
+        cls.teacher = User.objects.create_user('teacher', password='pw')
+
+    def test_generate_stories(self):
+        # Vocabulary, each template's version, then one insert between savepoints (COPY isn't counted)
+        with self.assertNumQueries(7 if connection.vendor == 'postgresql' else 8):
+            batch = generate_stories([self.raven, self.cat], 50, seed=3)
+        self.assertEqual(CompletedMadLib.objects.count(), 50)
+        self.assertEqual(len(set(batch.share_codes)), 50)
+
+        stories = CompletedMadLib.objects.select_related('template_version').in_bulk(batch.share_codes, field_name='share_code')
+        for share_code, template, text in zip(batch.share_codes, batch.templates, batch.texts):
+            story = stories[share_code]
+            self.assertEqual(len(share_code), 8)
+            self.assertEqual((story.template, story.completed_text, story.text), (template, '', text))
+            self.assertNotIn('[', text)
+            self.assertNotIn('gory', text)
+
+        again = generate_stories([self.raven, self.cat], 50, seed=3)
+        self.assertEqual(again.texts, batch.texts)
+        with override_settings(MADLIBS_STORE_TEXT=True):
+            stored = generate_stories([self.raven], 2)
+        self.assertEqual(
+            dict(CompletedMadLib.objects.filter(share_code__in=stored.share_codes).values_list('share_code', 'completed_text')),
+            dict(zip(stored.share_codes, stored.texts)),
+        )
+
+    def test_taken_share_codes_are_replaced(self):
+        generate_stories([self.raven], 3)
+        taken = CompletedMadLib.objects.values_list('share_code', flat=True)[0]
+        codes = [[taken, 'fresh001'], ['fresh002', 'fresh003']]
+        with mock.patch('games.batch.random_share_codes', side_effect=codes):
+            batch = generate_stories([self.raven], 2)
+        self.assertEqual(batch.share_codes, ['fresh002', 'fresh003'])
+        self.assertEqual(CompletedMadLib.objects.filter(share_code__in=batch.share_codes).count(), 2)
+
+    def test_commands(self):
+        out = StringIO()
+        call_command('generate_madlibs', 20, template=[self.cat.pk], public=True, user='teacher', stdout=out)
+        self.assertIn('Created 20 stories', out.getvalue())
+        self.assertEqual(CompletedMadLib.objects.filter(template=self.cat, is_public=True, user=self.teacher).count(), 20)
+
+        call_command('seed_sample_stories', stdout=StringIO())
+        self.assertEqual(CompletedMadLib.objects.count(), 30)
+
+    def test_batch_api(self):
+        url = reverse('games:api_batch_stories')
+        post = lambda body: self.client.post(url, json.dumps(body), content_type='application/json')
+        self.assertEqual(post({'count': 5}).status_code, 401)
+
+        self.client.force_login(self.teacher)
+        self.assertEqual(post({'count': 0}).status_code, 400)
+        self.assertEqual(post({'count': 101}).status_code, 400)
+        self.assertEqual(post({'count': 5, 'templates': [self.raven.pk, 999]}).status_code, 400)
+
+        response = post({'count': 30, 'templates': [self.raven.pk]})
+        self.assertEqual(response.status_code, 201)
+        stories = response.json()['stories']
+        self.assertEqual(len(stories), 30)
+        self.assertTrue(stories[0]['text'].startswith('A eerie'))
+        self.assertEqual(self.client.get(stories[0]['url']).status_code, 200)
+        self.assertEqual(self.teacher.completed_madlibs.filter(is_public=False).count(), 30)
+
+
+@override_settings(**TEST_SETTINGS)
+class WordSuggestionTests(TestCase):
+    """Typeahead suggestions should come from memory, ranked by use, and follow vocabulary changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        VocabularyWord.objects.bulk_create([
+            VocabularyWord(word=word, part_of_speech=part, is_kid_friendly=kid_friendly)
+            for word, part, kid_friendly in [
+                ('ghost', 'noun', True), ('ghoul', 'noun', True), ('Ghost_Ship', 'noun', True),
+                ('gore', 'noun', False), ('ghastly', 'adjective', True), ('haunt', 'verb', True),
+            ]
+        ])
+
+    def setUp(self):
+        word_index.clear()
+
+    def test_prefix_trie(self):
+        trie = PrefixTrie(size=2)
+        for word in ['bat', 'bats', 'ball', 'cat']:
+            trie.add(word, word.upper())
+        self.assertEqual(trie.lookup('ba'), ['BAT', 'BATS'])  # first two added win
+        self.assertEqual(trie.lookup('bal'), ['BALL'])
+        self.assertEqual(trie.lookup('', limit=1), ['BAT'])
+        self.assertEqual(trie.lookup('dog'), [])
+
+    def test_suggestions(self):
+        self.assertEqual(suggest('noun', 'gh'), ['ghost', 'ghoul', 'Ghost_Ship'])  # shorter first
+        self.assertEqual(suggest('noun', 'GHOST S'), ['Ghost_Ship'])
+        self.assertEqual(suggest('noun', 'go'), [])
+        self.assertEqual(suggest('noun', 'go', kid_friendly=False), ['gore'])
+        self.assertEqual(suggest('adjective', 'gh'), ['ghastly'])
+        self.assertEqual(suggest('noun', 'g', limit=1), ['ghost'])
+
+    def test_endpoint_makes_no_queries(self):
+        url = reverse('games:api_suggest_words', args=['noun'])
+        self.client.get(url, {'q': 'g'})  # builds the tries
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'q': 'gh', 'limit': '2'})
+        self.assertEqual(response.json(), {'part_of_speech': 'noun', 'q': 'gh', 'suggestions': ['ghost', 'ghoul']})
+        self.assertIn('max-age=300', response['Cache-Control'])
+        self.assertEqual(self.client.get(url, {'q': 'go', 'kid_friendly': '0'}).json()['suggestions'], ['gore'])
+        self.assertEqual(self.client.get(reverse('games:api_suggest_words', args=['pronoun'])).status_code, 400)
+
+        # Logged-in players too: nothing reads the session or the user
+        self.client.force_login(User.objects.create_user('kid', password='pw'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {'q': 'gh'}).status_code, 200)
+
+    def test_follows_vocabulary_changes(self):
+        self.assertEqual(suggest('verb', 'h'), ['haunt'])
+        VocabularyWord.objects.create(word='howl', part_of_speech='verb')
+        self.assertEqual(suggest('verb', 'h'), ['howl', 'haunt'])  # this process: straight away
+
+        # Changes made elsewhere (or by queryset.update()) show up at the next check
+        VocabularyWord.objects.filter(word='howl').update(is_kid_friendly=False)
+        self.assertEqual(suggest('verb', 'h'), ['howl', 'haunt'])
+        word_index._checked_at = 0
+        self.assertEqual(suggest('verb', 'h'), ['haunt'])
+
+    def test_ranked_by_recent_use(self):
+        template = StoryTemplate.objects.create(title='The Raven', author='Poe', template_text='A [NOUN] and a [NOUN].')
+        for words in [{'NOUN_1': 'Ghoul', 'NOUN_2': 'ghost ship'}, {'NOUN_1': 'ghoul', 'NOUN_2': 'bat'}]:
+            CompletedMadLib.from_words(template, words).save()
+        old = CompletedMadLib.from_words(template, {'NOUN_1': 'ghost', 'NOUN_2': 'ghost'})
+        old.save()
+        CompletedMadLib.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=365))
+
+        self.assertEqual(count_word_usage(), 2)
+        self.assertEqual(suggest('noun', 'gh'), ['ghoul', 'Ghost_Ship', 'ghost'])
+        self.assertEqual(count_word_usage(), 0)  # nothing changed
+
+
+@override_settings(**TEST_SETTINGS)
+class MadLibsContentTests(TestCase):
+    """populate_madlibs should sync the built-in content without touching stories or admin edits."""
+
+    templates = [
+        {'slug': 'raven', 'title': 'The Raven', 'author': 'Poe', 'difficulty': 'medium', 'word_count': 1,
+         'original_text': '', 'template_text': 'A [NOUN] tapping.'},
+        {'slug': 'potion', 'title': 'The Potion', 'author': 'Us', 'difficulty': 'easy', 'word_count': 1,
+         'original_text': '', 'template_text': 'Stir the [NOUN].'},
+    ]
+    vocabulary = {'noun': ['ghost', 'bat', 'ghost'], 'verb': ['howl']}
+
+    def test_populate_twice(self):
+        out = StringIO()
+        call_command('populate_madlibs', stdout=out)
+        self.assertIn('7 added', out.getvalue())
+        story = CompletedMadLib.from_words(StoryTemplate.objects.first(), {})
+        story.save()
+
+        out = StringIO()
+        call_command('populate_madlibs', stdout=out)
+        self.assertIn('already up to date', out.getvalue())
+        self.assertTrue(CompletedMadLib.objects.filter(pk=story.pk).exists())
+
+    def test_only_changes_are_written(self):
+        result = sync_content(self.templates, self.vocabulary)
+        self.assertEqual((result.templates_created, result.words_created), (2, 3))
+
+        with self.assertNumQueries(4):  # SAVEPOINT, two SELECTs, RELEASE
+            self.assertFalse(sync_content(self.templates, self.vocabulary).changed)
+
+    def test_update_and_deactivate_keep_stories(self):
+        sync_content(self.templates, self.vocabulary)
+        raven = StoryTemplate.objects.get(slug='raven')
+        story = CompletedMadLib.from_words(raven, {'NOUN_1': 'ghost'})
+        story.save()
+
+        edited = [dict(self.templates[0], template_text='A [NOUN] rapping.')]
+        result = sync_content(edited, self.vocabulary)
+        self.assertEqual((result.templates_updated, result.templates_deactivated), (1, 1))
+        self.assertEqual(raven.versions.count(), 2)
+        self.assertFalse(StoryTemplate.objects.get(slug='potion').is_active)
+        story.refresh_from_db()
+        self.assertEqual(story.text, 'A ghost tapping.')
+
+    def test_admin_edits_and_old_rows_are_kept(self):
+        old = StoryTemplate.objects.create(title='The Raven', author='Poe', template_text='A [NOUN] tapping.')
+        VocabularyWord.objects.create(word='bat', part_of_speech='noun', is_kid_friendly=False)
+
+        result = sync_content(self.templates, self.vocabulary)
+        self.assertEqual((result.templates_created, result.templates_updated, result.words_created), (1, 1, 2))
+        old.refresh_from_db()
+        self.assertEqual((old.slug, old.difficulty), ('raven', 'medium'))
+        self.assertEqual(old.versions.count(), 1)  # same text, no new version
+        self.assertFalse(VocabularyWord.objects.get(word='bat').is_kid_friendly)
+
+        StoryTemplate.objects.filter(slug='potion').update(is_active=False)
+        self.assertFalse(sync_content(self.templates, self.vocabulary).changed)
+        self.assertFalse(StoryTemplate.objects.get(slug='potion').is_active)
@@ -12,7 +12,10 @@ urlpatterns = [
     path('madlibs/<int:template_id>/', views.madlibs_play, name='madlibs_play'),
     path('madlibs/<int:template_id>/submit/', views.madlibs_submit, name='madlibs_submit'),
     path('madlibs/result/<str:share_code>/', views.madlibs_result, name='madlibs_result'),
+    path('madlibs/gallery/', views.madlibs_gallery, name='madlibs_gallery'),
 
     # API
     path('api/random-word/<str:part_of_speech>/', views.api_random_word, name='api_random_word'),
+    path('api/suggest/<str:part_of_speech>/', views.api_suggest_words, name='api_suggest_words'),
+    path('api/madlibs/batch/', views.api_batch_stories, name='api_batch_stories'),
 ]
@@ -1,8 +1,15 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_http_methods, require_POST
 from django.contrib import messages
+from core.stats import estimate_row_count
+from .autocomplete import MAX_SUGGESTIONS, suggest
+from .batch import MAX_API_COUNT, generate_stories
+from .gallery import SORTS, InvalidCursor, gallery_page
 from .models import StoryTemplate, VocabularyWord, CompletedMadLib
+import json
 import re
 import random
 
@@ -11,15 +18,16 @@ def games_home(request):
     """
     Games homepage with links to available games.
     """
-    # Get recent completed stories (limit to 5)
-    recent_stories = CompletedMadLib.objects.select_related(
-        'template', 'user'
-    ).order_by('-created_at')[:5]
+    # Get recent public stories (limit to 5), from the gallery's index
+    recent_stories = CompletedMadLib.objects.filter(is_public=True).select_related(
+        'template', 'template_version', 'user'
+    ).order_by('-created_at', '-id')[:5]
 
     context = {
         'total_templates': StoryTemplate.objects.filter(is_active=True).count(),
         'total_words': VocabularyWord.objects.count(),
-        'total_completed': CompletedMadLib.objects.count(),
+        # Estimated: an exact COUNT(*) reads every story ever written
+        'total_completed': estimate_row_count(CompletedMadLib),
         'recent_stories': recent_stories,
     }
     return render(request, 'games/games_home.html', context)
@@ -91,25 +99,14 @@ def madlibs_submit(request, template_id):
         if key.startswith(('NOUN_', 'ADJECTIVE_', 'VERB_', 'ADVERB_')):
             user_words[key] = value.strip()
 
-    # Replace placeholders in template with user words
-    completed_text = template.template_text
-
-    # Replace each placeholder with the corresponding user word
-    for i, placeholder in enumerate(template.get_placeholders(), 1):
-        field_name = f'{placeholder}_{i}'
-        user_word = user_words.get(field_name, '[MISSING]')
-
-        # Replace the first occurrence of [PLACEHOLDER]
-        completed_text = completed_text.replace(f'[{placeholder}]', user_word, 1)
-
-    # Create CompletedMadLib
-    completed_madlib = CompletedMadLib.objects.create(
+    # Only the words are saved; the story is rendered from the template when shown
+    completed_madlib = CompletedMadLib.from_words(
+        template,
+        user_words,
         user=request.user if request.user.is_authenticated else None,
-        template=template,
-        completed_text=completed_text,
-        user_words=user_words,
-        is_public=False  # Could add checkbox in form
+        is_public=request.POST.get('is_public') == 'on',
     )
+    completed_madlib.save()
 
     messages.success(request, 'Your Mad Libs story is ready!')
     return redirect('games:madlibs_result', share_code=completed_madlib.share_code)
@@ -119,7 +116,9 @@ def madlibs_result(request, share_code):
     """
     Display completed Mad Libs story.
     """
-    madlib = get_object_or_404(CompletedMadLib, share_code=share_code)
+    madlib = get_object_or_404(
+        CompletedMadLib.objects.select_related('template', 'template_version', 'user'), share_code=share_code
+    )
 
     # Increment view count
     madlib.view_count += 1
@@ -131,6 +130,30 @@ def madlibs_result(request, share_code):
     return render(request, 'games/madlibs_result.html', context)
 
 
+def madlibs_gallery(request):
+    """
+    Public gallery of shared Mad Libs stories.
+
+    ?sort=newest (default) or ?sort=popular (most viewed); ?after= is the
+    cursor from the previous page's "Next" link. See games/gallery.py.
+    """
+    sort = request.GET.get('sort', 'newest')
+    if sort not in SORTS:
+        sort = 'newest'
+    try:
+        page = gallery_page(sort=sort, cursor=request.GET.get('after'))
+    except InvalidCursor:
+        # A mangled link: start over instead of failing
+        return redirect(f"{request.path}?sort={sort}")
+
+    context = {
+        'page': page,
+        'sort': sort,
+        'is_first_page': not request.GET.get('after'),
+    }
+    return render(request, 'games/madlibs_gallery.html', context)
+
+
 @require_http_methods(["GET"])
 def api_random_word(request, part_of_speech):
     """
@@ -164,3 +187,99 @@ def api_random_word(request, part_of_speech):
         'word': word.word,
         'part_of_speech': word.part_of_speech,
     })
+
+
+@require_http_methods(["GET"])
+@cache_control(max_age=300)
+def api_suggest_words(request, part_of_speech):
+    """
+    API endpoint suggesting words as a player types into a blank.
+
+    GET /games/api/suggest/noun/?q=gh
+    Returns: {"part_of_speech": "noun", "q": "gh", "suggestions": ["ghost", "ghoul"]}
+
+    Optional: limit (1-10, default 8); kid_friendly=0 to include every word.
+    Answered from in-memory tries (games/autocomplete.py), so a keystroke
+    doesn't query the database.
+    """
+    valid_pos = ['noun', 'verb', 'adjective', 'adverb']
+    if part_of_speech not in valid_pos:
+        return JsonResponse({
+            'error': f'Invalid part of speech. Must be one of: {", ".join(valid_pos)}'
+        }, status=400)
+
+    prefix = request.GET.get('q', '')[:50]
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        limit = 8
+    kid_friendly = request.GET.get('kid_friendly') != '0'
+
+    return JsonResponse({
+        'part_of_speech': part_of_speech,
+        'q': prefix,
+        'suggestions': suggest(part_of_speech, prefix, kid_friendly=kid_friendly, limit=limit),
+    })
+
+
+@require_POST
+def api_batch_stories(request):
+    """
+    Batch Story API
+
+    Makes up to MAX_API_COUNT (100) stories at once with random words from
+    the vocabulary, e.g. one per pupil in a class. Send JSON:
+
+        {"count": 30, "templates": [1, 4], "public": false}
+
+    or the same as form fields (templates repeated, public=on).
+
+    "templates" is optional (default: every active template); stories are
+    spread evenly at random over them and belong to the logged-in user.
+    See games/batch.py.
+
+    Responses:
+        201 - {"count", "stories": [{"share_code", "url", "template", "text"}]}
+        400 - bad JSON, count out of range or unknown template ids
+        401 - not logged in
+
+    URL: /games/api/madlibs/batch/ (POST)
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Log in to generate stories'}, status=401)
+
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body or b'{}')
+            count, template_ids, public = data.get('count', 0), data.get('templates') or [], data.get('public') is True
+        else:
+            data = request.POST
+            count, template_ids, public = data.get('count', 0), data.getlist('templates'), data.get('public') == 'on'
+        count = int(count)
+        template_ids = [int(pk) for pk in template_ids]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': 'Send JSON like {"count": 30, "templates": [1, 2]}'}, status=400)
+    if not 1 <= count <= MAX_API_COUNT:
+        return JsonResponse({'error': f'count must be between 1 and {MAX_API_COUNT}'}, status=400)
+
+    templates = StoryTemplate.objects.filter(is_active=True)
+    if template_ids:
+        templates = templates.filter(pk__in=template_ids)
+    templates = list(templates)
+    unknown = set(template_ids) - {template.pk for template in templates}
+    if unknown or not templates:
+        return JsonResponse({'error': f'Unknown story templates: {sorted(unknown)}'}, status=400)
+
+    batch = generate_stories(templates, count, user=request.user, is_public=public)
+    return JsonResponse({
+        'count': len(batch),
+        'stories': [
+            {
+                'share_code': share_code,
+                'url': reverse('games:madlibs_result', args=[share_code]),
+                'template': template.title,
+                'text': text,
+            }
+            for share_code, template, text in zip(batch.share_codes, batch.templates, batch.texts)
+        ],
+    }, status=201)
@@ -0,0 +1,55 @@
+"""
+Gunicorn Configuration for ShriekedIn Web Dynos
+
+Used by the Procfile (gunicorn loads ./gunicorn.conf.py by default too).
+
+Boot sequence:
+1. The master imports Django once (preload_app), so settings, apps,
+   models and URLconfs are loaded a single time instead of once per worker
+2. when_ready: still in the master, compile every template and build the
+   URL tables (core.warmup, without database connections); forked workers
+   share all of it
+3. post_worker_init: each worker opens its own database connections (or
+   fills its pool) before it accepts its first request
+
+So after a restart or scale-out, the first visitors get normal-speed pages
+instead of paying for template compiling and connection setup.
+"""
+
+import os
+
+
+# Heroku sets WEB_CONCURRENCY from the dyno size; PORT is read automatically
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+preload_app = True
+
+
+def when_ready(server):
+    from django.db import connections
+
+    from core.db_pool import close_pools
+    from core.warmup import warm_up
+
+    report = warm_up(databases=False)
+    # Workers must open their own connections after the fork
+    connections.close_all()
+    close_pools()
+    server.log.info('Warm-up in master: %.0f ms %s', report.total_ms,
+                    {step.name: step.count for step in report.steps})
+
+
+def post_worker_init(worker):
+    from core.warmup import warm_up
+
+    report = warm_up()
+    warnings = [step.warning for step in report.steps if step.warning]
+    if warnings:
+        worker.log.warning('Worker %s warm-up warnings: %s', worker.pid, warnings)
+    if report.ok:
+        worker.log.info('Worker %s warm in %.0f ms', worker.pid, report.total_ms)
+    else:
+        worker.log.warning('Worker %s warm-up problems: %s', worker.pid,
+                           [step.error for step in report.steps if step.error])
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Add WhiteNoise for static files
+    "core.instrumentation.RequestInstrumentationMiddleware",  # Per-view query/timing metrics
+    "core.db_routers.ReplicaStickinessMiddleware",  # Read-your-writes when replicas are configured
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -67,21 +69,66 @@ ROOT_URLCONF = "spookyoctober.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.instrumentation.InstrumentedDjangoTemplates",  # DjangoTemplates + render timing
         "DIRS": [BASE_DIR / "templates"],  # Add global templates directory
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Same as APP_DIRS=True, but comments and indentation are stripped
+            # when a template is read, and every compiled template is cached
+            # for the life of the worker (see core/template_loaders.py)
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "core.template_loaders.FilesystemLoader",
+                    "core.template_loaders.AppDirectoriesLoader",
+                ]),
+            ],
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "core.context_processors.scary_mode",
             ],
         },
     },
 ]
 
+# Strip template comments and indentation at load time (core/template_loaders.py)
+TEMPLATE_STRIP = config('TEMPLATE_STRIP', default=True, cast=bool)
+
 WSGI_APPLICATION = "spookyoctober.wsgi.application"
 
+# Request instrumentation (see core/instrumentation.py)
+# Keeps a rolling window of per-view metrics in each worker's memory,
+# shown to staff on the dashboard's performance panel. Every request pays
+# for it (a wrapper around each SQL statement, measuring the response and
+# a locked write), so it is on by default only with DEBUG.
+REQUEST_INSTRUMENTATION = config('REQUEST_INSTRUMENTATION', default=DEBUG, cast=bool)
+INSTRUMENTATION_WINDOW_SIZE = config('INSTRUMENTATION_WINDOW_SIZE', default=200, cast=int)
+INSTRUMENTATION_SLOW_QUERY_COUNT = 5
+
+# Worker warm-up (see core/warmup.py and gunicorn.conf.py)
+# Pages requested once by each new worker before it takes traffic
+WARMUP_PATHS = config('WARMUP_PATHS', default='/', cast=Csv())
+
+# Large admin bulk actions run as chunked background jobs (see core/bulk_actions.py)
+# True: the web process starts each job in a thread. False: each job is
+# queued for `python manage.py run_worker` (the worker process).
+BULK_ACTIONS_IN_PROCESS = config('BULK_ACTIONS_IN_PROCESS', default=True, cast=bool)
+
+# Background task queue (see core/task_queue.py)
+# Days finished tasks are kept for the admin before being deleted
+TASK_HISTORY_DAYS = config('TASK_HISTORY_DAYS', default=7, cast=int)
+
+# Completed Mad Libs (see games/stories.py)
+# False: stories keep only their words and are rendered from the template
+# version they were played with. True: also store a full copy of each story.
+MADLIBS_STORE_TEXT = config('MADLIBS_STORE_TEXT', default=False, cast=bool)
+
+# Offline geocoding (see core/geocoding.py)
+# GeoNames postal code file `manage.py load_gazetteer` reads by default.
+# The bundled sample only covers a few cities; for real use download
+# US.zip from https://download.geonames.org/export/zip/ and point this at US.txt.
+GAZETTEER_PATH = config('GAZETTEER_PATH', default=str(BASE_DIR / 'core' / 'fixtures' / 'gazetteer_us_sample.txt'))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -96,6 +143,45 @@ DATABASES = {
     )
 }
 
+# Read replicas (optional, comma-separated URLs), see core/db_routers.py
+# Each becomes an alias replica1, replica2, ... Tests mirror them onto
+# "default", so a second local database works as a stand-in, e.g.
+#   DATABASE_REPLICA_URLS=sqlite:///db-replica.sqlite3 python manage.py test
+DATABASE_REPLICAS = []
+for number, replica_url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dj_database_url.parse(replica_url, conn_max_age=600, conn_health_checks=True)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+DATABASE_REPLICA_MAX_LAG = config('DATABASE_REPLICA_MAX_LAG', default=5, cast=float)  # seconds
+DATABASE_STICKY_SECONDS = config('DATABASE_STICKY_SECONDS', default=10, cast=int)
+REPLICA_HEALTH_CHECK_SECONDS = 5
+
+# Connection pooling (PostgreSQL with psycopg 3), see core/db_pool.py
+# Off: each thread keeps its own connection for CONN_MAX_AGE seconds.
+# On: each worker process shares a pool of DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE
+# connections; a request waits up to DB_POOL_TIMEOUT seconds for a free one.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_OPTIONS = {
+    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+    'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # seconds
+    'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),  # close spare connections after this
+    'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),  # recycle connections
+}
+
+for database in DATABASES.values():
+    if database['ENGINE'] == 'django.db.backends.postgresql':
+        # Same as Django's backend, plus checkout timing for the performance panel
+        database['ENGINE'] = 'core.db_backends.postgresql'
+        if DB_POOL:
+            # The pool keeps connections open instead; with CONN_HEALTH_CHECKS
+            # the pool checks each connection before handing it out
+            database['CONN_MAX_AGE'] = 0
+            database.setdefault('OPTIONS', {})['pool'] = dict(DB_POOL_OPTIONS)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -145,6 +231,41 @@ STORAGES = {
     },
 }
 
+# Cache (per-process memory by default; point CACHE_BACKEND/CACHE_LOCATION
+# at a shared cache such as Redis to share it between workers)
+CACHE_BACKEND = config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache")
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": config("CACHE_LOCATION", default="shriekedin"),
+    }
+}
+# Caches that live inside one process, so other workers never see their changes
+PER_PROCESS_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+# Sessions
+# With a shared cache, cached_db reads sessions from the cache and only
+# falls back to the database on a miss; writes still go to the database,
+# so nothing is lost if the cache is cleared. A per-process cache can't be
+# used for that (a logout in one worker would leave the session cached,
+# and valid, in the others), so without a shared cache sessions live in
+# signed cookies and never touch the database. The site only keeps the
+# login in the session, so the cookie stays small. Set
+# SESSION_ENGINE=django.contrib.sessions.backends.db to keep them
+# server-side without a shared cache.
+# Purge expired rows (db and cached_db) with: python manage.py purge_sessions
+SESSION_ENGINE = config(
+    "SESSION_ENGINE",
+    default=(
+        "django.contrib.sessions.backends.signed_cookies"
+        if CACHE_BACKEND in PER_PROCESS_CACHES
+        else "django.contrib.sessions.backends.cached_db"
+    ),
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -153,6 +274,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Security settings for production
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
+    # Readiness probes call the worker directly over plain HTTP
+    SECURE_REDIRECT_EXEMPT = [r'^readyz/$']
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
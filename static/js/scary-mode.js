@@ -833,7 +833,9 @@ class ScaryModeEasterEgg {
         // Load 3D skull model from GLB file
         return new Promise((resolve, reject) => {
             const loader = new THREE.GLTFLoader();
-            const modelPath = '/static/models/low-poly-skull/low-poly-skull.glb';
+            // base.html passes the collected (hashed) URL so the preloaded copy is reused
+            const modelPath = (window.SCARY_MODE_ASSETS && window.SCARY_MODE_ASSETS.model)
+                || '/static/models/low-poly-skull/low-poly-skull.glb';
 
             console.log('🦴 Loading skull model from:', modelPath);
 